@@ -0,0 +1,105 @@
+# benchmarks/bench_answer_cache.py
+"""
+Semantic answer cache on synthetic filings: every question is asked in
+several phrasings (and once about another year, which must not hit). Reports
+hit rate, false hits (a cached answer to a different question), and answer
+latency on hits vs misses with the offline provider's simulated LLM latency.
+That latency applies to embedding calls too, so with `--backend api` a hit
+still takes one `--llm-latency`: the question's own embedding.
+
+    python -m benchmarks.bench_answer_cache --questions 40 --llm-latency 0.5
+"""
+import argparse, random
+
+from benchmarks.common import WORDS, latency_stats, make_synthetic_filings, run_metadata, timed, write_results
+from utils_task_2.providers import set_provider
+
+TOPICS = ["Risk Factors", "Business", "MD&A", "Financial Statements"]
+PHRASINGS = [
+    "In {t}'s {y} 10-K {s}, what was reported about {w}?",
+    "What was reported about {w} in {t}'s {y} 10-K {s}?",
+    "In {t}'s {y} 10-K {s}, what did it report about {w}?",
+    "What does {t}'s {y} 10-K {s} report about {w}?",
+]
+
+
+def make_questions(n, filings, mapping, seed=0):
+    """(question id, text) pairs: each question in every phrasing, plus one about another year."""
+    rng = random.Random(seed)
+    ticker_by_cik = dict(zip(mapping.cik, mapping.ticker))
+    pairs = sorted({(ticker_by_cik[f["cik"]], f["year"]) for f in filings})
+    years = sorted({y for _, y in pairs})
+    out = []
+    for qid in range(n):
+        t, y = rng.choice(pairs)
+        s, w = rng.choice(TOPICS), " ".join(rng.sample(WORDS, 2))
+        out += [(qid, p.format(t=t, y=y, s=s, w=w)) for p in PHRASINGS]
+        other = [o for o in years if o != y and (t, o) in pairs]
+        if other:
+            out.append((f"{qid}@{other[0]}", PHRASINGS[0].format(t=t, y=other[0], s=s, w=w)))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filings", type=int, default=9)
+    ap.add_argument("--questions", type=int, default=40)
+    ap.add_argument("--threshold", type=float, default=None, help="default CACHE_THRESHOLD")
+    ap.add_argument("--llm-latency", type=float, default=0.5, help="simulated answer-call latency (s)")
+    ap.add_argument("--backend", default="local", choices=["api", "local"],
+                    help="embedding backend (api = the offline provider's hashed vectors)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/answer_cache.json")
+    args = ap.parse_args(argv)
+
+    from utils_task_2.chunking import build_chunk_df
+    from utils_task_2.embedding import embed_chunks, set_embedding_backend
+    from utils_task_2.answer_cache import AnswerCache, CACHE_THRESHOLD, cached_answer
+
+    set_provider("local", latency=args.llm_latency)
+    set_embedding_backend(args.backend)
+    filings, mapping = make_synthetic_filings(args.filings, seed=args.seed)
+    chunk_df = embed_chunks(build_chunk_df(filings, mapping), text_column="chunk")
+    cache = AnswerCache(threshold=args.threshold or CACHE_THRESHOLD)
+    questions = make_questions(args.questions, filings, mapping, args.seed)
+
+    answered_by, hit_lat, miss_lat, false_hits = {}, [], [], 0
+    for qid, q in questions:
+        before = cache.counts["hits"]
+        (result, _), dt, err = timed(cached_answer, cache, "rag", chunk_df, q,
+                                     top_k_chunk=3, top_k_section=3, include_neighbors=False)
+        if err:
+            raise err
+        if cache.counts["hits"] > before:
+            hit_lat.append(dt)
+            false_hits += answered_by.get(id(result), qid) != qid
+        else:
+            miss_lat.append(dt)
+            answered_by[id(result)] = qid
+
+    stats = cache.stats()
+    result = {
+        **stats,
+        "questions":       args.questions,
+        "phrasings":       len(PHRASINGS),
+        "possible_hits":   args.questions * (len(PHRASINGS) - 1),
+        "false_hits":      false_hits,
+        "hit_latency":     latency_stats(hit_lat),
+        "miss_latency":    latency_stats(miss_lat),
+        "saved_s":         round(len(hit_lat) * (sum(miss_lat) / max(len(miss_lat), 1)) - sum(hit_lat), 3),
+    }
+    print(f"{len(questions)} lookups: hit rate {stats['hit_rate']} "
+          f"({stats.get('hits', 0)}/{result['possible_hits']} possible), {false_hits} false hits; "
+          f"hit p50={result['hit_latency'].get('p50_ms')}ms vs miss p50={result['miss_latency'].get('p50_ms')}ms")
+
+    write_results(args.out, {
+        "benchmark": "answer_cache",
+        "meta": run_metadata(filings=args.filings, threshold=cache.threshold, backend=args.backend,
+                             llm_latency=args.llm_latency, seed=args.seed),
+        "results": result,
+    })
+    return result
+
+
+if __name__ == "__main__":
+    main()
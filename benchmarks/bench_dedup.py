@@ -0,0 +1,101 @@
+# benchmarks/bench_dedup.py
+"""
+Near-duplicate dedup on synthetic year-over-year filings: each later year
+repeats the previous year's sections with a fraction of words edited and some
+new paragraphs. Reports the dedup ratio, detection recall/precision against
+the known copies, MinHash/LSH time, and summaries / embedding inputs saved.
+
+    python -m benchmarks.bench_dedup --filings 9 --edit-rate 0.01
+"""
+import argparse, random, time
+
+from benchmarks.common import make_synthetic_filings, _section_text, run_metadata, write_results
+from utils_task_2.dedup import DEDUP_THRESHOLD, find_near_duplicates
+
+
+def make_year_over_year(n_companies, years, edit_rate, new_paras, paras_per_section, seed):
+    """First-year filings from make_synthetic_filings, later years derived from the previous one."""
+    rng = random.Random(seed)
+    base, mapping = make_synthetic_filings(n_companies, years=years[:1],
+                                           paras_per_section=paras_per_section, seed=seed)
+    filings, prev = list(base), base
+    for year in years[1:]:
+        cur = []
+        for f in prev:
+            g = dict(f, year=year)
+            for sec in [k for k in g if k.startswith("section_")]:
+                paras = g[sec].split("\n")
+                for i, p in enumerate(paras):
+                    words = p.split(" ")
+                    for _ in range(int(len(words) * edit_rate)):
+                        words[rng.randrange(len(words))] = rng.choice(["revised", "updated", "new"])
+                    paras[i] = " ".join(words)
+                g[sec] = "\n".join(paras) + "\n" + _section_text(rng, new_paras)
+            cur.append(g)
+        filings += cur
+        prev = cur
+    return filings, mapping
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--companies", type=int, default=3)
+    ap.add_argument("--years", nargs="+", default=["2018", "2019", "2020"])
+    ap.add_argument("--edit-rate", type=float, default=0.01, help="share of words edited per year")
+    ap.add_argument("--new-paras", type=int, default=2, help="new paragraphs per section per year")
+    ap.add_argument("--paras-per-section", type=int, default=40)
+    ap.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/dedup.json")
+    args = ap.parse_args(argv)
+
+    from utils_task_2.chunking import build_chunk_df
+
+    filings, mapping = make_year_over_year(args.companies, args.years, args.edit_rate,
+                                           args.new_paras, args.paras_per_section, args.seed)
+    chunk_df = build_chunk_df(filings, mapping)
+    texts = chunk_df["chunk"].tolist()
+
+    t0 = time.perf_counter()
+    rep = find_near_duplicates(texts, args.threshold)
+    elapsed = time.perf_counter() - t0
+
+    # ground truth: a later-year chunk is a copy when the same (ticker, section)
+    # chunk position exists in the first year (chunk boundaries are stable here)
+    first_year = args.years[0]
+    position = chunk_df.groupby(["ticker", "year", "section"]).cumcount()
+    keys = list(zip(chunk_df.ticker, chunk_df.section, position))
+    origin = {k: i for i, (k, y) in enumerate(zip(keys, chunk_df.year)) if y == first_year}
+    expected = {i for i, (k, y) in enumerate(zip(keys, chunk_df.year))
+                if y != first_year and k in origin}
+    found = {i for i, r in enumerate(rep) if r != i}
+    true_pos = [i for i in found if i in expected and keys[rep[i]][:2] == keys[i][:2]]
+
+    result = {
+        "chunks":          len(texts),
+        "duplicates":      len(found),
+        "dedup_ratio":     round(len(found) / len(texts), 4),
+        "exact":           sum(texts[i] == texts[rep[i]] for i in found),
+        "recall":          round(len(true_pos) / len(expected), 4) if expected else None,
+        "precision":       round(len(true_pos) / len(found), 4) if found else None,
+        "dedup_s":         round(elapsed, 4),
+        "chunks_per_s":    round(len(texts) / elapsed, 1) if elapsed else None,
+        "summaries_saved": len(found),
+        "embedding_inputs_saved": len(found),
+        "triplet_extractions_saved": sum(texts[i] != texts[rep[i]] for i in found),
+    }
+    print(f"{result['chunks']} chunks: {result['duplicates']} duplicates ({result['dedup_ratio']:.1%}, "
+          f"{result['exact']} exact) recall={result['recall']} precision={result['precision']} "
+          f"in {result['dedup_s']}s ({result['chunks_per_s']} chunks/s)")
+
+    write_results(args.out, {
+        "benchmark": "dedup",
+        "meta": run_metadata(companies=args.companies, years=args.years, edit_rate=args.edit_rate,
+                             new_paras=args.new_paras, threshold=args.threshold, seed=args.seed),
+        "results": result,
+    })
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/bench_fact_index.py
+"""
+Numeric fact index: extraction time and size, lookup latency and hit rate on
+TEST_QUERIES (against the chunk store), or accuracy on synthetic financial
+tables with known values. With --rag, every query is also timed through
+answer_query for comparison.
+
+    python -m benchmarks.bench_fact_index                    # chunk store + TEST_QUERIES
+    python -m benchmarks.bench_fact_index --synthetic        # offline, known answers
+"""
+import argparse, random, time
+
+import pandas as pd
+
+from benchmarks.common import WORDS, latency_stats, run_metadata, timed, write_results
+from utils_task_2.fact_index import FactIndex, build_fact_frame, load_fact_index
+
+COMPANIES = {"aapl": "Apple", "msft": "Microsoft", "goog": "Google"}
+# label words; "fiscal", "year" and "company" are question filler to the lookup
+LABEL_WORDS = [w for w in WORDS if w not in ("fiscal", "year", "company")]
+# questions about a row's label that ask for something else; the index must not answer them
+NEGATIVES = [
+    "What was {c}'s {label} growth in {y}?",
+    "What percentage of {label} did {c} report in {y}?",
+    "What were {c}'s {label} of iPhone in {y}?",
+    "What were {c}'s {label} in Greater China in {y}?",
+]
+
+
+def synthetic_tables(n_filings, rows, seed=0):
+    """
+    section_8 chunks with a '(In millions)' table per filing, one question per
+    row, and per filing the NEGATIVES about its first row (expected: no answer).
+    """
+    rng = random.Random(seed)
+    chunks, queries = [], []
+    for i in range(n_filings):
+        ticker = list(COMPANIES)[i % len(COMPANIES)]
+        year = 2018 + i // len(COMPANIES)
+        periods = [year, year - 1, year - 2]
+        lines = ["CONSOLIDATED STATEMENTS OF OPERATIONS (In millions)", " ".join(map(str, periods))]
+        used = set()
+        for _ in range(rows):
+            words = rng.sample(LABEL_WORDS, 3)
+            if frozenset(words) in used:        # same words in another order = same item
+                continue
+            used.add(frozenset(words))
+            label = " ".join(words).capitalize()
+            values = [rng.randint(100, 99_999) for _ in periods]
+            lines.append(f"{label} $ " + " ".join(f"{v:,}" for v in values))
+            col = rng.randrange(len(periods))
+            when = f"in {periods[col]}" if col == 0 else f"in fiscal {periods[col]} according to its {year} 10-K"
+            queries.append({"query": f"What was {COMPANIES[ticker]}'s {label.lower()} {when}?",
+                            "expected": f"${values[col]:,} million"})
+        first = lines[2].split(" $ ")[0].lower()
+        queries += [{"query": n.format(c=COMPANIES[ticker], label=first, y=year), "expected": None}
+                    for n in NEGATIVES]
+        chunks.append({"ticker": ticker, "year": str(year), "section": "section_8",
+                       "chunk": "\n".join(lines)})
+    return pd.DataFrame(chunks), queries
+
+
+def run_lookups(index, queries, repeats):
+    lat, per_query = [], []
+    for q in queries:
+        for _ in range(repeats):
+            hit, dt, err = timed(index.answer, q["query"])
+            if err:
+                raise err
+            lat.append(dt)
+        per_query.append({
+            "query":    q["query"],
+            "answer":   hit[0]["answer"] if hit else None,
+            "expected": q.get("expected") or q.get("ground_truth"),
+        })
+    return per_query, latency_stats(lat)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--synthetic", action="store_true", help="generated tables instead of the chunk store")
+    ap.add_argument("--filings", type=int, default=9, help="synthetic filings")
+    ap.add_argument("--rows", type=int, default=200, help="table rows per synthetic filing")
+    ap.add_argument("--chunk-store", default=None)
+    ap.add_argument("--repeats", type=int, default=20, help="lookup timings per query")
+    ap.add_argument("--rag", action="store_true", help="also time answer_query on every query")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/fact_index.json")
+    args = ap.parse_args(argv)
+
+    if args.synthetic:
+        chunk_df, queries = synthetic_tables(args.filings, args.rows, args.seed)
+        t0 = time.perf_counter()
+        index = FactIndex(build_fact_frame(chunk_df))
+    else:
+        from utils_task_2.chunk_store import DEFAULT_CHUNK_STORE, load_chunk_store
+        from utils_task_2.constants import TEST_QUERIES
+        path = args.chunk_store or DEFAULT_CHUNK_STORE
+        chunk_df, queries = load_chunk_store(path), TEST_QUERIES
+        t0 = time.perf_counter()
+        index = load_fact_index(path)
+    build_s = time.perf_counter() - t0
+
+    per_query, lookup = run_lookups(index, queries, args.repeats)
+    hits = [p for p in per_query if p["answer"] is not None]
+    result = {
+        "facts":     len(index),
+        "memory_mb": round(index.frame.memory_usage(deep=True).sum() / 1e6, 2),
+        "build_s":   round(build_s, 4),
+        "queries":   len(per_query),
+        "hit_rate":  round(len(hits) / len(per_query), 3) if per_query else None,
+        "lookup":    lookup,
+        "per_query": per_query,
+    }
+    if args.synthetic:
+        result["accuracy"] = round(sum(p["answer"] == p["expected"] for p in per_query) / len(per_query), 3)
+        result["false_hits"] = sum(p["expected"] is None and p["answer"] is not None for p in per_query)
+    print(f"{result['facts']} facts ({result['memory_mb']} MB) built in {result['build_s']}s; "
+          f"hit rate {result['hit_rate']}, lookup p50={lookup['p50_ms']}ms p95={lookup['p95_ms']}ms"
+          + (f", accuracy {result['accuracy']}, {result['false_hits']} false hits" if args.synthetic else ""))
+
+    if args.rag:
+        from utils_task_2.answer import answer_query
+        rag_lat = []
+        for q in queries:
+            _, dt, err = timed(answer_query, chunk_df, q["query"])
+            if not err:
+                rag_lat.append(dt)
+        result["rag"] = latency_stats(rag_lat)
+        print(f"answer_query p50={result['rag']['p50_ms']}ms p95={result['rag']['p95_ms']}ms")
+
+    write_results(args.out, {
+        "benchmark": "fact_index",
+        "meta": run_metadata(source="synthetic" if args.synthetic else "chunk_store",
+                             filings=args.filings, rows=args.rows, repeats=args.repeats, seed=args.seed),
+        "results": result,
+    })
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/bench_graph_store.py
+"""
+Benchmark SQLiteGraphStore against llama_index's SimpleGraphStore on synthetic
+knowledge graphs (10k–1M triplets): load throughput, resident memory, and
+get / depth-3 get_rel_map latency for cold, hot-cache and precomputed lookups.
+
+    python -m benchmarks.bench_graph_store --sizes 10000 100000 1000000
+"""
+import argparse, os, random, tempfile, time, tracemalloc
+
+from benchmarks.common import latency_stats, run_metadata, write_results
+from utils_task_2.graph_store import SQLiteGraphStore
+
+RELATIONS = ["reports", "owns", "competes with", "depends on", "discloses",
+             "acquired", "supplies", "is subject to", "invests in", "operates in"]
+
+
+def make_triplets(n, seed=0):
+    """Triplets over n/5 entities with a Zipf-like degree distribution (a few hubs)."""
+    rng = random.Random(seed)
+    n_entities = max(10, n // 5)
+    weights = [1 / (i + 1) for i in range(n_entities)]
+    subj = rng.choices(range(n_entities), weights=weights, k=n)
+    obj = rng.choices(range(n_entities), weights=weights, k=n)
+    return [(f"Entity {s}", rng.choice(RELATIONS), f"Entity {o}") for s, o in zip(subj, obj)]
+
+
+def sample_subjects(triplets, n, seed=0):
+    """Query keywords: drawn from triplet subjects, so hubs come up often (like real queries)."""
+    rng = random.Random(seed + 1)
+    return [rng.choice(triplets)[0] for _ in range(n)]
+
+
+def time_lookups(store, subjects, depth, limit):
+    get_lat, rel_lat, n_paths = [], [], 0
+    for s in subjects:
+        t0 = time.perf_counter()
+        store.get(s)
+        get_lat.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        rel_map = store.get_rel_map([s], depth=depth, limit=limit)
+        rel_lat.append(time.perf_counter() - t0)
+        n_paths += sum(len(v) for v in rel_map.values())
+    return {"get": latency_stats(get_lat), "get_rel_map": latency_stats(rel_lat),
+            "paths_returned": n_paths}
+
+
+def bench_sqlite(triplets, subjects, depth, limit, hot_nodes, workdir):
+    path = os.path.join(workdir, f"graph_{len(triplets)}.sqlite")
+    store = SQLiteGraphStore(path)
+    t0 = time.perf_counter()
+    for i in range(0, len(triplets), 10_000):
+        store.upsert_triplets(triplets[i:i + 10_000])
+    store.persist()
+    load_s = time.perf_counter() - t0
+    store.close()
+
+    store = SQLiteGraphStore(path)                      # fresh connection and cache: cold
+    cold = time_lookups(store, subjects, depth, limit)
+    hot = time_lookups(store, subjects, depth, limit)   # adjacency now in the LRU cache
+    cached_nodes = store.stats()["cached_nodes"]
+    t0 = time.perf_counter()
+    n_pre = store.precompute_neighborhoods(top_n=hot_nodes, depth=depth, limit=limit)
+    precompute_s = time.perf_counter() - t0
+    store.close()
+    store = SQLiteGraphStore(path)                      # k-hop table only, cold cache
+    precomputed = time_lookups(store, subjects, depth, limit)
+    stats = store.stats()
+    store.close()
+    return {
+        "load_s":             round(load_s, 3),
+        "load_triplets_s":    round(len(triplets) / load_s, 1),
+        "db_bytes":           os.path.getsize(path),
+        "cached_nodes":       cached_nodes,
+        "cold":               cold,
+        "hot_cache":          hot,
+        "precompute_s":       round(precompute_s, 3),
+        "precomputed_nodes":  n_pre,
+        "precomputed":        precomputed,
+        "khop_hit_rate":      round(stats["khop_hits"] / max(1, len(subjects)), 3),
+    }
+
+
+def bench_simple(triplets, subjects, depth, limit):
+    try:
+        from llama_index.core.graph_stores import SimpleGraphStore
+    except ImportError:
+        return None
+    store = SimpleGraphStore()
+    t0 = time.perf_counter()
+    for t in triplets:
+        store.upsert_triplet(*t)
+    load_s = time.perf_counter() - t0
+
+    tracemalloc.start()                 # second, untimed build just to measure memory
+    probe = SimpleGraphStore()
+    for t in triplets:
+        probe.upsert_triplet(*t)
+    resident = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del probe
+    return {
+        "load_s":          round(load_s, 3),
+        "load_triplets_s": round(len(triplets) / load_s, 1),
+        "resident_bytes":  resident,
+        "lookups":         time_lookups(store, subjects, depth, limit),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                    help="graph sizes, in number of triplets")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--depth", type=int, default=3, help="graph_traversal_depth")
+    ap.add_argument("--limit", type=int, default=30, help="max_knowledge_sequence")
+    ap.add_argument("--hot-nodes", type=int, default=1000,
+                    help="entities whose k-hop neighborhoods are precomputed")
+    ap.add_argument("--skip-simple", action="store_true",
+                    help="do not compare against SimpleGraphStore")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/graph_store.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            triplets = make_triplets(n, args.seed)
+            subjects = sample_subjects(triplets, args.queries, args.seed)
+            print(f"[INFO] {n:,} triplets")
+            row = {"triplets": n,
+                   "sqlite": bench_sqlite(triplets, subjects, args.depth, args.limit,
+                                          args.hot_nodes, workdir)}
+            if not args.skip_simple:
+                row["simple"] = bench_simple(triplets, subjects, args.depth, args.limit)
+            results.append(row)
+            s = row["sqlite"]
+            print(f"  sqlite  load {s['load_triplets_s']:,.0f} t/s | rel_map p50 "
+                  f"cold {s['cold']['get_rel_map']['p50_ms']} ms, hot {s['hot_cache']['get_rel_map']['p50_ms']} ms, "
+                  f"precomputed {s['precomputed']['get_rel_map']['p50_ms']} ms")
+            if row.get("simple"):
+                m = row["simple"]
+                print(f"  simple  load {m['load_triplets_s']:,.0f} t/s | rel_map p50 "
+                      f"{m['lookups']['get_rel_map']['p50_ms']} ms | resident {m['resident_bytes'] / 2**20:.1f} MiB")
+
+    write_results(args.out, {
+        "meta": run_metadata(depth=args.depth, limit=args.limit, queries=args.queries,
+                             hot_nodes=args.hot_nodes, seed=args.seed),
+        "results": results,
+    })
+
+
+if __name__ == "__main__":
+    main()
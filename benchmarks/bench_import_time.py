@@ -0,0 +1,106 @@
+# benchmarks/bench_import_time.py
+"""
+Measure CLI startup cost: wall time of a fresh interpreter importing what each
+entry point needs, the slowest imports (python -X importtime), and which heavy
+libraries got pulled in. Exits non-zero when `query` startup exceeds the target.
+
+    python -m benchmarks.bench_import_time --target-ms 800
+"""
+import argparse, os, re, statistics, subprocess, sys, time
+
+from benchmarks.common import run_metadata, write_results
+
+# what each entry point imports before doing any work
+SCENARIOS = {
+    "bare":   "pass",
+    "cli":    "import main; main.build_parser()",
+    "query":  "import main, utils_task_2.chunk_store, utils_task_2.answer; main.build_parser()",
+    "serve":  "import utils_task_2.server, utils_task_2.chunk_store, utils_task_2.answer",
+    "graph":  "import utils_task_2.answer; from llama_index.core import KnowledgeGraphIndex",
+}
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "sklearn",
+                 "datasets", "llama_index", "matplotlib")
+# libraries `query` must not import at startup
+QUERY_FORBIDDEN = ("torch", "sentence_transformers", "transformers", "sklearn",
+                   "datasets", "llama_index", "matplotlib")
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once(code):
+    probe = f"{code}\nimport sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"})
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed")
+    imports = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m and len(m.group(3)) == 1:            # top-level imports only
+            imports.append((m.group(4), int(m.group(2)) / 1000))
+    heavy = [m for m in proc.stdout.strip().splitlines()[-1].split(",") if m] if proc.stdout.strip() else []
+    return wall, imports, heavy
+
+
+def bench(code, repeats):
+    walls, last = [], None
+    for _ in range(repeats):
+        wall, imports, heavy = run_once(code)
+        walls.append(wall)
+        last = (imports, heavy)
+    imports, heavy = last
+    top = sorted(imports, key=lambda x: -x[1])[:8]
+    return {
+        "wall_ms_median": round(statistics.median(walls) * 1000, 1),
+        "wall_ms_min":    round(min(walls) * 1000, 1),
+        "heavy_modules":  heavy,
+        "slowest_imports_ms": [{"module": m, "cumulative_ms": round(t, 1)} for m, t in top],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--target-ms", type=float, default=1000.0,
+                    help="max median `query` startup, over the bare interpreter")
+    ap.add_argument("--out", default="bench_results/import_time.json")
+    args = ap.parse_args(argv)
+
+    scenarios = list(dict.fromkeys(["bare"] + args.scenarios))
+    results = {}
+    for name in scenarios:
+        try:
+            results[name] = bench(SCENARIOS[name], args.repeats)
+        except RuntimeError as e:                 # e.g. llama_index not installed
+            results[name] = {"error": str(e)}
+            print(f"[WARN] {name}: {e}")
+            continue
+        r = results[name]
+        print(f"[INFO] {name:6s} {r['wall_ms_median']:8.1f} ms  heavy={r['heavy_modules'] or '-'}")
+
+    failures = []
+    if "query" in results and "error" not in results["query"]:
+        q = results["query"]
+        startup = q["wall_ms_median"] - results["bare"]["wall_ms_median"]
+        q["startup_ms_over_bare"] = round(startup, 1)
+        if startup > args.target_ms:
+            failures.append(f"query startup {startup:.0f} ms > target {args.target_ms:.0f} ms")
+        forbidden = sorted(set(q["heavy_modules"]) & set(QUERY_FORBIDDEN))
+        if forbidden:
+            failures.append(f"query imports heavy modules at startup: {forbidden}")
+
+    write_results(args.out, {
+        "meta": run_metadata(repeats=args.repeats, target_ms=args.target_ms),
+        "results": results,
+        "failures": failures,
+    })
+    for f in failures:
+        print(f"[FAIL] {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# benchmarks/bench_orchestration.py
+"""
+Sequential vs overlapped Task 1 + Task 2 (main.run_pipelines) on synthetic
+data: wall-clock time of the whole run in each mode.
+
+  - Task 1 stand-in: the real CPU stages (scaling, PCA, silhouette K sweep,
+    KMeans, t-SNE) on random clustered embeddings; the transformer model is
+    skipped so the benchmark runs without torch
+  - Task 2 stand-in: chunking and summarization of synthetic filings through
+    the offline provider, whose `--llm-latency` plays the network wait
+
+The sequential run is today's `python main.py` (one K-sweep process, Task 1
+before Task 2); the overlapped run gives Task 1 `--cpu-workers` in its own
+process while Task 2 summarizes with `--io-concurrency` calls in flight.
+
+    python -m benchmarks.bench_orchestration --filings 6 --llm-latency 0.2
+"""
+import argparse, os
+
+import numpy as np
+
+from benchmarks.common import make_synthetic_filings, run_metadata, write_results
+
+
+def synthetic_task1(n_points=3000, dims=384, n_clusters=8, k_min=4, k_max=14, tsne_iter=250,
+                    seed=0, cpu_workers=1):
+    from sklearn.manifold import TSNE
+    import utils_task_1.clustering as ut1_clustering
+    import utils_task_1.pca        as ut1_pca
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dims))
+    X = centers[rng.integers(n_clusters, size=n_points)] + rng.normal(scale=2.0, size=(n_points, dims))
+    X = ut1_clustering.standard_scale_embeddings(X)
+    X, _ = ut1_pca.compute_pca(X, n_components=50)
+    X = ut1_pca.normalize_rows(X)
+    best_k, _ = ut1_clustering.choose_k_by_silhouette(X, k_min=k_min, k_max=k_max, n_jobs=cpu_workers)
+    ut1_clustering.perform_kmeans(X, best_k)
+    TSNE(n_components=2, random_state=seed, max_iter=tsne_iter, n_jobs=cpu_workers).fit_transform(X)
+    return best_k
+
+
+def synthetic_task2(n_filings=6, summarize_workers=None, seed=0):
+    import utils_task_2.chunk_store as ut2_store
+
+    filings, mapping = make_synthetic_filings(n_filings, seed=seed)
+    chunk_df = ut2_store.build_chunk_df_from_corpus(reports=filings, mapping=mapping,
+                                                    summarize_workers=summarize_workers)
+    return len(chunk_df)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filings", type=int, default=6)
+    ap.add_argument("--llm-latency", type=float, default=0.2, help="simulated summarizer latency (s)")
+    ap.add_argument("--points", type=int, default=3000, help="Task 1 embeddings")
+    ap.add_argument("--k-max", type=int, default=14)
+    ap.add_argument("--cpu-workers", type=int, default=None, help="default main.default_cpu_workers()")
+    ap.add_argument("--io-concurrency", type=int, default=None, help="default SUMMARIZE_CONCURRENCY")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/orchestration.json")
+    args = ap.parse_args(argv)
+
+    from main import default_cpu_workers, run_pipelines
+    from utils_task_2.providers import set_provider
+    from utils_task_2.summarization import SUMMARIZE_CONCURRENCY
+
+    os.environ["TENK_PROVIDER"] = "local"
+    set_provider("local", latency=args.llm_latency, seed=args.seed)
+    cpu_workers = args.cpu_workers or default_cpu_workers()
+    io_concurrency = args.io_concurrency or SUMMARIZE_CONCURRENCY
+    cpu_job = (synthetic_task1, {"n_points": args.points, "k_max": args.k_max, "seed": args.seed})
+    io_job = (synthetic_task2, {"n_filings": args.filings, "summarize_workers": io_concurrency,
+                                "seed": args.seed})
+
+    results = {
+        "sequential": run_pipelines(cpu_job, io_job, cpu_workers=1, sequential=True),
+        "overlapped": run_pipelines(cpu_job, io_job, cpu_workers=cpu_workers),
+    }
+    for r in results.values():
+        print(f"{r['mode']:10s} wall={r['wall_s']:.2f}s  task1={r['cpu_s']:.2f}s "
+              f"({r['cpu_workers']} CPU workers)  task2={r['io_s']:.2f}s")
+    seq, ovl = results["sequential"]["wall_s"], results["overlapped"]["wall_s"]
+    results["speedup"] = round(seq / ovl, 3) if ovl else None
+    print(f"overlapped is {results['speedup']}x the sequential run "
+          f"({seq - ovl:.2f}s saved of {seq:.2f}s)")
+
+    write_results(args.out, {
+        "benchmark": "orchestration",
+        "meta": run_metadata(filings=args.filings, llm_latency=args.llm_latency, points=args.points,
+                             k_max=args.k_max, io_concurrency=io_concurrency, seed=args.seed),
+        "results": results,
+    })
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_parsing.py
+"""
+Paragraph parsing + grouping: the shared single-pass parser
+(utils_task_1.parsing.split_into_groups) against the previous
+per-task implementation, on the largest Financial Statements (section_8)
+texts. Checks that both produce identical paragraphs and groups.
+
+    python -m benchmarks.bench_parsing                 # selected tickers' filings
+    python -m benchmarks.bench_parsing --synthetic     # offline, table-heavy text
+"""
+import argparse, random, time
+
+from benchmarks.common import WORDS, latency_stats, run_metadata, write_results
+from utils_task_1.parsing import parse_paragraphs, group_paragraphs, split_into_groups
+
+
+# -- previous implementation (string growth + re-split in is_strange), for comparison
+def legacy_parse_paragraphs(text, min_word_threshold=10, sentence_endings={'.', '!', '?'}):
+    raw = [line.strip() for line in text.splitlines() if line.strip()]
+    merged, buffer = [], None
+    for line in raw:
+        if buffer is None:
+            buffer = line
+        else:
+            if buffer[-1] not in sentence_endings:
+                buffer += ' ' + line
+            else:
+                merged.append(buffer)
+                buffer = line
+    if buffer:
+        merged.append(buffer)
+    return merged
+
+
+def legacy_is_strange(para, min_word_threshold=10, ending_punctuations={'.', '!', '?'}):
+    text = para.strip()
+    if not text or text[-1] not in ending_punctuations:
+        return True
+    if len(text.split()) < min_word_threshold:
+        return True
+    return text.istitle() or text.isupper()
+
+
+def legacy_group_paragraphs(paragraphs, min_word_threshold=10):
+    groups, current, has_normal = [], [], False
+    for para in paragraphs:
+        flag = legacy_is_strange(para, min_word_threshold)
+        if not current:
+            if flag:
+                current, has_normal = [para], False
+            else:
+                groups.append(para)
+        else:
+            if flag and has_normal:
+                groups.append("\n".join(current))
+                current, has_normal = [para], False
+            else:
+                current.append(para)
+                if not flag:
+                    has_normal = True
+    if current:
+        groups.append("\n".join(current))
+    return groups
+
+
+def legacy_split(text):
+    return legacy_group_paragraphs(legacy_parse_paragraphs(text))
+
+
+def synthetic_financial_statements(n_texts, rows, seed=0):
+    """section_8-like text: prose notes interleaved with long runs of unpunctuated table rows."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_texts):
+        lines = []
+        while len(lines) < rows:
+            lines.append(" ".join(rng.choices(WORDS, k=3)).upper())
+            for _ in range(rng.randint(20, 400)):
+                label = " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).title()
+                lines.append(f"{label} $ {rng.randint(1, 99999):,} $ {rng.randint(1, 99999):,}")
+            lines.append(" ".join(rng.choices(WORDS, k=rng.randint(15, 40))).capitalize() + ".")
+            lines.append("")
+        texts.append("\n".join(lines))
+    return texts
+
+
+def corpus_financial_statements(n_texts):
+    """The largest section_8 texts of the selected tickers' filings."""
+    from utils_task_2.chunk_store import load_filtered_corpus
+    reports, _ = load_filtered_corpus()
+    texts = sorted((r.get("section_8") or "" for r in reports), key=len, reverse=True)
+    return [t for t in texts[:n_texts] if t]
+
+
+def time_impl(fn, texts, repeats):
+    lat = []
+    for _ in range(repeats):
+        for t in texts:
+            t0 = time.perf_counter()
+            fn(t)
+            lat.append(time.perf_counter() - t0)
+    return latency_stats(lat)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--synthetic", action="store_true", help="generate table-heavy text instead of the corpus")
+    ap.add_argument("--texts", type=int, default=9, help="number of section_8 texts")
+    ap.add_argument("--rows", type=int, default=20_000, help="lines per synthetic text")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/parsing.json")
+    args = ap.parse_args(argv)
+
+    texts = (synthetic_financial_statements(args.texts, args.rows, args.seed) if args.synthetic
+             else corpus_financial_statements(args.texts))
+    print(f"[INFO] {len(texts)} texts, {sum(map(len, texts)) / 1e6:.1f}M chars, "
+          f"largest {max(map(len, texts)) / 1e6:.2f}M chars")
+
+    identical = all(
+        legacy_parse_paragraphs(t) == parse_paragraphs(t) and
+        legacy_split(t) == split_into_groups(t) == group_paragraphs(parse_paragraphs(t))
+        for t in texts
+    )
+    legacy = time_impl(legacy_split, texts, args.repeats)
+    shared = time_impl(split_into_groups, texts, args.repeats)
+    speedup = round(legacy["wall_s"] / shared["wall_s"], 2) if shared["wall_s"] else None
+    print(f"identical output: {identical}")
+    print(f"legacy  p50={legacy['p50_ms']}ms  p95={legacy['p95_ms']}ms")
+    print(f"shared  p50={shared['p50_ms']}ms  p95={shared['p95_ms']}ms  ({speedup}x)")
+
+    write_results(args.out, {
+        "benchmark": "parsing",
+        "meta": run_metadata(source="synthetic" if args.synthetic else "corpus", n_texts=len(texts),
+                             total_chars=sum(map(len, texts)), repeats=args.repeats),
+        "results": {"identical": identical, "legacy": legacy, "shared": shared, "speedup": speedup},
+    })
+    if not identical:
+        raise SystemExit("[ERROR] shared parser output differs from the legacy implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline throughput/latency benchmark for the Task 2 pipeline stages
+(chunking, summarization, index build, retrieval, answering) on synthetic
+filings, using the deterministic local provider instead of OpenAI.
+
+    python -m benchmarks.bench_pipeline --sizes 3 9 27 --latency 0.02
+"""
+import argparse, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from benchmarks.common import (
+    latency_stats, timed, make_synthetic_filings, make_synthetic_queries,
+    run_metadata, write_results
+)
+from utils_task_2.providers import set_provider
+
+
+def bench_size(n_filings, n_queries, embed_batch, seed):
+    import utils_task_2.chunking      as ut2_chunking
+    import utils_task_2.summarization as ut2_summarization
+    import utils_task_2.embedding     as ut2_embedding
+    import utils_task_2.retrieval     as ut2_retrieval
+    import utils_task_2.answer        as ut2_answer
+
+    filings, mapping = make_synthetic_filings(n_filings, seed=seed)
+    stages = {}
+
+    # chunking: one op per filing
+    lats, frames = [], []
+    t0 = time.perf_counter()
+    for filing in filings:
+        df, dt, _ = timed(ut2_chunking.build_chunk_df, [filing], mapping)
+        lats.append(dt)
+        frames.append(df)
+    stages["chunking"] = latency_stats(lats, time.perf_counter() - t0)
+    chunk_df = pd.concat(frames, ignore_index=True)
+    stages["chunking"]["n_chunks"] = len(chunk_df)
+
+    # summarization: one op per chunk, same thread-pool fan-out as parallel_summarize
+    def summarize_one(text):
+        return timed(ut2_summarization.safe_summarizer, text)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor() as exe:
+        results = list(exe.map(summarize_one, chunk_df["chunk"].tolist()))
+    stages["summarization"] = latency_stats([r[1] for r in results], time.perf_counter() - t0)
+    stages["summarization"]["errors"] = sum(r[0] is None for r in results)
+    chunk_df["chunk_summary"] = [r[0] or "" for r in results]
+
+    # index build: embed every summary in fixed-size batches
+    summaries = chunk_df["chunk_summary"].tolist()
+    lats, errors = [], 0
+    t0 = time.perf_counter()
+    for i in range(0, len(summaries), embed_batch):
+        _, dt, err = timed(ut2_embedding.get_embeddings_parallel, summaries[i:i + embed_batch])
+        lats.append(dt)
+        errors += err is not None
+    stages["index_build"] = latency_stats(lats, time.perf_counter() - t0)
+    stages["index_build"]["errors"] = errors
+
+    # retrieval and answering: one op per query
+    queries = make_synthetic_queries(n_queries, filings, mapping, seed=seed)
+    for name, fn in [("retrieval", ut2_retrieval.get_top_k_chunks),
+                     ("answer", ut2_answer.answer_query)]:
+        lats, errors = [], 0
+        t0 = time.perf_counter()
+        for q in queries:
+            _, dt, err = timed(fn, chunk_df, q)
+            lats.append(dt)
+            errors += err is not None
+        stages[name] = latency_stats(lats, time.perf_counter() - t0)
+        stages[name]["errors"] = errors
+
+    return [{"n_filings": n_filings, "stage": s, **v} for s, v in stages.items()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[3, 9, 27],
+                    help="corpus sizes, in number of synthetic filings")
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--embed-batch", type=int, default=256)
+    ap.add_argument("--latency", type=float, default=0.0, help="simulated provider latency (s)")
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/pipeline.json")
+    args = ap.parse_args(argv)
+
+    provider_cfg = {
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate, "seed": args.seed,
+    }
+    set_provider("local", **provider_cfg)
+
+    results = []
+    for n in args.sizes:
+        rows = bench_size(n, args.queries, args.embed_batch, args.seed)
+        for r in rows:
+            print(f"n_filings={r['n_filings']:>4}  {r['stage']:<14} "
+                  f"ops={r.get('n_ops', 0):>6}  thr={r.get('throughput_ops_s')}/s  "
+                  f"p50={r.get('p50_ms')}ms  p95={r.get('p95_ms')}ms  p99={r.get('p99_ms')}ms")
+        results.extend(rows)
+
+    write_results(args.out, {
+        "benchmark": "pipeline",
+        "meta": run_metadata(provider="local", provider_config=provider_cfg,
+                             queries=args.queries, embed_batch=args.embed_batch),
+        "results": results,
+    })
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_query_router.py
+"""
+Local query router vs the LLM query_decomposer on TEST_QUERIES: share of
+queries routed locally at the threshold, decomposition latency of each path,
+and agreement of the routed fields with the LLM's.
+
+    python -m benchmarks.bench_query_router --threshold 0.75
+    python -m benchmarks.bench_query_router --provider local --llm-latency 0.4
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import latency_stats, run_metadata, timed, write_results
+from utils_task_2.constants import TEST_QUERIES
+from utils_task_2.providers import set_provider
+from utils_task_2 import instrumentation
+
+FIELDS = ("ticker", "year", "section_name")
+
+
+def run(threshold, backend, repeats):
+    from utils_task_2.query_router import route_query
+    from utils_task_2.query_decomposer import query_decomposer
+    from utils_task_2.embedding import section_definition_embeddings
+
+    section_definition_embeddings(backend=backend)   # warm-up outside the timed loop
+    per_query, router_lat, llm_lat = [], [], []
+    for test in TEST_QUERIES:
+        q = test["query"]
+        for _ in range(repeats):
+            routed, dt_r, err = timed(route_query, q, backend, threshold)
+            if err:
+                raise err
+            router_lat.append(dt_r)
+        llm, dt_l, err = timed(query_decomposer, q)
+        llm_lat.append(dt_l)
+        local = routed["confidence"] >= threshold
+        per_query.append({
+            "query":      q,
+            "confidence": routed["confidence"],
+            "route":      "local" if local else "llm",
+            "router":     {f: routed[f] for f in FIELDS + ("data_item",)},
+            "llm":        None if err else {f: llm[f] for f in FIELDS + ("data_item",)},
+            "agree":      None if err else {f: str(routed[f]).lower() == str(llm[f]).lower()
+                                            for f in FIELDS},
+            "llm_ms":     round(dt_l * 1000, 3),
+        })
+
+    local = [p for p in per_query if p["route"] == "local"]
+    router_mean = float(np.mean(router_lat))
+    saved = sum(p["llm_ms"] / 1000 - router_mean for p in local)
+    compared = [p for p in local if p["agree"] is not None]
+    agreement = {f: (float(np.mean([p["agree"][f] for p in compared])) if compared else None)
+                 for f in FIELDS}
+    return {
+        "threshold":        threshold,
+        "n_queries":        len(per_query),
+        "local_share":      round(len(local) / len(per_query), 3),
+        "router":           latency_stats(router_lat),
+        "llm":              latency_stats(llm_lat),
+        "saved_total_s":    round(saved, 4),
+        "saved_per_query_ms": round(saved / len(per_query) * 1000, 3),
+        "local_agreement":  agreement,
+        "per_query":        per_query,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--threshold", type=float, default=None,
+                    help="router confidence threshold (default TENK_ROUTER_THRESHOLD / 0.75)")
+    ap.add_argument("--provider", default="openai", choices=["openai", "local"])
+    ap.add_argument("--llm-latency", type=float, default=0.0,
+                    help="simulated LLM latency in seconds for --provider local")
+    ap.add_argument("--backend", default=None, choices=["api", "local"],
+                    help="embedding backend for nearest-section routing")
+    ap.add_argument("--repeats", type=int, default=5, help="router timings per query")
+    ap.add_argument("--out", default="bench_results/query_router.json")
+    args = ap.parse_args(argv)
+
+    from utils_task_2.query_router import ROUTER_THRESHOLD
+    threshold = ROUTER_THRESHOLD if args.threshold is None else args.threshold
+    if args.provider == "local":
+        set_provider("local", latency=args.llm_latency)
+    else:
+        set_provider(args.provider)
+    instrumentation.enable()
+
+    r = run(threshold, args.backend, args.repeats)
+    print(f"threshold={threshold}  routed locally {r['local_share']:.0%} of {r['n_queries']} queries")
+    print(f"router p50={r['router']['p50_ms']}ms  llm p50={r['llm']['p50_ms']}ms  "
+          f"saved {r['saved_total_s']:.2f}s total ({r['saved_per_query_ms']:.1f}ms/query)")
+    print("agreement with LLM on locally routed queries: " +
+          "  ".join(f"{f}={v:.2f}" if v is not None else f"{f}=n/a"
+                    for f, v in r["local_agreement"].items()))
+
+    write_results(args.out, {
+        "benchmark": "query_router",
+        "meta": run_metadata(provider=args.provider, llm_latency=args.llm_latency,
+                             embedding_backend=args.backend, repeats=args.repeats),
+        "results": r,
+    })
+    return r
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_resilience.py
+"""
+Blind sequential retries (summarization.retry_on_exception) vs hedged,
+circuit-broken calls (utils_task_2.resilience) against the offline provider
+with a slow tail and an outage:
+
+  - tail:   a `--tail-rate` share of calls takes `--tail-latency` extra seconds;
+            reports p50/p95/p99 per strategy (hedging targets the p99)
+  - outage: every call fails; reports time per failed call and how many
+            requests each strategy sends to the failing endpoint
+
+    python -m benchmarks.bench_resilience --calls 500 --latency 0.05 --tail-rate 0.03
+"""
+import argparse, time
+
+from benchmarks.common import latency_stats, run_metadata, timed, write_results
+from utils_task_2 import instrumentation, resilience
+from utils_task_2.providers import set_provider, get_client
+from utils_task_2.summarization import retry_on_exception
+
+
+def llm_call():
+    client = get_client()
+    client.calls += 1
+    return client.responses.create(model="gpt-4.1-nano-2025-04-14", input="What was net income?",
+                                   **resilience.request_options())
+
+
+def strategies():
+    return {
+        "retry":  retry_on_exception(llm_call),
+        "hedged": resilience.resilient("bench_llm", default_delay=None)(llm_call),
+    }
+
+
+def run_tail(args):
+    out = {}
+    for name, fn in strategies().items():
+        client = set_provider("local", latency=args.latency, jitter=args.latency / 4,
+                              tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=args.seed)
+        client.calls = 0
+        resilience.reset_breakers()
+        lat = []
+        for _ in range(args.calls):
+            _, dt, err = timed(fn)
+            if err:
+                raise err
+            lat.append(dt)
+        out[name] = {**latency_stats(lat), "requests": client.calls,
+                     "extra_requests": round(client.calls / args.calls - 1, 3)}
+        print(f"tail   {name:6s} p50={out[name]['p50_ms']}ms p95={out[name]['p95_ms']}ms "
+              f"p99={out[name]['p99_ms']}ms  requests/call={client.calls / args.calls:.3f}")
+    return out
+
+
+def run_outage(args):
+    out = {}
+    for name, fn in strategies().items():
+        client = set_provider("local", latency=args.latency, error_rate=1.0, seed=args.seed)
+        client.calls = 0
+        resilience.reset_breakers()
+        lat = []
+        for _ in range(args.outage_calls):
+            with resilience.deadline(args.deadline):
+                _, dt, err = timed(fn)
+            lat.append(dt)
+        out[name] = {**latency_stats(lat), "requests": client.calls}
+        print(f"outage {name:6s} mean={sum(lat) / max(len(lat), 1) * 1000:.0f}ms per failed call, "
+              f"{client.calls} requests for {args.outage_calls} calls")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--calls", type=int, default=500)
+    ap.add_argument("--latency", type=float, default=0.05, help="base provider latency (s)")
+    ap.add_argument("--tail-rate", type=float, default=0.03)
+    ap.add_argument("--tail-latency", type=float, default=1.0)
+    ap.add_argument("--outage-calls", type=int, default=10)
+    ap.add_argument("--deadline", type=float, default=5.0, help="per-call deadline in the outage run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_results/resilience.json")
+    args = ap.parse_args(argv)
+
+    instrumentation.enable()
+    results = {"tail": run_tail(args), "outage": run_outage(args),
+               "counters": instrumentation.snapshot()["counters"]}
+    write_results(args.out, {
+        "benchmark": "resilience",
+        "meta": run_metadata(calls=args.calls, latency=args.latency, tail_rate=args.tail_rate,
+                             tail_latency=args.tail_latency, outage_calls=args.outage_calls,
+                             deadline=args.deadline, seed=args.seed),
+        "results": results,
+    })
+    return results
+
+
+if __name__ == "__main__":
+    main()
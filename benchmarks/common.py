@@ -0,0 +1,136 @@
+# benchmarks/common.py
+
+import os, re, json, time, random, platform, subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+WORDS = (
+    "revenue net sales operating income fiscal year company products services "
+    "customers markets competition risk liquidity capital expenditures cash flow "
+    "depreciation amortization goodwill segment iphone cloud advertising search "
+    "licensing hardware software subscription employees regulation tax interest "
+    "currency inventory suppliers manufacturing litigation dividends shares"
+).split()
+
+SECTIONS = ["section_1", "section_1A", "section_7", "section_8"]
+
+
+def latency_stats(latencies_s, wall_s=None) -> dict:
+    """p50/p95/p99 in ms plus throughput (ops/s over wall time, or summed latency)."""
+    lat = np.asarray(latencies_s, dtype=float)
+    if lat.size == 0:
+        return {"n_ops": 0}
+    wall = wall_s if wall_s is not None else float(lat.sum())
+    p50, p95, p99 = np.percentile(lat * 1000, [50, 95, 99])
+    return {
+        "n_ops":            int(lat.size),
+        "wall_s":           round(wall, 4),
+        "throughput_ops_s": round(lat.size / wall, 2) if wall > 0 else None,
+        "p50_ms":           round(float(p50), 3),
+        "p95_ms":           round(float(p95), 3),
+        "p99_ms":           round(float(p99), 3),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (result, elapsed_seconds, error_or_None)."""
+    t0 = time.perf_counter()
+    try:
+        return fn(*args, **kwargs), time.perf_counter() - t0, None
+    except Exception as e:
+        return None, time.perf_counter() - t0, e
+
+
+def _sentence(rng, n_words=(12, 28)):
+    words = rng.choices(WORDS, k=rng.randint(*n_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _section_text(rng, n_paras):
+    lines = []
+    for p in range(n_paras):
+        if p % 4 == 0:
+            lines.append(" ".join(rng.choices(WORDS, k=3)).title())   # header-like line
+        if p % 5 == 4:
+            for _ in range(rng.randint(3, 8)):                          # table-like rows
+                label = " ".join(rng.choices(WORDS, k=rng.randint(2, 4)))
+                nums = " ".join(f"{rng.randint(100, 99999):,}" for _ in range(3))
+                lines.append(f"{label} {nums}")
+        lines.append(" ".join(_sentence(rng) for _ in range(rng.randint(2, 6))))
+    return "\n".join(lines)
+
+
+def make_synthetic_filings(n_filings, tickers=("aapl", "msft", "goog"),
+                           years=("2018", "2019", "2020"), paras_per_section=12, seed=0):
+    """
+    Build fake EDGAR-corpus rows (cik, year, section_*) plus a CIK→ticker mapping
+    frame shaped like data_loading.load_cik_ticker_mapping().
+    """
+    import pandas as pd
+    rng = random.Random(seed)
+    ciks = {t: str(1000 + i) for i, t in enumerate(tickers)}
+    filings = []
+    for i in range(n_filings):
+        ticker = tickers[i % len(tickers)]
+        year = years[(i // len(tickers)) % len(years)]
+        row = {"cik": ciks[ticker], "year": year, "filename": f"synthetic_{i}.txt"}
+        for sec in SECTIONS:
+            row[sec] = _section_text(rng, paras_per_section)
+        filings.append(row)
+    mapping = pd.DataFrame({"ticker": list(ciks), "cik": list(ciks.values())})
+    return filings, mapping
+
+
+def make_synthetic_queries(n, filings, mapping, seed=0):
+    """Questions naming a (ticker, year) that actually exists in `filings`."""
+    rng = random.Random(seed)
+    ticker_by_cik = dict(zip(mapping.cik, mapping.ticker))
+    pairs = sorted({(ticker_by_cik[f["cik"]], f["year"]) for f in filings})
+    topics = ["Risk Factors", "Business", "MD&A", "Financial Statements"]
+    queries = []
+    for _ in range(n):
+        ticker, year = rng.choice(pairs)
+        queries.append(
+            f"In {ticker}'s {year} 10-K {rng.choice(topics)}, "
+            f"what was reported about {' '.join(rng.choices(WORDS, k=2))}?"
+        )
+    return queries
+
+
+STOPWORDS = {"the", "a", "an", "of", "and", "or", "in", "on", "to", "as", "its", "is", "was", "by", "for"}
+
+
+def content_tokens(text: str) -> set:
+    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS}
+
+
+def answer_in_text(ground_truth: str, text: str, min_recall: float = 0.6) -> bool:
+    """True when most content tokens of the ground truth appear in `text`."""
+    gt = content_tokens(ground_truth)
+    if not gt:
+        return False
+    return len(gt & content_tokens(text)) / len(gt) >= min_recall
+
+
+def run_metadata(**extra) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_results(path, payload):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"[INFO] Wrote results to {path}")
@@ -0,0 +1,100 @@
+# benchmarks/compare_embedding_backends.py
+"""
+Compare retrieval quality and latency of the "api" (OpenAI) and "local"
+(sentence-transformers, in-process) embedding backends on TEST_QUERIES.
+
+    python -m benchmarks.compare_embedding_backends --cache bench_results/chunk_df.pkl
+"""
+import argparse, os, time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import answer_in_text, latency_stats, run_metadata, write_results
+from utils_task_2.constants import TEST_QUERIES
+from utils_task_2 import instrumentation
+from utils_task_2.providers import set_provider
+
+
+def load_chunk_df(cache_path):
+    """Chunk + summarize the Task 2 corpus once, reusing a pickled copy when available."""
+    if cache_path and os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+    import utils_task_2.data_loading  as ut2_data
+    import utils_task_2.chunking      as ut2_chunking
+    import utils_task_2.summarization as ut2_summarization
+    ds = ut2_data.load_edgar_corpus()
+    ds, mapping = ut2_data.filter_dataset_by_tickers(ds)
+    chunk_df = ut2_summarization.parallel_summarize(ut2_chunking.build_chunk_df(ds, mapping))
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        chunk_df.to_pickle(cache_path)
+    return chunk_df
+
+
+def evaluate_backend(chunk_df, backend, top_k_chunk, top_k_section):
+    from utils_task_2.retrieval import get_top_k_chunks
+    from utils_task_2.embedding import load_local_model
+
+    if backend == "local":
+        load_local_model()          # warm-up outside the timed loop
+    instrumentation.reset()
+    latencies, ranks = [], []
+    for test in TEST_QUERIES:
+        t0 = time.perf_counter()
+        contexts = get_top_k_chunks(chunk_df, test["query"], top_k_chunk=top_k_chunk,
+                                    top_k_section=top_k_section, embedding_backend=backend)
+        latencies.append(time.perf_counter() - t0)
+        rank = next((i + 1 for i, c in enumerate(contexts)
+                     if answer_in_text(test["ground_truth"], c["chunk"])), None)
+        ranks.append(rank)
+
+    spans = instrumentation.snapshot()["spans"]
+    embed = spans.get("embedding", {})
+    hits = [r is not None for r in ranks]
+    return {
+        "backend":          backend,
+        "hit_rate":         float(np.mean(hits)),
+        "mrr":              float(np.mean([1 / r if r else 0.0 for r in ranks])),
+        "retrieval":        latency_stats(latencies),
+        "embedding_calls":  embed.get("count", 0),
+        "embedding_total_s": embed.get("total_s", 0.0),
+        "per_query":        [{"query": t["query"], "hit_rank": r}
+                             for t, r in zip(TEST_QUERIES, ranks)],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--backends", nargs="+", default=["api", "local"])
+    ap.add_argument("--provider", default="openai", choices=["openai", "local"],
+                    help="LLM provider for summaries and query decomposition")
+    ap.add_argument("--cache", default="bench_results/chunk_df.pkl")
+    ap.add_argument("--top-k-chunk", type=int, default=3)
+    ap.add_argument("--top-k-section", type=int, default=3)
+    ap.add_argument("--out", default="bench_results/embedding_backends.json")
+    args = ap.parse_args(argv)
+
+    set_provider(args.provider)
+    instrumentation.enable()
+    chunk_df = load_chunk_df(args.cache)
+
+    results = []
+    for backend in args.backends:
+        r = evaluate_backend(chunk_df, backend, args.top_k_chunk, args.top_k_section)
+        print(f"{backend:<6} hit_rate={r['hit_rate']:.2f}  mrr={r['mrr']:.3f}  "
+              f"p50={r['retrieval']['p50_ms']}ms  p95={r['retrieval']['p95_ms']}ms  "
+              f"embedding_total={r['embedding_total_s']:.2f}s")
+        results.append(r)
+
+    write_results(args.out, {
+        "benchmark": "embedding_backends",
+        "meta": run_metadata(provider=args.provider, n_queries=len(TEST_QUERIES),
+                             top_k_chunk=args.top_k_chunk, top_k_section=args.top_k_section),
+        "results": results,
+    })
+    return results
+
+
+if __name__ == "__main__":
+    main()
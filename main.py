@@ -1,184 +1,528 @@
-# main.py
-print("Initializing ...")
-import argparse
-import json
-import logging
-import os
-
-os.environ["OPENAI_API_KEY"] = input("Please input your OpenAI API Key to proceed:\n")
-
-from datasets import load_dataset
-from sklearn.manifold import TSNE
-
-import pandas as pd
-
-# Task 1 modules (fully qualified imports to avoid name clashes)
-import utils_task_1.parsing       as ut1_parsing
-import utils_task_1.chunking      as ut1_chunking
-import utils_task_1.embedding     as ut1_embedding
-import utils_task_1.pca           as ut1_pca
-import utils_task_1.clustering    as ut1_clustering
-import utils_task_1.visualization as ut1_vis
-
-# Task 2 modules
-import utils_task_2.data_loading     as ut2_data
-import utils_task_2.chunking         as ut2_chunking
-import utils_task_2.summarization    as ut2_summarization
-import utils_task_2.query_decomposer as ut2_decomposer
-import utils_task_2.embedding        as ut2_embedding
-import utils_task_2.retrieval        as ut2_retrieval
-import utils_task_2.answer           as ut2_answer
-
-from utils_task_2.constants import TEST_QUERIES
-
-
-def setup_logging():
-    # 1) Set your root level (or whatever you like)
-    logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s %(levelname)s: %(message)s',
-                        datefmt='%Y-%m-%d %H:%M:%S')
-
-    # 2) Silence OpenAI client info logs
-    logging.getLogger("openai").setLevel(logging.WARNING)
-    logging.getLogger("openai._base_client").setLevel(logging.WARNING)
-
-    # 3) Silence the HTTP stack (httpx / httpcore / anyio)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("httpcore").setLevel(logging.WARNING)
-    logging.getLogger("anyio").setLevel(logging.WARNING)
-
-def task_1_pipeline():
-    """Runs the Task 1 clustering & visualization pipeline."""
-    logging.info("=== Task 1 Pipeline Started ===")
-
-    # 1. Load and sample
-    logging.info("Loading EDGAR 10-K filings for 2020...")
-    ds2020 = load_dataset("eloukas/edgar-corpus", "year_2020", split="train+validation+test")
-    sample = ds2020.shuffle(seed=42)[:10]
-    logging.info(f"Sampled {len(sample)} filings.")
-
-    # 2. Load model & tokenizer
-    logging.info("Loading model and tokenizer...")
-    model, tokenizer = ut1_embedding.load_model_and_tokenizer()
-
-    # 3. Parse, group, chunk
-    logging.info("Parsing and grouping paragraphs into chunks...")
-    chunks, labels = [], []
-    for sec in sample:
-        if not sec.startswith("section_"):
-            continue
-        for text in sample[sec]:
-            paras  = ut1_parsing.parse_paragraphs(text)
-            grouped = ut1_parsing.group_paragraphs(paras)
-            for g in grouped:
-                subs = ut1_chunking.split_long_chunk(g, tokenizer)
-                chunks.extend(subs)
-                labels.extend([sec] * len(subs))
-    logging.info(f"Generated {len(chunks)} text chunks.")
-
-    # 4. Embedding
-    logging.info("Computing embeddings...")
-    embs = ut1_embedding.compute_embeddings(model, chunks)
-
-    # 5. Scale & PCA
-    logging.info("Standard scaling embeddings...")
-    embs_scaled = ut1_clustering.standard_scale_embeddings(embs)
-    logging.info("Plotting PCA variance curve...")
-    os.makedirs('plots', exist_ok=True)
-    ut1_vis.plot_pca_variance(embs_scaled, save_path='plots/pca_variance.png')
-
-    logging.info("Reducing with PCA to 200 dims...")
-    pca_embs, pca_model = ut1_pca.compute_pca(embs_scaled, n_components=200)
-    X_norm = ut1_pca.normalize_rows(pca_embs)
-
-    # 6. Choose K & KMeans
-    logging.info("Choosing K via silhouette analysis...")
-    best_k, _ = ut1_clustering.choose_k_by_silhouette(X_norm, k_min=15, k_max=80)
-    logging.info(f"Best K = {best_k}")
-    labels_k, centroids = ut1_clustering.perform_kmeans(X_norm, best_k)
-
-    # 7. Outlier detection
-    logging.info("Detecting outliers...")
-    outliers = ut1_clustering.detect_outliers(X_norm, labels_k, centroids, percentile=90)
-
-    # 8. t-SNE & visualization
-    logging.info("Computing t-SNE projections...")
-    tsne = TSNE(n_components=2, perplexity=30, random_state=42, n_iter=1000)
-    embs_2d = tsne.fit_transform(X_norm)
-
-    logging.info("Plotting clusters...")
-    ut1_vis.plot_clusters(embs_2d, labels_k, path='plots/clusters.png')
-    logging.info("Plotting outliers...")
-    ut1_vis.plot_outliers(embs_2d, outliers, path='plots/outliers.png')
-    logging.info("Plotting section labels...")
-    ut1_vis.plot_sections(embs_2d, labels, path='plots/sections.png',
-                          section_names=sorted(set(labels)))
-
-    logging.info("=== Task 1 Pipeline Completed ===")
-
-def task_2_3_pipeline():
-    """Runs the Task 2 and 3: RAG & GraphRAG QA pipeline for query testing."""
-
-    logging.info("=== Task 2 & 3 Pipeline Started ===")
-
-    # 1. Load and filter dataset
-    logging.info("Loading and filtering EDGAR corpus for selected tickers...")
-    ds = ut2_data.load_edgar_corpus()
-    ds, sample_company = ut2_data.filter_dataset_by_tickers(ds)
-
-    # 2. Build chunk_df
-    logging.info("Chunking and summarizing filings...")
-    rows = []
-    for report in ds:
-        for sec, text in report.items():
-            if not sec.startswith("section_"):
-                continue
-            for chunk in ut2_chunking.split_into_chunks(text):
-                rows.append({
-                    "chunk":         chunk,
-                    "cik":           report["cik"],
-                    "ticker":        sample_company[sample_company.cik==report['cik']].ticker.item(),
-                    "year":          report["year"],
-                    "section":       sec
-                })
-    chunk_df = pd.DataFrame(rows)
-
-    logging.info("Generating chunk summaries in parallel...")
-    chunk_df = ut2_summarization.parallel_summarize(chunk_df)
-
-    # 3. For each test, decompose, retrieve, answer, then print vs. ground truth
-    for i, test in enumerate(TEST_QUERIES, 1):
-        q = test["query"]
-        gt = test["ground_truth"]
-        logging.info(f"Test #{i}: query={q!r}")
-        try:
-            result, _ = ut2_answer.answer_query(
-                chunk_df, q,
-                top_k_chunk=3,
-                top_k_section=3,
-                include_neighbors=False
-            )
-
-            result_graph, _ = ut2_answer.graphRAG_query(
-                chunk_df, q, top_k_section=3
-            )
-        except Exception as e:
-            logging.error(f"Failed to answer test #{i}: {e}")
-            continue
-
-        print(f"\n=== Test #{i} ===")
-        print(f"Query       : {q}")
-        print(f"Ground truth: {gt}")
-        print("RAG result  :")
-        print(json.dumps(result, indent=2))
-        print("Graph RAG result  :")
-        print(json.dumps(result_graph, indent=2))
-
-    logging.info("=== Task 2 & 3 Test Harness Completed ===")
-
-if __name__ == '__main__':
-    setup_logging()
-    # os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY", "<YOUR_API_KEY_HERE>")
-    setup_logging()
-    task_1_pipeline()
-    task_2_3_pipeline()
+# main.py
+"""
+Entry point. Subcommands:
+
+    python main.py                  # Task 1 alongside the Task 2 & 3 test harness (default)
+    python main.py all --sequential # the same, one after the other
+    python main.py task1            # Task 1 clustering & visualization
+    python main.py ingest           # build/refresh the persisted chunk store
+    python main.py query "..."      # answer one question from the chunk store
+    python main.py eval             # run TEST_QUERIES against the chunk store
+    python main.py serve --port 8080
+
+Heavy libraries (datasets, torch/sentence-transformers, scikit-learn,
+llama_index) are imported only by the subcommands that use them. The API key
+comes from OPENAI_API_KEY; it is prompted for only on an interactive terminal.
+"""
+import argparse
+import getpass
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils_task_2 import instrumentation
+
+
+def setup_logging():
+    # 1) Set your root level (or whatever you like)
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    # 2) Silence OpenAI client info logs
+    logging.getLogger("openai").setLevel(logging.WARNING)
+    logging.getLogger("openai._base_client").setLevel(logging.WARNING)
+
+    # 3) Silence the HTTP stack (httpx / httpcore / anyio)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("httpcore").setLevel(logging.WARNING)
+    logging.getLogger("anyio").setLevel(logging.WARNING)
+
+def export_metrics(out_dir=None):
+    """Dump collected spans/token counters as JSON lines and a Prometheus text file."""
+    if not instrumentation.is_enabled():
+        return
+    out_dir = out_dir or os.environ.get("TENK_METRICS_DIR", "metrics")
+    instrumentation.export_jsonl(os.path.join(out_dir, "metrics.jsonl"))
+    instrumentation.export_prometheus(os.path.join(out_dir, "metrics.prom"))
+    logging.info(f"Metrics written to {out_dir}/")
+
+def ensure_api_key():
+    """
+    Make sure OPENAI_API_KEY is set (not needed with TENK_PROVIDER=local).
+    Prompts only when stdin is a terminal, so scripts and services never block.
+    """
+    if os.environ.get("OPENAI_API_KEY") or os.environ.get("TENK_PROVIDER") == "local":
+        return
+    if not sys.stdin.isatty():
+        sys.exit("OPENAI_API_KEY is not set (or use TENK_PROVIDER=local for the offline provider)")
+    os.environ["OPENAI_API_KEY"] = getpass.getpass("Please input your OpenAI API Key to proceed:\n")
+
+def task_1_pipeline(k_min=15, k_max=80, outlier_percentile=90, n_components=200,
+                    tsne_perplexity=30, tsne_iter=1000, sample_size=10, seed=42,
+                    checkpoint_dir=None, use_checkpoints=True, sample=None, cpu_workers=1):
+    """
+    Runs the Task 1 clustering & visualization pipeline.
+    Every stage (sample, chunks, embeddings, scaled matrix, PCA, K sweep,
+    KMeans, t-SNE) is checkpointed under a fingerprint of its inputs and
+    parameters, so a rerun resumes from the first stage whose fingerprint
+    changed (see utils_task_1/checkpoints.py).
+    `sample` is the already loaded filing sample (see load_shared_data);
+    `cpu_workers` processes run the K sweep and t-SNE neighbour search.
+    """
+    # Task 1 modules (fully qualified imports to avoid name clashes)
+    import utils_task_1.parsing       as ut1_parsing
+    import utils_task_1.chunking      as ut1_chunking
+    import utils_task_1.embedding     as ut1_embedding
+    import utils_task_1.pca           as ut1_pca
+    import utils_task_1.clustering    as ut1_clustering
+    import utils_task_1.visualization as ut1_vis
+    import utils_task_1.checkpoints   as ut1_ckpt
+
+    logging.info("=== Task 1 Pipeline Started ===")
+    ckpt = ut1_ckpt.StageCheckpoints(checkpoint_dir or ut1_ckpt.DEFAULT_CHECKPOINT_DIR,
+                                     enabled=use_checkpoints)
+    fp = ut1_ckpt.fingerprint
+
+    # 1. Load and sample
+    def load_sample():
+        if sample is not None:
+            return sample
+        from datasets import load_dataset
+        logging.info("Loading EDGAR 10-K filings for 2020...")
+        with instrumentation.span("task1.load"):
+            ds2020 = load_dataset("eloukas/edgar-corpus", "year_2020", split="train+validation+test")
+            loaded = ds2020.shuffle(seed=seed)[:sample_size]
+        logging.info(f"Sampled {len(loaded)} filings.")
+        return loaded
+    fp_sample = fp("sample", "eloukas/edgar-corpus", "year_2020", seed, sample_size)
+    get_sample = ckpt.lazy("sample", fp_sample, load_sample)
+
+    # 2. Load model & tokenizer (only if chunking or embedding has to run)
+    model_cache = []
+    def get_model():
+        if not model_cache:
+            logging.info("Loading model and tokenizer...")
+            with instrumentation.span("task1.load_model"):
+                model_cache.append(ut1_embedding.load_model_and_tokenizer())
+        return model_cache[0]
+
+    # 3. Parse, group, chunk
+    def make_chunks():
+        sample = get_sample()
+        _, tokenizer = get_model()
+        logging.info("Parsing and grouping paragraphs into chunks...")
+        chunks, labels = [], []
+        with instrumentation.span("task1.chunk"):
+            for sec in sample:
+                if not sec.startswith("section_"):
+                    continue
+                for text in sample[sec]:
+                    for g in ut1_parsing.split_into_groups(text):
+                        subs = ut1_chunking.split_long_chunk(g, tokenizer)
+                        chunks.extend(subs)
+                        labels.extend([sec] * len(subs))
+        return chunks, labels
+    fp_chunks = fp("chunks", fp_sample, ut1_embedding.DEFAULT_MODEL_NAME)
+    get_chunks = ckpt.lazy("chunks", fp_chunks, make_chunks)
+
+    # 4. Embedding (memory-mapped .npy)
+    def make_embeddings():
+        chunks, _ = get_chunks()
+        model, _ = get_model()
+        logging.info("Computing embeddings...")
+        with instrumentation.span("task1.embed", n_chunks=len(chunks)):
+            return ut1_embedding.compute_embeddings(model, chunks)
+    fp_embs = fp("embeddings", fp_chunks)
+    get_embs = ckpt.lazy("embeddings", fp_embs, make_embeddings, kind="npy")
+
+    # 5. Scale & PCA
+    def make_scaled():
+        logging.info("Standard scaling embeddings...")
+        with instrumentation.span("task1.scale"):
+            return ut1_clustering.standard_scale_embeddings(get_embs())
+    fp_scaled = fp("scaled", fp_embs)
+    get_scaled = ckpt.lazy("scaled", fp_scaled, make_scaled, kind="npy")
+
+    def make_pca():
+        logging.info(f"Reducing with PCA to {n_components} dims...")
+        with instrumentation.span("task1.pca"):
+            pca_embs, _ = ut1_pca.compute_pca(get_scaled(), n_components=n_components)
+            return ut1_pca.normalize_rows(pca_embs)
+    fp_pca = fp("pca", fp_scaled, n_components)
+    get_X_norm = ckpt.lazy("pca", fp_pca, make_pca, kind="npy")
+
+    # 6. Choose K & KMeans
+    def make_k():
+        logging.info("Choosing K via silhouette analysis...")
+        with instrumentation.span("task1.k_sweep"):
+            best_k, _ = ut1_clustering.choose_k_by_silhouette(get_X_norm(), k_min=k_min, k_max=k_max,
+                                                              n_jobs=cpu_workers)
+        return best_k
+    fp_k = fp("k_sweep", fp_pca, k_min, k_max)
+    best_k = ckpt.run("k_sweep", fp_k, make_k)
+    logging.info(f"Best K = {best_k}")
+
+    def make_kmeans():
+        with instrumentation.span("task1.kmeans", k=best_k):
+            return ut1_clustering.perform_kmeans(get_X_norm(), best_k)
+    labels_k, centroids = ckpt.run("kmeans", fp("kmeans", fp_pca, best_k), make_kmeans)
+
+    # 7. Outlier detection (cheap, never checkpointed)
+    logging.info("Detecting outliers...")
+    outliers = ut1_clustering.detect_outliers(get_X_norm(), labels_k, centroids,
+                                              percentile=outlier_percentile)
+
+    # 8. t-SNE & visualization
+    def make_projection():
+        from sklearn.manifold import TSNE
+        logging.info("Computing t-SNE projections...")
+        with instrumentation.span("task1.tsne"):
+            tsne = TSNE(n_components=2, perplexity=tsne_perplexity, random_state=seed, max_iter=tsne_iter,
+                        n_jobs=cpu_workers)
+            return tsne.fit_transform(get_X_norm())
+    fp_tsne = fp("projection", fp_pca, tsne_perplexity, tsne_iter, seed)
+    embs_2d = ckpt.run("projection", fp_tsne, make_projection, kind="npy")
+
+    os.makedirs('plots', exist_ok=True)
+    if "scaled" in ckpt.misses or not os.path.exists('plots/pca_variance.png'):
+        logging.info("Plotting PCA variance curve...")
+        ut1_vis.plot_pca_variance(get_scaled(), save_path='plots/pca_variance.png')
+
+    logging.info("Plotting clusters...")
+    ut1_vis.plot_clusters(embs_2d, labels_k, path='plots/clusters.png')
+    logging.info("Plotting outliers...")
+    ut1_vis.plot_outliers(embs_2d, outliers, path='plots/outliers.png')
+    logging.info("Plotting section labels...")
+    _, labels = get_chunks()
+    ut1_vis.plot_sections(embs_2d, labels, path='plots/sections.png',
+                          section_names=sorted(set(labels)))
+
+    if use_checkpoints:
+        logging.info(f"Checkpoints reused: {ckpt.hits or 'none'}; recomputed: {ckpt.misses or 'none'}")
+    logging.info("=== Task 1 Pipeline Completed ===")
+
+def run_test_queries(chunk_df, engines=("rag", "graph")):
+    """Answer every TEST_QUERIES entry and print the results next to the ground truth."""
+    import utils_task_2.answer as ut2_answer
+    from utils_task_2.constants import TEST_QUERIES
+
+    for i, test in enumerate(TEST_QUERIES, 1):
+        q = test["query"]
+        gt = test["ground_truth"]
+        logging.info(f"Test #{i}: query={q!r}")
+        result = result_graph = None
+        try:
+            if "rag" in engines:
+                with instrumentation.span("query", engine="rag", test=i):
+                    result, _ = ut2_answer.answer_query(
+                        chunk_df, q,
+                        top_k_chunk=3,
+                        top_k_section=3,
+                        include_neighbors=False
+                    )
+
+            if "graph" in engines:
+                with instrumentation.span("query", engine="graph", test=i):
+                    result_graph, _ = ut2_answer.graphRAG_query(
+                        chunk_df, q, top_k_section=3
+                    )
+        except Exception as e:
+            logging.error(f"Failed to answer test #{i}: {e}")
+            continue
+
+        print(f"\n=== Test #{i} ===")
+        print(f"Query       : {q}")
+        print(f"Ground truth: {gt}")
+        if "rag" in engines:
+            print("RAG result  :")
+            print(json.dumps(result, indent=2))
+        if "graph" in engines:
+            print("Graph RAG result  :")
+            print(json.dumps(result_graph, indent=2))
+
+def task_2_3_pipeline(lazy_summaries=False, reports=None, mapping=None, summarize_workers=None):
+    """
+    Runs the Task 2 and 3: RAG & GraphRAG QA pipeline for query testing.
+    With `lazy_summaries`, ingest only embeds raw chunks; answer_query summarizes
+    the few chunks it actually uses, on demand. `reports` / `mapping` are the
+    already filtered corpus (see load_shared_data); `summarize_workers` caps
+    the concurrent summarizer calls.
+    """
+    import utils_task_2.chunk_store as ut2_store
+
+    logging.info("=== Task 2 & 3 Pipeline Started ===")
+
+    # 1-2. Load, filter, chunk, then summarize (or embed, in lazy mode)
+    chunk_df = ut2_store.build_chunk_df_from_corpus(lazy_summaries, reports=reports, mapping=mapping,
+                                                    summarize_workers=summarize_workers)
+
+    # 3. For each test, decompose, retrieve, answer, then print vs. ground truth
+    run_test_queries(chunk_df)
+
+    logging.info("=== Task 2 & 3 Test Harness Completed ===")
+    export_metrics()
+
+def load_shared_data(sample_size=10, seed=42):
+    """
+    Load every EDGAR year once for both pipelines: Task 1's shuffled 2020
+    sample, and Task 2's ticker-filtered filings plus CIK→ticker mapping.
+    """
+    import utils_task_2.data_loading as ut2_data
+    import utils_task_2.chunk_store  as ut2_store
+    from utils_task_2.constants import ALLOWED_YEARS
+
+    logging.info("Loading EDGAR corpus once for Task 1 and Task 2...")
+    with instrumentation.span("shared_load"):
+        per_year = ut2_data.load_edgar_years(sorted(set(ALLOWED_YEARS) | {"2020"}))
+        sample = per_year["2020"].shuffle(seed=seed)[:sample_size]
+        reports, mapping = ut2_store.load_filtered_corpus(per_year=per_year)
+    return sample, reports, mapping
+
+def default_cpu_workers():
+    """Every core but one, which stays with the I/O-bound pipeline in the parent."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def _timed_call(fn, kwargs):
+    t0 = time.perf_counter()
+    result = fn(**kwargs)
+    return result, time.perf_counter() - t0
+
+def _run_with_cpu_budget(fn, kwargs, cpu_workers):
+    """Worker-process entry point: fn(**kwargs) with native thread pools capped at `cpu_workers`."""
+    from threadpoolctl import threadpool_limits
+
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(cpu_workers)      # libraries not imported yet (torch) read these
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    setup_logging()
+    with threadpool_limits(limits=cpu_workers):
+        return _timed_call(fn, {**kwargs, "cpu_workers": cpu_workers})
+
+def run_pipelines(cpu_job, io_job, cpu_workers=None, sequential=False):
+    """
+    Run a CPU-bound and an I/O-bound pipeline, each given as (fn, kwargs).
+
+    Overlapped (default): cpu_job runs in one spawned process whose BLAS /
+    OpenMP threads and worker processes (fn's `cpu_workers` argument) are
+    limited to the CPU budget, while io_job runs here with its own concurrency
+    budget (e.g. summarize_workers). Sequential: cpu_job, then io_job, both
+    in this process. Returns the wall and per-pipeline times in seconds.
+    """
+    cpu_fn, cpu_kwargs = cpu_job
+    io_fn, io_kwargs = io_job
+    cpu_workers = cpu_workers or default_cpu_workers()
+    mode = "sequential" if sequential else "overlapped"
+    t0 = time.perf_counter()
+    with instrumentation.span("pipelines", mode=mode, cpu_workers=cpu_workers):
+        if sequential:
+            _, cpu_s = _timed_call(cpu_fn, {**cpu_kwargs, "cpu_workers": cpu_workers})
+            _, io_s = _timed_call(io_fn, io_kwargs)
+        else:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                cpu_future = pool.submit(_run_with_cpu_budget, cpu_fn, cpu_kwargs, cpu_workers)
+                _, io_s = _timed_call(io_fn, io_kwargs)
+                _, cpu_s = cpu_future.result()
+    wall_s = time.perf_counter() - t0
+    for name, seconds in (("cpu", cpu_s), ("io", io_s), ("wall", wall_s)):
+        instrumentation.record_duration("pipelines_s", seconds, mode=mode, part=name)
+    return {"mode": mode, "cpu_workers": cpu_workers, "wall_s": round(wall_s, 3),
+            "cpu_s": round(cpu_s, 3), "io_s": round(io_s, 3)}
+
+def cmd_all(args):
+    """Task 1 and the Task 2 & 3 harness on one shared dataset load, overlapped unless --sequential."""
+    t0 = time.perf_counter()
+    sample, reports, mapping = load_shared_data()
+    load_s = time.perf_counter() - t0
+    t = run_pipelines(
+        (task_1_pipeline, {"sample": sample}),
+        (task_2_3_pipeline, {"lazy_summaries": args.lazy_summaries, "reports": reports,
+                             "mapping": mapping, "summarize_workers": args.io_concurrency}),
+        cpu_workers=args.cpu_workers, sequential=args.sequential,
+    )
+    print(f"[INFO] {t['mode']} run: shared load {load_s:.1f}s, then wall {t['wall_s']:.1f}s "
+          f"(Task 1 {t['cpu_s']:.1f}s on {t['cpu_workers']} CPU workers, Task 2/3 {t['io_s']:.1f}s; "
+          f"back to back {t['cpu_s'] + t['io_s']:.1f}s)")
+
+def cmd_ingest(args):
+    import utils_task_2.chunk_store as ut2_store
+    try:
+        report = ut2_store.ingest(args.chunk_store, lazy_summaries=args.lazy_summaries or None,
+                                  rebuild=args.rebuild, dedup=not args.no_dedup)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"[INFO] Ingest into {args.chunk_store}: {len(report['new'])} new, "
+          f"{len(report['changed'])} changed, {len(report['unchanged'])} unchanged filings "
+          f"({report['chunks_added']} chunks added)")
+    dedup = report.get("dedup")
+    if dedup:
+        print(f"[INFO] Dedup: {dedup['duplicates']}/{dedup['chunks']} duplicate chunks "
+              f"({dedup['dedup_ratio']:.1%}), calls saved: {dedup['calls_saved']}")
+    export_metrics()
+
+def cmd_query(args):
+    import utils_task_2.chunk_store as ut2_store
+    import utils_task_2.fact_index  as ut2_facts
+    from utils_task_2.answer_cache import load_answer_cache, cached_answer
+    from utils_task_2.resilience import deadline
+
+    chunk_df = ut2_store.load_chunk_store(args.chunk_store, lazy_summaries=args.lazy_summaries or None)
+    facts = None if args.no_fact_index else ut2_facts.load_fact_index(args.chunk_store)
+    cache = None if args.no_cache else load_answer_cache(args.chunk_store)
+    hit = facts.answer(args.question) if facts is not None and args.engine in ("rag", "both") else None
+    out = {}
+    if hit is not None:
+        out["rag"] = hit[0]
+    elif args.stream and args.engine in ("rag", "both"):
+        with deadline(args.timeout):
+            out["rag"] = stream_answer(chunk_df, args)
+    elif args.engine in ("rag", "both"):
+        with deadline(args.timeout), instrumentation.span("query", engine="rag"):
+            out["rag"], _ = cached_answer(
+                cache, "rag", chunk_df, args.question,
+                top_k_chunk=args.top_k_chunk,
+                top_k_section=args.top_k_section,
+                include_neighbors=False
+            )
+    if args.engine in ("graph", "both"):
+        with deadline(args.timeout), instrumentation.span("query", engine="graph"):
+            out["graph"], _ = cached_answer(
+                cache, "graph", chunk_df, args.question, top_k_section=args.top_k_section
+            )
+    if cache is not None:
+        cache.save()
+    print(json.dumps(out, indent=2))
+    export_metrics()
+
+def stream_answer(chunk_df, args):
+    """Print the RAG answer as it is generated, then the timings of each stage."""
+    import utils_task_2.answer as ut2_answer
+
+    with instrumentation.span("query", engine="rag", stream=True):
+        for ev in ut2_answer.answer_query_stream(
+            chunk_df, args.question,
+            top_k_chunk=args.top_k_chunk,
+            top_k_section=args.top_k_section,
+            include_neighbors=False
+        ):
+            if ev["event"] == "delta":
+                print(ev["text"], end="", flush=True)
+            elif ev["event"] == "generation_start":
+                retrieval_s = ev["t"]
+            elif ev["event"] == "final":
+                print()
+                ttft = f"{ev['ttft_s'] * 1000:.0f}ms" if ev["ttft_s"] is not None else "n/a"
+                print(f"[INFO] retrieval+packing {retrieval_s * 1000:.0f}ms, "
+                      f"first token {ttft}, total {ev['t'] * 1000:.0f}ms")
+                return ev["result"]
+
+def cmd_eval(args):
+    import utils_task_2.chunk_store as ut2_store
+    from utils_task_2.evaluation import evaluate
+    chunk_df = ut2_store.load_chunk_store(args.chunk_store, lazy_summaries=args.lazy_summaries or None)
+    code = evaluate(chunk_df, args)
+    export_metrics()
+    if code:
+        sys.exit(code)
+
+def build_parser():
+    from utils_task_2.chunk_store import DEFAULT_CHUNK_STORE
+    from utils_task_2.evaluation import add_arguments as add_eval_arguments
+
+    ap = argparse.ArgumentParser(description="10-K filing analysis & QA pipeline")
+    sub = ap.add_subparsers(dest="command")
+
+    a = sub.add_parser("all", help="Task 1 and the Task 2 & 3 harness (the default command)")
+    a.add_argument("--sequential", action="store_true",
+                   help="run Task 1 to completion before Task 2 & 3 instead of alongside it")
+    a.add_argument("--cpu-workers", type=int, default=None,
+                   help="process/thread budget for Task 1 (default: all cores but one)")
+    a.add_argument("--io-concurrency", type=int, default=None,
+                   help="concurrent summarizer calls in Task 2 (default SUMMARIZE_CONCURRENCY)")
+    a.add_argument("--lazy-summaries", action="store_true",
+                   default=os.environ.get("TENK_LAZY_SUMMARIES") == "1",
+                   help="embed raw chunks, summarize on demand")
+
+    t1 = sub.add_parser("task1", help="Task 1: embed, cluster and plot 10-K sections")
+    t1.add_argument("--k-min", type=int, default=15)
+    t1.add_argument("--k-max", type=int, default=80)
+    t1.add_argument("--outlier-percentile", type=float, default=90)
+    t1.add_argument("--n-components", type=int, default=200)
+    t1.add_argument("--perplexity", type=float, default=30)
+    t1.add_argument("--checkpoint-dir", default=None)
+    t1.add_argument("--no-checkpoints", action="store_true",
+                    help="recompute every stage and do not save artifacts")
+
+    store = argparse.ArgumentParser(add_help=False)
+    store.add_argument("--chunk-store", default=DEFAULT_CHUNK_STORE)
+    store.add_argument("--lazy-summaries", action="store_true",
+                       default=os.environ.get("TENK_LAZY_SUMMARIES") == "1",
+                       help="embed raw chunks at ingest, summarize on demand (new stores only)")
+
+    i = sub.add_parser("ingest", parents=[store],
+                       help="add new/changed filings to the Task 2 chunk store")
+    i.add_argument("--rebuild", action="store_true", help="re-ingest every filing from scratch")
+    i.add_argument("--no-dedup", action="store_true",
+                   help="summarize and embed near-duplicate chunks separately")
+
+    q = sub.add_parser("query", parents=[store], help="answer one question")
+    q.add_argument("question")
+    q.add_argument("--engine", choices=("rag", "graph", "both"), default="rag")
+    q.add_argument("--top-k-chunk", type=int, default=3)
+    q.add_argument("--top-k-section", type=int, default=3)
+    q.add_argument("--stream", action="store_true",
+                   help="print the RAG answer as it is generated, with time to first token")
+    q.add_argument("--timeout", type=float, default=None,
+                   help="seconds for the whole query (decomposition, embedding and answering)")
+    q.add_argument("--no-cache", action="store_true",
+                   help="do not reuse (or store) answers to similar questions about the same filing")
+    q.add_argument("--no-fact-index", action="store_true",
+                   help="always run RAG, even for numeric questions the fact index can answer")
+
+    e = sub.add_parser("eval", parents=[store],
+                       help="score RAG and GraphRAG on TEST_QUERIES, gate on a baseline")
+    add_eval_arguments(e)
+
+    sub.add_parser("serve", add_help=False,
+                   help="long-running query server (see utils_task_2/server.py --help)")
+    return ap
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args, extra = build_parser().parse_known_args(argv)
+
+    if args.command == "serve":
+        if not {"-h", "--help"} & set(extra):
+            ensure_api_key()
+        from utils_task_2 import server
+        return server.main(extra)
+    if extra:
+        build_parser().error(f"unrecognized arguments: {' '.join(extra)}")
+
+    setup_logging()
+    if args.command is None:
+        args = build_parser().parse_args(["all"])
+    if args.command == "task1":
+        task_1_pipeline(k_min=args.k_min, k_max=args.k_max,
+                        outlier_percentile=args.outlier_percentile,
+                        n_components=args.n_components,
+                        tsne_perplexity=args.perplexity,
+                        checkpoint_dir=args.checkpoint_dir,
+                        use_checkpoints=not args.no_checkpoints)
+        return
+    ensure_api_key()
+    if args.command == "ingest":
+        cmd_ingest(args)
+    elif args.command == "query":
+        cmd_query(args)
+    elif args.command == "eval":
+        cmd_eval(args)
+    else:
+        cmd_all(args)
+
+if __name__ == '__main__':
+    main()
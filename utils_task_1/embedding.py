@@ -1,12 +1,13 @@
-"""
-Model loading and embedding computation.
-"""
-from sentence_transformers import SentenceTransformer
-
-def load_model_and_tokenizer(model_name='sentence-transformers/all-mpnet-base-v2'):
-    model = SentenceTransformer(model_name)
-    return model, model.tokenizer
-
-
-def compute_embeddings(model, texts):
+"""
+Model loading and embedding computation.
+"""
+DEFAULT_MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+
+def load_model_and_tokenizer(model_name=DEFAULT_MODEL_NAME):
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    return model, model.tokenizer
+
+
+def compute_embeddings(model, texts):
     return model.encode(texts, show_progress_bar=True)
\ No newline at end of file
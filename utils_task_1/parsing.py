@@ -1,75 +1,100 @@
-"""
-Parsing utilities: convert raw text to cleaned paragraphs and group them.
-"""
-
-def parse_paragraphs(text, min_word_threshold=10, sentence_endings={'.','!','?'}):
-    """
-    Splits raw text into lines, filters empties, then merges lines lacking terminal punctuation.
-    Returns a list of cleaned paragraphs.
-    """
-    raw = [line.strip() for line in text.splitlines() if line.strip()]
-    merged = []
-    buffer = None
-    for line in raw:
-        if buffer is None:
-            buffer = line
-        else:
-            if buffer[-1] not in sentence_endings:
-                buffer += ' ' + line
-            else:
-                merged.append(buffer)
-                buffer = line
-    if buffer:
-        merged.append(buffer)
-    return merged
-
-
-def is_strange(para, min_word_threshold=10, ending_punctuations={'.','!','?'}):
-    """
-    Flags paragraphs that:
-      - lack ending punctuation,
-      - have fewer than min_word_threshold words,
-      - or are title-cased / ALL-CAPS (likely headers).
-    """
-    text = para.strip()
-    if not text:
-        return True
-    if text[-1] not in ending_punctuations:
-        return True
-    words = text.split()
-    if len(words) < min_word_threshold:
-        return True
-    if text.istitle() or text.isupper():
-        return True
-    return False
-
-
-def group_paragraphs(paragraphs, min_word_threshold=10):
-    """
-    Groups paragraphs starting at a 'strange' (header) paragraph,
-    collecting until the next 'strange' after at least one normal paragraph.
-    Returns a list of text chunks.
-    """
-    groups = []
-    current = []
-    has_normal = False
-    for para in paragraphs:
-        flag = is_strange(para, min_word_threshold)
-        if not current:
-            if flag:
-                current = [para]
-                has_normal = False
-            else:
-                groups.append(para)
-        else:
-            if flag and has_normal:
-                groups.append("\n".join(current))
-                current = [para]
-                has_normal = False
-            else:
-                current.append(para)
-                if not flag:
-                    has_normal = True
-    if current:
-        groups.append("\n".join(current))
-    return groups
\ No newline at end of file
+"""
+Parsing utilities: convert raw text to cleaned paragraphs and group them.
+Shared by Task 1 and Task 2 (utils_task_2.parsing re-exports these).
+"""
+
+SENTENCE_ENDINGS = frozenset('.!?')
+
+
+def _paragraphs_with_flags(text, min_word_threshold=10, sentence_endings=SENTENCE_ENDINGS):
+    """
+    Single pass over the lines of `text`: merge lines lacking terminal punctuation
+    into paragraphs (joined once, not grown line by line) and flag each paragraph
+    with is_strange(), reusing the per-line word counts instead of re-splitting.
+    Returns (paragraphs, flags).
+    """
+    paragraphs, flags = [], []
+    parts, n_words = [], 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        parts.append(line)
+        n_words += len(line.split())
+        if line[-1] in sentence_endings:
+            para = ' '.join(parts)
+            paragraphs.append(para)
+            flags.append(n_words < min_word_threshold or para.istitle() or para.isupper())
+            parts, n_words = [], 0
+    if parts:
+        # the last paragraph lacks ending punctuation, so it is always strange
+        paragraphs.append(' '.join(parts))
+        flags.append(True)
+    return paragraphs, flags
+
+
+def parse_paragraphs(text, min_word_threshold=10, sentence_endings=SENTENCE_ENDINGS):
+    """
+    Splits raw text into lines, filters empties, then merges lines lacking terminal punctuation.
+    Returns a list of cleaned paragraphs.
+    """
+    return _paragraphs_with_flags(text, min_word_threshold, sentence_endings)[0]
+
+
+def is_strange(para, min_word_threshold=10, ending_punctuations=SENTENCE_ENDINGS):
+    """
+    Flags paragraphs that:
+      - lack ending punctuation,
+      - have fewer than min_word_threshold words,
+      - or are title-cased / ALL-CAPS (likely headers).
+    """
+    text = para.strip()
+    if not text:
+        return True
+    if text[-1] not in ending_punctuations:
+        return True
+    words = text.split()
+    if len(words) < min_word_threshold:
+        return True
+    if text.istitle() or text.isupper():
+        return True
+    return False
+
+
+def group_paragraphs(paragraphs, min_word_threshold=10, flags=None):
+    """
+    Groups paragraphs starting at a 'strange' (header) paragraph,
+    collecting until the next 'strange' after at least one normal paragraph.
+    `flags` are precomputed is_strange() results (see split_into_groups).
+    Returns a list of text chunks.
+    """
+    if flags is None:
+        flags = [is_strange(p, min_word_threshold) for p in paragraphs]
+    groups = []
+    current = []
+    has_normal = False
+    for para, flag in zip(paragraphs, flags):
+        if not current:
+            if flag:
+                current = [para]
+                has_normal = False
+            else:
+                groups.append(para)
+        else:
+            if flag and has_normal:
+                groups.append("\n".join(current))
+                current = [para]
+                has_normal = False
+            else:
+                current.append(para)
+                if not flag:
+                    has_normal = True
+    if current:
+        groups.append("\n".join(current))
+    return groups
+
+
+def split_into_groups(text, min_word_threshold=10):
+    """parse_paragraphs + group_paragraphs, with each paragraph classified only once."""
+    paragraphs, flags = _paragraphs_with_flags(text, min_word_threshold)
+    return group_paragraphs(paragraphs, min_word_threshold, flags)
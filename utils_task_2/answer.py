@@ -1,153 +1,358 @@
-# utils_task_2/answer.py
-
-import json
-from openai import OpenAI
-from utils_task_2.retrieval import get_top_k_chunks
-from utils_task_2.summarization import retry_on_exception
-from utils_task_2.retrieval import get_query_targets
-
-from llama_index.llms import openai
-from llama_index.core.graph_stores import SimpleGraphStore
-from llama_index.embeddings.openai import OpenAIEmbedding
-
-from llama_index.core import (
-    Document,
-    ServiceContext,
-    StorageContext,
-    KnowledgeGraphIndex,
-    Settings
-)
-
-client = OpenAI()
-
-@retry_on_exception
-def answer_query(
-    chunk_df,
-    user_query: str,
-    top_k_chunk: int = 2,
-    top_k_section: int = 2,
-    include_neighbors: bool = True
-) -> dict:
-    """
-    Retrieves contexts via get_top_k_chunks and then asks the LLM for:
-      - answer     : string
-      - explanation: which context numbers were used
-      - relevance  : boolean
-    """
-    # 1) fetch contexts (with neighbors if desired)
-    contexts = get_top_k_chunks(
-        chunk_df,
-        user_query,
-        top_k_chunk=top_k_chunk,
-        top_k_section=top_k_section,
-        include_neighbors=include_neighbors
-    )[:5]
-    print(f"[INFO] Retrieved {len(contexts)} contexts for answering")
-
-    # 2) build numbered summary block
-    context_block = "\n".join(
-        f"{i+1}. [{c['section_name']}] ({c['ticker']}, {c['year']}) "
-        f"(sim={c['similarity']:.3f}): {c['chunk_summary']}"
-        for i, c in enumerate(contexts)
-    )
-
-    system_prompt = f"""
-You are an expert financial QA assistant. You have the following {len(contexts)} context chunks
-extracted from SEC 10‑K filings, each labeled with its section, company, year, similarity score,
-and a brief summary:
-
-{context_block}
-
-Your task:
-- Answer the user's question **using only** the information in these contexts.
-- Provide a concise **answer**.
-- Provide a brief **explanation** stating which context numbers you used and why.
-- Set **relevance** to true if those contexts fully support your answer, else false.
-
-Respond **only** with JSON in this format:
-{{"answer":"...", "explanation":"...", "relevance":true}}
-
-Example:
-{{"answer":"$1.2 billion","explanation":"Based on context 1 which reports net cash flow...","relevance":true}}
-"""
-
-    response = client.responses.create(
-        model="gpt-4.1-2025-04-14",
-        input=[
-            {"role": "system",  "content": system_prompt},
-            {"role": "user",    "content": user_query}
-        ],
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": "qa_response",
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "answer":      {"type": "string"},
-                        "explanation": {"type": "string"},
-                        "relevance":   {"type": "boolean"}
-                    },
-                    "required": ["answer","explanation","relevance"],
-                    "additionalProperties": False
-                },
-                "strict": True
-            }
-        }
-    )
-
-    return json.loads(response.output_text), contexts
-
-
-
-def graphRAG_query(chunk_df, user_query, top_k_section=3):
-    
-    targets     = get_query_targets(user_query, k=top_k_section)
-    ticker      = targets["ticker"]
-    year        = targets["year"]
-    section_ids = targets["section_ids"]
-    data_item   = targets["data_item"]
-    df_filt = chunk_df[
-        (chunk_df.ticker == ticker) &
-        (chunk_df.year   == year) &
-        (chunk_df.section.isin(section_ids))
-    ]
-
-    # --- 1) Prepare your documents ---
-    documents = [
-        Document(text=row["chunk"])
-        for _, row in df_filt.iterrows()
-    ]
-
-    # --- 2) Choose an LLM for *graph construction* (triplet extraction) ---
-    Settings.llm = openai.OpenAI(model="gpt-4.1-nano-2025-04-14", temperature=0)
-
-    # (Optionally also pick an embedder if you need to override default)
-    Settings.embed_model = OpenAIEmbedding(
-        model="text-embedding-3-small"
-    )
-
-    # --- 3) Build your in‑memory graph index ---
-    graph_store    = SimpleGraphStore()
-    storage_ctx    = StorageContext.from_defaults(graph_store=graph_store)
-
-    kg_index = KnowledgeGraphIndex.from_documents(
-        documents,
-        max_triplets_per_chunk=10,
-        storage_context=storage_ctx,
-        include_embeddings=True
-    )
-
-    # --- 4) Now switch to your *query* LLM ---
-    Settings.llm = openai.OpenAI(
-        model="gpt-4.1-2025-04-14",  # higher‑capable model for final answers
-        temperature=0.0,
-    )
-    
-    query_engine = kg_index.as_query_engine(graph_traversal_depth=3)
-
-    response = query_engine.query(
-        user_query
-    )
-    
-    return response.response, [node.text for node in response.source_nodes]
+# utils_task_2/answer.py
+
+import re, json, time, logging, threading
+from collections import OrderedDict
+from utils_task_2.providers import get_client
+from utils_task_2.retrieval import get_top_k_chunks
+from utils_task_2.summarization import summarize_on_demand
+from utils_task_2.resilience import resilient, request_options
+from utils_task_2.retrieval import get_query_targets
+from utils_task_2.logging_utils import log_usage
+from utils_task_2 import instrumentation
+from utils_task_2.context_packing import pack_contexts, format_context
+from utils_task_2.graph_index import (
+    TripletCache, build_kg_index, open_graph_store, content_key, precompute_in_background
+)
+
+ANSWER_MODEL = "gpt-4.1-2025-04-14"
+
+QA_RESPONSE_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "qa_response",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "answer":      {"type": "string"},
+                "explanation": {"type": "string"},
+                "relevance":   {"type": "boolean"}
+            },
+            "required": ["answer","explanation","relevance"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+
+
+def _answer_prompt(chunk_df, user_query, top_k_chunk, top_k_section, include_neighbors,
+                   embedding_backend, token_budget, targets=None):
+    """Retrieve and pack contexts; returns (system prompt, contexts)."""
+    # 1) fetch contexts (with neighbors if desired)
+    with instrumentation.span("retrieve", engine="rag"):
+        contexts = get_top_k_chunks(
+            chunk_df,
+            user_query,
+            top_k_chunk=top_k_chunk,
+            top_k_section=top_k_section,
+            include_neighbors=include_neighbors,
+            embedding_backend=embedding_backend,
+            targets=targets
+        )
+    print(f"[INFO] Retrieved {len(contexts)} contexts for answering")
+
+    # 2) pack raw excerpts / summaries into the token budget; in lazy mode the
+    #    summaries the packer asks for are generated (and cached) in one parallel batch
+    with instrumentation.span("pack_contexts") as sp:
+        contexts, report = pack_contexts(
+            contexts, token_budget=token_budget,
+            summarize=lambda cs: summarize_on_demand(chunk_df, [c["row_id"] for c in cs])
+        )
+        sp.set(**report)
+    logging.info(
+        f"Packed {report['selected']}/{report['candidates']} contexts into "
+        f"{report['used_tokens']}/{token_budget} tokens "
+        f"(previous prompt: {report['baseline_tokens']}; {report['duplicates_dropped']} duplicates dropped, "
+        f"{report['summarized']} summarized)"
+    )
+    # both totals, since the packed prompt may well be larger than the previous one
+    instrumentation.incr("prompt_context_tokens_total", report["used_tokens"], prompt="packed")
+    instrumentation.incr("prompt_context_tokens_total", report["baseline_tokens"], prompt="previous")
+
+    # 3) build numbered context block
+    context_block = "\n".join(format_context(i + 1, c) for i, c in enumerate(contexts))
+
+    system_prompt = f"""
+You are an expert financial QA assistant. You have the following {len(contexts)} context chunks
+extracted from SEC 10‑K filings, each labeled with its section, company, year, similarity score,
+and given either as a raw excerpt or as a brief summary:
+
+{context_block}
+
+Your task:
+- Answer the user's question **using only** the information in these contexts.
+- Provide a concise **answer**.
+- Provide a brief **explanation** stating which context numbers you used and why.
+- Set **relevance** to true if those contexts fully support your answer, else false.
+
+Respond **only** with JSON in this format:
+{{"answer":"...", "explanation":"...", "relevance":true}}
+
+Example:
+{{"answer":"$1.2 billion","explanation":"Based on context 1 which reports net cash flow...","relevance":true}}
+"""
+    return system_prompt, contexts
+
+
+@resilient("answer_query", default_delay=6.0)
+def _answer_call(system_prompt, user_query):
+    with instrumentation.span("llm", stage="answer_query", model=ANSWER_MODEL):
+        response = get_client().responses.create(
+            model=ANSWER_MODEL,
+            input=[
+                {"role": "system",  "content": system_prompt},
+                {"role": "user",    "content": user_query}
+            ],
+            text=QA_RESPONSE_FORMAT,
+            **request_options()
+        )
+    # every attempt is billed, so hedged duplicates are logged too
+    log_usage(response.usage, "answer_query", model=ANSWER_MODEL)
+    return response
+
+
+def answer_query(
+    chunk_df,
+    user_query: str,
+    top_k_chunk: int = 2,
+    top_k_section: int = 2,
+    include_neighbors: bool = True,
+    embedding_backend: str = None,
+    token_budget: int = 1500,
+    targets: dict = None
+) -> dict:
+    """
+    Retrieves contexts via get_top_k_chunks, packs them into `token_budget`
+    prompt tokens (see context_packing.pack_contexts) and then asks the LLM for:
+      - answer     : string
+      - explanation: which context numbers were used
+      - relevance  : boolean
+    The LLM calls are hedged and circuit-broken (see resilience) and stay
+    within the caller's resilience.deadline(), if any. Pass `targets` when the
+    query was already decomposed (get_query_targets) to skip decomposing again.
+    """
+    system_prompt, contexts = _answer_prompt(
+        chunk_df, user_query, top_k_chunk, top_k_section, include_neighbors,
+        embedding_backend, token_budget, targets
+    )
+    response = _answer_call(system_prompt, user_query)
+    return json.loads(response.output_text), contexts
+
+
+def validate_qa_response(out) -> dict:
+    """Check a parsed answer against the qa_response schema; raises ValueError."""
+    schema = QA_RESPONSE_FORMAT["format"]["schema"]
+    types = {"string": str, "boolean": bool}
+    if not isinstance(out, dict) or set(out) != set(schema["required"]):
+        raise ValueError(f"qa_response must have exactly {schema['required']}, got {out!r}")
+    for key, spec in schema["properties"].items():
+        if not isinstance(out[key], types[spec["type"]]):
+            raise ValueError(f"qa_response field {key!r} must be a {spec['type']}, got {out[key]!r}")
+    return out
+
+
+class JsonStringFieldStream:
+    """
+    Incrementally decode one top-level string field (e.g. "answer") out of a
+    JSON object that arrives in arbitrary text fragments. feed() returns the
+    newly decoded characters of that field, holding back incomplete escapes.
+    """
+
+    def __init__(self, field: str):
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buf = ""
+        self._pos = None      # index of the next undecoded character of the value
+        self.done = False
+
+    def feed(self, fragment: str) -> str:
+        self._buf += fragment
+        if self.done:
+            return ""
+        if self._pos is None:
+            m = self._key.search(self._buf)
+            if not m:
+                return ""
+            self._pos = m.end()
+        out, buf, i = [], self._buf, self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # escape: \n, \", \uXXXX (and \uD8xx\uDCxx surrogate pairs)
+            size = 6 if buf[i + 1:i + 2] == "u" else 2
+            if size == 6 and 0xD800 <= int(buf[i + 2:i + 6] or "0", 16) < 0xDC00:
+                size = 12
+            if i + size > len(buf):
+                break
+            out.append(json.loads(f'"{buf[i:i + size]}"'))
+            i += size
+        self._pos = i
+        return "".join(out)
+
+
+# a duplicate stream would have to be drained or closed, so opening one is
+# retried and circuit-broken but not hedged
+@resilient("answer_query_stream", hedge=False)
+def _open_answer_stream(system_prompt, user_query):
+    return get_client().responses.create(
+        model=ANSWER_MODEL,
+        input=[
+            {"role": "system",  "content": system_prompt},
+            {"role": "user",    "content": user_query}
+        ],
+        text=QA_RESPONSE_FORMAT,
+        stream=True,
+        **request_options()
+    )
+
+
+def answer_query_stream(
+    chunk_df,
+    user_query: str,
+    top_k_chunk: int = 2,
+    top_k_section: int = 2,
+    include_neighbors: bool = True,
+    embedding_backend: str = None,
+    token_budget: int = 1500
+):
+    """
+    Streaming answer_query. Yields event dicts, each with "t" (seconds since the call):
+      {"event": "retrieval_complete", "n_contexts", "contexts"}
+      {"event": "generation_start", "model"}
+      {"event": "delta", "text"}          -- new characters of the "answer" field
+      {"event": "final", "result", "contexts", "ttft_s"}
+    The final result is the full qa_response object, validated against its schema.
+    Only opening the stream is retried; a failure mid-generation is raised.
+    """
+    t0 = time.perf_counter()
+    system_prompt, contexts = _answer_prompt(
+        chunk_df, user_query, top_k_chunk, top_k_section, include_neighbors,
+        embedding_backend, token_budget
+    )
+    yield {"event": "retrieval_complete", "t": time.perf_counter() - t0,
+           "n_contexts": len(contexts), "contexts": contexts}
+
+    with instrumentation.span("llm", stage="answer_query_stream", model=ANSWER_MODEL):
+        stream = _open_answer_stream(system_prompt, user_query)
+        yield {"event": "generation_start", "t": time.perf_counter() - t0, "model": ANSWER_MODEL}
+
+        answer, parts, ttft, response = JsonStringFieldStream("answer"), [], None, None
+        for ev in stream:
+            if ev.type == "response.output_text.delta":
+                parts.append(ev.delta)
+                text = answer.feed(ev.delta)
+                if text:
+                    if ttft is None:
+                        ttft = time.perf_counter() - t0
+                        instrumentation.record_duration("time_to_first_token", ttft, stage="answer_query")
+                    yield {"event": "delta", "t": time.perf_counter() - t0, "text": text}
+            elif ev.type == "response.completed":
+                response = ev.response
+            elif ev.type in ("response.failed", "response.incomplete", "error"):
+                raise RuntimeError(f"answer stream ended with {ev.type}: {getattr(ev, 'response', ev)!r}")
+
+    if response is not None:
+        log_usage(response.usage, "answer_query_stream", model=ANSWER_MODEL)
+    output_text = response.output_text if response is not None else "".join(parts)
+    result = validate_qa_response(json.loads(output_text))
+    yield {"event": "final", "t": time.perf_counter() - t0, "result": result,
+           "contexts": contexts, "ttft_s": ttft}
+
+
+_triplet_cache = None
+_graph_lock = threading.Lock()
+_kg_indexes = OrderedDict()   # (ticker, year, graph_store, texts hash) -> KnowledgeGraphIndex
+MAX_CACHED_GRAPHS = 32
+
+def _get_triplet_cache():
+    global _triplet_cache
+    with _graph_lock:
+        if _triplet_cache is None:
+            _triplet_cache = TripletCache()
+    return _triplet_cache
+
+
+def graphRAG_query(chunk_df, user_query, top_k_section=3, triplet_workers=8,
+                   graph_store=None, graph_traversal_depth=3, targets=None):
+    # llama_index is only needed here; importing it lazily keeps RAG-only
+    # runs (and the CLI's `query --engine rag`) from paying for it at startup
+    from llama_index.core import (
+        StorageContext,
+        Settings
+    )
+    from utils_task_2.llama_provider import ProviderLLM, ProviderEmbedding
+
+    if targets is None:
+        targets = get_query_targets(user_query, k=top_k_section)
+    ticker      = targets["ticker"]
+    year        = targets["year"]
+    section_ids = targets["section_ids"]
+    data_item   = targets["data_item"]
+    df_filt = chunk_df[
+        (chunk_df.ticker == ticker) &
+        (chunk_df.year   == year) &
+        (chunk_df.section.isin(section_ids))
+    ]
+
+    # --- 1) Prepare your documents; near-duplicate chunks (dedup.py) reuse
+    #     their representative's triplets ---
+    texts = df_filt["chunk"].tolist()
+    triplet_texts = df_filt["canonical_chunk"].tolist() if "canonical_chunk" in df_filt else None
+
+    # --- 2) Triplet extraction goes through graph_index (gpt-4.1-nano); the
+    #     llama_index LLM and embedder are only used at query time. Both call
+    #     providers.get_client(), so they record their own token usage and work
+    #     with the offline provider ---
+    Settings.llm = ProviderLLM(
+        model=ANSWER_MODEL,  # higher‑capable model for final answers
+        temperature=0.0,
+    )
+    Settings.embed_model = ProviderEmbedding(model_name="text-embedding-3-small")
+
+    # --- 3) Build your graph index (disk-backed per filing unless graph_store="memory");
+    #     built indexes are kept in-process, so repeated questions on the same
+    #     filing sections (e.g. in server mode) skip the build entirely ---
+    key = (ticker, year, graph_store, content_key("\x00".join(texts)))
+    with _graph_lock:
+        kg_index = _kg_indexes.get(key)
+        if kg_index is not None:
+            _kg_indexes.move_to_end(key)
+
+    if kg_index is None:
+        store          = open_graph_store(ticker, year, graph_store, sections=section_ids)
+        storage_ctx    = StorageContext.from_defaults(graph_store=store)
+
+        # triplets are extracted concurrently and cached per chunk content, so
+        # rebuilding after a small corpus change only hits the LLM for new chunks
+        with instrumentation.span("graph_build", n_documents=len(texts)):
+            kg_index = build_kg_index(
+                texts,
+                storage_ctx,
+                cache=_get_triplet_cache(),
+                max_workers=triplet_workers,
+                max_triplets=10,
+                include_embeddings=True,
+                triplet_texts=triplet_texts
+            )
+        # k-hop paths of the hub entities, recomputed off the query path after new triplets
+        precompute_in_background(store, top_n=200, depth=graph_traversal_depth)
+
+        with _graph_lock:
+            _kg_indexes[key] = kg_index
+            if len(_kg_indexes) > MAX_CACHED_GRAPHS:
+                _kg_indexes.popitem(last=False)
+
+    # --- 4) Query the graph ---
+    query_engine = kg_index.as_query_engine(graph_traversal_depth=graph_traversal_depth)
+
+    with instrumentation.span("graph_query"):
+        response = query_engine.query(
+            user_query
+        )
+    
+    return response.response, [node.text for node in response.source_nodes]
@@ -0,0 +1,284 @@
+# utils_task_2/answer_cache.py
+"""
+Semantic answer cache: the same question about the same filing, asked in a
+different phrasing, reuses the stored answer instead of running retrieval and
+the gpt-4.1 answer call again.
+
+Entries hold (question embedding, engine, ticker, year, answer, contexts).
+A lookup scopes the new question to a ticker and year with the gazetteer
+match of query_router.match_filing (no embedding or LLM call), and only
+decomposes it first when that match is not confident. It then scans only the
+entries for that engine / ticker / year / query params.
+The nearest one is a hit when its cosine similarity is at least `threshold`,
+the question mentions the same years, and their content words overlap by at
+least CACHE_MIN_TERM_OVERLAP (Jaccard). The last check is there because
+embeddings rate "what was reported about X" and "... about Y" for the same
+filing as near-identical. Entries are evicted least recently used beyond
+`max_entries`. An entry is dropped as stale when its filing's chunk-store
+fingerprint (manifest.json) no longer matches the one it was answered from;
+the manifest is re-read whenever it changes on disk, so a re-ingest by another
+process (e.g. `main.py ingest` next to a running server) retires the
+filing's answers without a restart. Answers are stamped with the fingerprints
+the cache was created with, i.e. those of the chunk_df loaded alongside it:
+a server keeps answering from the chunk_df it started with, and its answers
+about a filing re-ingested since are not reused until it is restarted.
+
+    cache = load_answer_cache(chunk_store_path)
+    result, contexts = cached_answer(cache, "rag", chunk_df, question, top_k_chunk=3)
+    cache.save()
+"""
+import os, re, json, time, pickle, inspect, logging, threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from utils_task_2 import instrumentation
+
+CACHE_THRESHOLD = float(os.environ.get("TENK_ANSWER_CACHE_THRESHOLD", "0.92"))
+CACHE_MAX_ENTRIES = 2048
+DEFAULT_ANSWER_CACHE = os.path.join(os.environ.get("TENK_CACHE_DIR", ".cache"), "answer_cache.pkl")
+CACHE_MIN_TERM_OVERLAP = 0.75
+CACHE_VERSION = 1
+
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_FILLER = {"the", "and", "for", "from", "with", "about", "its", "what", "which", "how", "much", "many",
+           "did", "does", "was", "were", "are", "has", "have", "had", "this", "that", "according",
+           "tell", "please", "company", "fiscal", "year", "annual", "form",
+           # verbs that only frame the question
+           "report", "reported", "say", "said", "describe", "mention", "disclose", "state", "show"}
+
+
+def content_terms(user_query: str) -> frozenset:
+    """Lower-cased words minus filler, company names, years and simple suffixes."""
+    from utils_task_2.constants import COMPANY_ALIASES
+
+    names = {a for aliases in COMPANY_ALIASES.values() for a in aliases}
+    terms = set()
+    for w in re.findall(r"[a-z&]+", user_query.lower()):
+        if len(w) < 3 or w in _FILLER or w in names:
+            continue
+        for suffix in ("ing", "ed", "s"):
+            if w.endswith(suffix) and len(w) - len(suffix) >= 3:
+                w = w[:-len(suffix)]
+                break
+        terms.add(w)
+    return frozenset(terms)
+
+
+def _overlap(a, b) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def filing_fingerprints(chunk_store: str) -> dict:
+    """(ticker, year) -> content fingerprint of every filing in the chunk store's manifest."""
+    from utils_task_2.chunk_store import read_manifest
+
+    if not chunk_store or os.path.isfile(chunk_store):
+        return {}
+    manifest = read_manifest(chunk_store) or {}
+    return {(str(e.get("ticker")).lower(), str(e["year"])): e["fingerprint"]
+            for e in (manifest.get("filings") or {}).values()}
+
+
+class AnswerCache:
+    """Thread-safe LRU of answers, looked up by question-embedding similarity within one filing."""
+
+    def __init__(self, threshold: float = CACHE_THRESHOLD, max_entries: int = CACHE_MAX_ENTRIES,
+                 fingerprints: dict = None, backend: str = None, path: str = None,
+                 chunk_store: str = None):
+        from utils_task_2.embedding import get_embedding_backend
+
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.fingerprints = fingerprints or {}         # stamped on new entries
+        self.chunk_store = chunk_store                 # re-read for the current fingerprints
+        self._current = self.fingerprints
+        self._manifest_mtime = self._manifest_stat()
+        self.backend = backend or get_embedding_backend()
+        self.path = path
+        self.counts = defaultdict(int)
+        self._entries = OrderedDict()          # id -> entry, least recently used first
+        self._scopes = defaultdict(dict)       # scope -> {id: None}
+        self._matrices = {}                    # scope -> (ids, stacked embeddings)
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def scope(engine, ticker, year, params) -> tuple:
+        return (engine, str(ticker).lower(), str(year), json.dumps(params, sort_keys=True, default=str))
+
+    def embed(self, user_query: str) -> np.ndarray:
+        from utils_task_2.embedding import get_embedding_single
+
+        vec = np.asarray(get_embedding_single(" ".join(user_query.split()), backend=self.backend),
+                         dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _manifest_stat(self):
+        try:
+            return os.stat(os.path.join(self.chunk_store, "manifest.json")).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def _current_fingerprints(self) -> dict:
+        """The chunk store's filing fingerprints as of now (re-read when its manifest changed)."""
+        if not self.chunk_store:
+            return self._current
+        mtime = self._manifest_stat()
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            self._current = filing_fingerprints(self.chunk_store)
+        return self._current
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._scopes[entry["scope"]].pop(entry_id, None)
+        if not self._scopes[entry["scope"]]:
+            del self._scopes[entry["scope"]]
+        self._matrices.pop(entry["scope"], None)
+
+    def get(self, scope, user_query: str, embedding: np.ndarray):
+        """The cached entry answering `user_query` within `scope`, or None."""
+        years, terms = set(_YEAR_RE.findall(user_query)), content_terms(user_query)
+        with self._lock:
+            fingerprint = self._current_fingerprints().get(scope[1:3])
+            ids = self._scopes.get(scope)
+            stale = [i for i in ids or () if self._entries[i]["fingerprint"] != fingerprint]
+            for i in stale:
+                self._drop(i)
+            if stale:
+                self.counts["stale"] += len(stale)
+                instrumentation.incr("answer_cache_stale_total", len(stale), engine=scope[0])
+            best = None
+            if scope in self._scopes:
+                if scope not in self._matrices:
+                    ids = list(self._scopes[scope])
+                    self._matrices[scope] = (ids, np.vstack([self._entries[i]["embedding"] for i in ids]))
+                ids, matrix = self._matrices[scope]
+                sims = matrix @ embedding
+                for j in np.argsort(sims)[::-1]:
+                    if sims[j] < self.threshold:
+                        break
+                    entry = self._entries[ids[j]]
+                    if entry["years"] == years and _overlap(entry["terms"], terms) >= CACHE_MIN_TERM_OVERLAP:
+                        self._entries.move_to_end(ids[j])
+                        best = {**entry, "similarity": float(sims[j])}
+                        break
+            self.counts["hits" if best else "misses"] += 1
+        instrumentation.incr("answer_cache_total", engine=scope[0], result="hit" if best else "miss")
+        return best
+
+    def put(self, scope, user_query: str, embedding: np.ndarray, result, contexts):
+        entry = {
+            "scope": scope, "query": user_query, "embedding": embedding,
+            "years": set(_YEAR_RE.findall(user_query)), "terms": content_terms(user_query),
+            "fingerprint": self.fingerprints.get(scope[1:3]),
+            "result": result, "contexts": contexts, "created": time.time(),
+        }
+        with self._lock:
+            self._ids += 1
+            self._entries[self._ids] = entry
+            self._scopes[scope][self._ids] = None
+            self._matrices.pop(scope, None)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.counts["evictions"] += 1
+                instrumentation.incr("answer_cache_evictions_total")
+
+    def invalidate(self, ticker=None, year=None) -> int:
+        """Drop the entries of one filing (or all of a ticker / year, or everything)."""
+        with self._lock:
+            doomed = [i for i, e in self._entries.items()
+                      if (ticker is None or e["scope"][1] == str(ticker).lower())
+                      and (year is None or e["scope"][2] == str(year))]
+            for i in doomed:
+                self._drop(i)
+        return len(doomed)
+
+    def stats(self) -> dict:
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return {"entries": len(self), "lookups": lookups, **dict(self.counts),
+                "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else None}
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            payload = {"version": CACHE_VERSION, "backend": self.backend,
+                       "entries": list(self._entries.values())}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(payload, f)
+        os.replace(f"{path}.tmp", path)
+
+    def load(self, path: str = None):
+        """Add the entries saved at `path` (ignored if they were embedded with another backend)."""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return self
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") != CACHE_VERSION or payload.get("backend") != self.backend:
+            logging.info(f"Ignoring answer cache at {path} (other version or embedding backend)")
+            return self
+        for e in payload["entries"]:
+            self.put(e["scope"], e["query"], e["embedding"], e["result"], e["contexts"])
+            self._entries[self._ids].update(fingerprint=e["fingerprint"], created=e["created"])
+        logging.info(f"Loaded {len(self)} cached answers from {path}")
+        return self
+
+
+def load_answer_cache(chunk_store: str = None, path: str = DEFAULT_ANSWER_CACHE, **kwargs) -> AnswerCache:
+    """The persisted cache at `path`, invalidated against `chunk_store`'s filing fingerprints."""
+    return AnswerCache(fingerprints=filing_fingerprints(chunk_store), path=path, chunk_store=chunk_store,
+                       **kwargs).load()
+
+
+def cached_answer(cache, engine: str, chunk_df, user_query: str, **params):
+    """
+    answer_query (engine "rag") or graphRAG_query ("graph") through `cache`:
+    returns (result, contexts) like them. A hit costs one query embedding:
+    when match_filing names the ticker and year confidently the question is
+    not decomposed at all (otherwise it is, which may take one LLM call). On a
+    miss the query is decomposed once and the targets are handed on, so a
+    miss costs one query embedding extra.
+    Answers the contexts did not support (relevance false) are not stored.
+    """
+    from utils_task_2 import answer
+    from utils_task_2.query_router import ROUTER_THRESHOLD, match_filing
+    from utils_task_2.retrieval import get_query_targets
+
+    fn = answer.answer_query if engine == "rag" else answer.graphRAG_query
+    if cache is None:
+        return fn(chunk_df, user_query, **params)
+
+    backend = params.get("embedding_backend")
+    if backend is None and "chunk_embedding" in chunk_df.columns:
+        backend = chunk_df.attrs.get("embedding_backend")
+    k = params.get("top_k_section", inspect.signature(fn).parameters["top_k_section"].default)
+    targets = None
+    filing = match_filing(user_query)
+    if filing["confidence"] < ROUTER_THRESHOLD:
+        filing = targets = get_query_targets(user_query, k=k, embedding_backend=backend)
+
+    scope = cache.scope(engine, filing["ticker"], filing["year"], params)
+    with instrumentation.span("answer_cache_lookup", engine=engine) as sp:
+        embedding = cache.embed(user_query)
+        hit = cache.get(scope, user_query, embedding)
+        sp.set(hit=hit is not None)
+    if hit is not None:
+        logging.info(f"Answer cache hit ({hit['similarity']:.3f}) for: {hit['query']}")
+        return hit["result"], hit["contexts"]
+
+    if targets is None:
+        targets = get_query_targets(user_query, k=k, embedding_backend=backend)
+        scope = cache.scope(engine, targets["ticker"], targets["year"], params)
+    result, contexts = fn(chunk_df, user_query, targets=targets, **params)
+    if not (isinstance(result, dict) and result.get("relevance") is False):
+        cache.put(scope, user_query, embedding, result, contexts)
+    return result, contexts
@@ -0,0 +1,287 @@
+# utils_task_2/chunk_store.py
+"""
+Persisted, incrementally updated chunk store for Task 2.
+
+Layout under DEFAULT_CHUNK_STORE (a directory):
+    manifest.json            ingest settings + one entry per (cik, year) filing
+    shards/<cik>_<year>.pkl  that filing's chunk rows, summaries and embeddings
+    facts/<cik>_<year>.pkl   numeric facts from its tables (see fact_index)
+
+ingest() only chunks, summarizes and embeds filings that are new or whose
+content changed since the last run; unchanged shards are never rewritten.
+"""
+import os, json, time, shutil, hashlib, logging
+import pandas as pd
+
+from utils_task_2 import instrumentation
+
+DEFAULT_CHUNK_STORE = os.path.join(os.environ.get("TENK_CACHE_DIR", ".cache"), "chunk_store")
+MANIFEST_VERSION = 1
+
+
+def build_chunk_df_from_corpus(lazy_summaries: bool = False, reports=None, mapping=None,
+                               dedup: bool = True, known: pd.DataFrame = None,
+                               embed: bool = False, summarize_workers: int = None) -> pd.DataFrame:
+    """
+    Download and filter the EDGAR corpus (unless `reports` / `mapping` are given),
+    chunk it, then either summarize every chunk or (lazy mode) embed the raw
+    chunks and defer summaries to query time. `embed` also precomputes the
+    summary embeddings (see ensure_embeddings). `summarize_workers` caps the
+    concurrent summarizer calls (default SUMMARIZE_CONCURRENCY).
+
+    With `dedup`, exact and near-duplicate chunks (see utils_task_2.dedup) are
+    processed once and share their representative's summary and embedding;
+    rows of `known` (already processed chunks, e.g. earlier filings in the
+    store) can serve as representatives too and are not returned.
+    """
+    import utils_task_2.chunking      as ut2_chunking
+    import utils_task_2.summarization as ut2_summarization
+    import utils_task_2.embedding     as ut2_embedding
+
+    if reports is None:
+        reports, mapping = load_filtered_corpus()
+
+    logging.info("Chunking and summarizing filings...")
+    with instrumentation.span("task2.chunk"):
+        chunk_df = ut2_chunking.build_chunk_df(reports, mapping)
+
+    n_known = len(known) if dedup and known is not None else 0
+    if dedup:
+        from utils_task_2.dedup import dedup_chunks, share_from_representatives, log_dedup_report
+        if n_known:
+            chunk_df = pd.concat([known, chunk_df], ignore_index=True)
+        chunk_df, rep, report = dedup_chunks(chunk_df, n_known=n_known)
+        log_dedup_report(report, lazy_summaries)
+        work = [i for i in range(n_known, len(chunk_df)) if rep[i] == i]
+        # rows of `known` bring summary/embedding columns the new rows must not inherit
+        work_df = chunk_df.iloc[work].drop(columns=["chunk_summary", "chunk_embedding"], errors="ignore")
+    else:
+        work_df = chunk_df
+
+    if lazy_summaries:
+        logging.info("Embedding raw chunks (summaries deferred to query time)...")
+        with instrumentation.span("task2.embed_chunks", n_chunks=len(work_df)):
+            work_df = ut2_embedding.embed_chunks(work_df)
+        work_df["chunk_summary"] = None
+    else:
+        logging.info("Generating chunk summaries in parallel...")
+        work_df = ut2_summarization.parallel_summarize(work_df, max_workers=summarize_workers)
+        if embed:
+            work_df = ensure_embeddings(work_df)
+
+    if not dedup:
+        return work_df
+    columns = [c for c in ("chunk_summary", "chunk_embedding") if c in work_df.columns]
+    for col in columns:
+        values = chunk_df[col].tolist() if col in chunk_df.columns else [None] * len(chunk_df)
+        for i, value in zip(work, work_df[col].tolist()):
+            values[i] = value
+        chunk_df[col] = pd.Series(values, index=chunk_df.index, dtype=object)
+    chunk_df = share_from_representatives(chunk_df, rep, columns)
+    chunk_df = chunk_df.iloc[n_known:].reset_index(drop=True)
+    chunk_df.attrs["embedding_backend"] = work_df.attrs.get("embedding_backend")
+    chunk_df.attrs["dedup"] = report
+    return chunk_df
+
+
+def load_filtered_corpus(years=None, tickers=None, per_year=None):
+    """
+    EDGAR filings for ALLOWED_YEARS / ALLOWED_TICKERS plus the CIK→ticker mapping.
+    `per_year` ({year: Dataset}, see data_loading.load_edgar_years) avoids
+    loading years the caller already has.
+    """
+    import utils_task_2.data_loading as ut2_data
+    from utils_task_2.constants import ALLOWED_YEARS, ALLOWED_TICKERS
+
+    logging.info("Loading and filtering EDGAR corpus for selected tickers...")
+    with instrumentation.span("task2.load"):
+        ds = ut2_data.load_edgar_corpus(years or ALLOWED_YEARS, per_year=per_year)
+        return ut2_data.filter_dataset_by_tickers(ds, tickers or ALLOWED_TICKERS)
+
+
+def ensure_embeddings(chunk_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Precompute the vectors retrieval compares queries against: the summaries
+    (the same vectors get_top_k_chunks would otherwise embed on every query),
+    or the raw chunk where summarization failed.
+    No-op when a `chunk_embedding` column already exists (lazy mode).
+    """
+    import utils_task_2.embedding as ut2_embedding
+
+    if "chunk_embedding" in chunk_df.columns:
+        return chunk_df
+    failed = int((~chunk_df["chunk_summary"].map(lambda s: isinstance(s, str))).sum())
+    if failed:
+        logging.warning(f"{failed} chunks have no summary (summarization failed); embedding their raw text")
+    logging.info("Embedding chunk summaries for retrieval...")
+    with instrumentation.span("task2.embed_chunks", n_chunks=len(chunk_df)):
+        return ut2_embedding.embed_chunks(chunk_df, text_column="chunk_summary", fallback_column="chunk")
+
+
+def filing_key(cik, year) -> str:
+    return f"{cik}_{year}"
+
+
+def filing_fingerprint(reports) -> str:
+    """Content hash of all section text of one (cik, year) filing."""
+    h = hashlib.sha256()
+    for report in sorted(reports, key=lambda r: str(r.get("filename", ""))):
+        for sec in sorted(k for k in report if k.startswith("section_")):
+            h.update(f"{sec}\x00{report[sec] or ''}\x00".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _manifest_path(path):
+    return os.path.join(path, "manifest.json")
+
+
+def read_manifest(path: str = DEFAULT_CHUNK_STORE):
+    """The store's manifest, or None if nothing has been ingested at `path`."""
+    if not os.path.exists(_manifest_path(path)):
+        return None
+    with open(_manifest_path(path)) as f:
+        return json.load(f)
+
+
+def _write_manifest(path, manifest):
+    tmp = f"{_manifest_path(path)}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path(path))
+
+
+def _write_shard(path, key, df, folder="shards"):
+    os.makedirs(os.path.join(path, folder), exist_ok=True)
+    shard = os.path.join(folder, f"{key}.pkl")
+    tmp = os.path.join(path, f"{shard}.tmp")
+    df.to_pickle(tmp)
+    os.replace(tmp, os.path.join(path, shard))
+    return shard
+
+
+def _known_chunks(path, manifest, ciks, unchanged):
+    """Stored rows of the given companies' unchanged filings, if embedded with the current backend."""
+    from utils_task_2.embedding import get_embedding_backend
+
+    if manifest.get("embedding_backend") not in (None, get_embedding_backend()):
+        return None
+    keys = [k for k in unchanged if manifest["filings"][k]["cik"] in ciks]
+    frames = [pd.read_pickle(os.path.join(path, manifest["filings"][k]["shard"])) for k in keys]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def ingest(path: str = DEFAULT_CHUNK_STORE, lazy_summaries: bool = None,
+           reports=None, mapping=None, rebuild: bool = False, dedup: bool = True) -> dict:
+    """
+    Bring the chunk store at `path` up to date with the selected corpus
+    (ALLOWED_YEARS / ALLOWED_TICKERS, or the given `reports` + `mapping`).
+
+    Only filings that are new or whose content fingerprint changed are chunked,
+    summarized and embedded; each is written to its own shard and recorded in
+    the manifest. Graph stores of changed filings are dropped so they are rebuilt
+    from the triplet cache on the next graph query. Filings that dropped out of
+    the selection are kept. The summary mode is fixed by the first ingest
+    (`lazy_summaries` only applies to a new or rebuilt store; default False),
+    and so is the embedding backend: adding filings under another backend
+    raises ValueError instead of mixing vector spaces (rebuild to switch).
+    With `dedup`, chunks that repeat (near-)verbatim, within the batch or in the
+    same company's unchanged filings, reuse the existing summary and embedding.
+    Returns a report with the new / changed / unchanged filing keys and the dedup stats.
+    """
+    from utils_task_2.embedding import get_embedding_backend
+
+    if reports is None:
+        reports, mapping = load_filtered_corpus()
+
+    if rebuild:
+        shutil.rmtree(os.path.join(path, "shards"), ignore_errors=True)
+        shutil.rmtree(os.path.join(path, "facts"), ignore_errors=True)
+    manifest = None if rebuild else read_manifest(path)
+    if manifest is None:
+        manifest = {"version": MANIFEST_VERSION, "lazy_summaries": bool(lazy_summaries),
+                    "embedding_backend": get_embedding_backend(), "filings": {}}
+    elif lazy_summaries is not None and manifest["lazy_summaries"] != lazy_summaries:
+        logging.warning(f"Chunk store at {path} uses lazy_summaries={manifest['lazy_summaries']}; "
+                        f"keeping that mode (pass rebuild=True to change it)")
+    lazy = manifest["lazy_summaries"]
+
+    by_filing = {}
+    for report in reports:
+        by_filing.setdefault(filing_key(report["cik"], report["year"]), []).append(dict(report))
+
+    todo, report_out = [], {"new": [], "changed": [], "unchanged": []}
+    fingerprints = {}
+    for key, filing_reports in sorted(by_filing.items()):
+        fingerprints[key] = filing_fingerprint(filing_reports)
+        entry = manifest["filings"].get(key)
+        if entry is None:
+            report_out["new"].append(key)
+        elif entry["fingerprint"] != fingerprints[key]:
+            report_out["changed"].append(key)
+        else:
+            report_out["unchanged"].append(key)
+            continue
+        todo.extend(filing_reports)
+    logging.info(f"Ingest: {len(report_out['new'])} new, {len(report_out['changed'])} changed, "
+                 f"{len(report_out['unchanged'])} unchanged filings")
+
+    report_out["chunks_added"] = 0
+    if not todo:
+        return report_out
+    backend = get_embedding_backend()
+    if manifest["filings"] and manifest.get("embedding_backend") not in (None, backend):
+        raise ValueError(f"Chunk store at {path} was embedded with the {manifest['embedding_backend']!r} "
+                         f"backend, not {backend!r}; set TENK_EMBEDDING_BACKEND={manifest['embedding_backend']} "
+                         f"or rebuild the store (ingest --rebuild)")
+
+    with instrumentation.span("task2.ingest", n_filings=len(report_out["new"]) + len(report_out["changed"])):
+        known = _known_chunks(path, manifest, {r["cik"] for r in todo}, report_out["unchanged"])
+        new_df = build_chunk_df_from_corpus(lazy, todo, mapping, dedup=dedup, known=known, embed=True)
+        new_df = ensure_embeddings(new_df)
+    report_out["dedup"] = new_df.attrs.get("dedup")
+
+    from utils_task_2.fact_index import build_fact_frame
+
+    ticker_by_cik = dict(zip(mapping.cik, mapping.ticker))
+    row_keys = [filing_key(c, y) for c, y in zip(new_df.cik, new_df.year)]
+    for key in report_out["new"] + report_out["changed"]:
+        cik, year = key.rsplit("_", 1)
+        rows = new_df[[k == key for k in row_keys]].reset_index(drop=True)
+        shard = _write_shard(path, key, rows)
+        facts = build_fact_frame(rows)
+        manifest["filings"][key] = {
+            "cik": cik, "year": year, "ticker": ticker_by_cik.get(cik),
+            "fingerprint": fingerprints[key], "shard": shard, "n_chunks": len(rows),
+            "facts": _write_shard(path, key, facts, folder="facts"), "n_facts": len(facts),
+            "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        if key in report_out["changed"]:
+            from utils_task_2.graph_index import drop_graph_store
+            drop_graph_store(ticker_by_cik.get(cik), year)
+    manifest["embedding_backend"] = backend
+    _write_manifest(path, manifest)   # after the shards, so it never points at missing data
+
+    report_out["chunks_added"] = len(new_df)
+    return report_out
+
+
+def load_chunk_store(path: str = DEFAULT_CHUNK_STORE, rebuild: bool = False,
+                     lazy_summaries: bool = None, update: bool = False) -> pd.DataFrame:
+    """
+    Concatenate all shards of the store at `path` into one chunk_df. The store
+    is ingested first when it does not exist yet, when `update` is set (pick up
+    new/changed filings) or, from scratch, when `rebuild` is set. A single
+    pickled DataFrame file at `path` is loaded as is.
+    """
+    if os.path.isfile(path):
+        return pd.read_pickle(path)
+    if rebuild or update or read_manifest(path) is None:
+        ingest(path, lazy_summaries=lazy_summaries, rebuild=rebuild)
+
+    manifest = read_manifest(path)
+    frames = [pd.read_pickle(os.path.join(path, entry["shard"]))
+              for _, entry in sorted(manifest["filings"].items())]
+    chunk_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    chunk_df.attrs["embedding_backend"] = manifest.get("embedding_backend")
+    logging.info(f"Loaded {len(chunk_df)} chunks ({len(frames)} filings) from {path}")
+    return chunk_df
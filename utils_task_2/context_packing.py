@@ -0,0 +1,171 @@
+# utils_task_2/context_packing.py
+
+import re, logging, hashlib
+from functools import lru_cache
+from utils_task_2.providers import approx_token_count
+
+
+@lru_cache(maxsize=4)
+def _encoder(model: str):
+    """tiktoken encoder for `model`, or None if tiktoken/its vocab is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken unavailable ({e}); using approximate token counts")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4.1-2025-04-14") -> int:
+    """Local token count (tiktoken when available, word-based estimate otherwise)."""
+    enc = _encoder(model)
+    if enc is None:
+        return approx_token_count(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+SUMMARY_TOKEN_ESTIMATE = 40   # summarizer output is one 15–25 word sentence
+PREVIOUS_PROMPT_CONTEXTS = 5  # answer_query used to send the top five contexts as summaries
+
+
+def _shingles(text: str, n: int = 8) -> set:
+    """Hashed word n-grams, used to spot text shared between overlapping chunks."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < n:
+        return {" ".join(words)} if words else set()
+    return {
+        hashlib.blake2b(" ".join(words[i:i + n]).encode(), digest_size=8).digest()
+        for i in range(len(words) - n + 1)
+    }
+
+
+def _containment(a: set, b: set) -> float:
+    """Share of the smaller shingle set found in the other one."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def format_context(i: int, c: dict) -> str:
+    """One numbered line of the answer prompt's context block."""
+    kind = "excerpt" if c["text_kind"] == "chunk" else "summary"
+    return (f"{i}. [{c['section_name']}] ({c['ticker']}, {c['year']}) "
+            f"(sim={c['similarity']:.3f}) [{kind}]: {c['text']}")
+
+
+def _greedy_pack(pool, token_budget, mmr_lambda, duplicate_threshold, raw_similarity_margin,
+                 best_sim, summarize, model):
+    """One MMR packing pass over `pool` (consumed). Returns (selected, stats, wanted), where
+    `wanted` are the unsummarized picks that needed a summary and `summarize` was None."""
+    selected, chosen_shingles, wanted = [], [], []
+    used = duplicates = over_budget = 0
+    while pool and used < token_budget:
+        def score(p):
+            overlap = max((_containment(p["shingles"], s) for s in chosen_shingles), default=0.0)
+            return mmr_lambda * p["ctx"]["similarity"] - (1 - mmr_lambda) * overlap, overlap
+        scores = [score(p) for p in pool]
+        best = max(range(len(pool)), key=lambda j: scores[j][0])
+        p, overlap = pool.pop(best), scores[best][1]
+        if overlap >= duplicate_threshold:
+            duplicates += 1
+            continue
+
+        c, remaining = p["ctx"], token_budget - used
+        raw_fits = p["raw_tokens"] <= remaining
+        summary = c.get("chunk_summary")
+        has_summary = isinstance(summary, str)
+        if raw_fits and (not has_summary or c["similarity"] >= best_sim - raw_similarity_margin):
+            text, kind, tokens = c["chunk"], "chunk", p["raw_tokens"]
+        else:
+            if not has_summary and remaining >= SUMMARY_TOKEN_ESTIMATE:
+                if summarize is not None:
+                    summary = c["chunk_summary"] = summarize(c)
+                else:
+                    wanted.append(c)
+            summary_tokens = count_tokens(summary, model) if isinstance(summary, str) else None
+            if summary_tokens is not None and summary_tokens <= remaining:
+                text, kind, tokens = summary, "summary", summary_tokens
+            elif raw_fits:
+                text, kind, tokens = c["chunk"], "chunk", p["raw_tokens"]
+            else:
+                over_budget += 1
+                continue
+
+        selected.append({**c, "text": text, "text_kind": kind, "tokens": tokens})
+        chosen_shingles.append(p["shingles"])
+        used += tokens
+    return selected, {"used": used, "duplicates": duplicates, "over_budget": over_budget}, wanted
+
+
+def pack_contexts(
+    contexts: list[dict],
+    token_budget: int = 1500,
+    mmr_lambda: float = 0.7,
+    duplicate_threshold: float = 0.8,
+    raw_similarity_margin: float = 0.05,
+    summarize=None,
+    model: str = "gpt-4.1-2025-04-14",
+) -> tuple[list[dict], dict]:
+    """
+    Fill `token_budget` prompt tokens with the retrieved contexts, greedily by
+    maximal marginal relevance:  mmr_lambda * similarity − (1 − mmr_lambda) * overlap
+    with what is already selected (overlap = shingle containment).
+
+    - Candidates whose text is ≥ `duplicate_threshold` contained in a selected
+      one (e.g. overlapping neighbor chunks) are dropped.
+    - Each pick is sent as its raw chunk when it fits the remaining budget and is
+      within `raw_similarity_margin` of the best similarity (or has no summary
+      yet), otherwise as its summary.
+    - Lazy mode: `summarize(contexts)` returns summaries for a list of
+      unsummarized contexts. A first pass without summaries finds the picks whose
+      raw text no longer fits; they are summarized in one batch (concurrently, by
+      the caller) and the contexts are packed again.
+
+    Returns (selected contexts with "text"/"text_kind"/"tokens" set, report), where
+    the report compares used tokens against the previous prompt: the first
+    PREVIOUS_PROMPT_CONTEXTS contexts, each as its summary (else raw chunk).
+    """
+    pool = []
+    for c in contexts:
+        pool.append({
+            "ctx": c,
+            "shingles": _shingles(c["chunk"]),
+            "raw_tokens": count_tokens(c["chunk"], model),
+        })
+    best_sim = max((c["similarity"] for c in contexts), default=0.0)
+    args = (token_budget, mmr_lambda, duplicate_threshold, raw_similarity_margin, best_sim)
+
+    selected, stats, wanted = _greedy_pack(list(pool), *args, None, model)
+    batched = 0
+    if wanted and summarize is not None:
+        for c, summary in zip(wanted, summarize(wanted)):
+            c["chunk_summary"] = summary
+        batched = len(wanted)
+        # picks only reached now that summaries freed budget are summarized one by one
+        selected, stats, _ = _greedy_pack(list(pool), *args, lambda c: summarize([c])[0], model)
+
+    baseline = 0
+    for p in pool[:PREVIOUS_PROMPT_CONTEXTS]:
+        summary = p["ctx"].get("chunk_summary")
+        if isinstance(summary, str):
+            baseline += count_tokens(summary, model)
+        else:
+            # the previous prompt summarized every context it sent (lazy mode) or fell back to the chunk
+            baseline += SUMMARY_TOKEN_ESTIMATE if summarize is not None else p["raw_tokens"]
+
+    report = {
+        "token_budget":       token_budget,
+        "candidates":         len(contexts),
+        "selected":           len(selected),
+        "raw_selected":       sum(c["text_kind"] == "chunk" for c in selected),
+        "summarized":         batched,
+        "duplicates_dropped": stats["duplicates"],
+        "over_budget":        stats["over_budget"],
+        "used_tokens":        stats["used"],
+        "baseline_tokens":    baseline,
+        "saved_tokens":       baseline - stats["used"],
+    }
+    return selected, report
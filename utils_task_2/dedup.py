@@ -0,0 +1,148 @@
+# utils_task_2/dedup.py
+"""
+Near-duplicate chunk detection (MinHash + LSH) so boilerplate repeated across
+filing years is summarized, embedded and triplet-extracted once.
+
+Each chunk gets a representative: itself, an identical earlier chunk, or an
+earlier chunk whose estimated Jaccard similarity of word 5-gram shingles is at
+least `threshold` and which has the same numbers in the same order. Work is
+done for representatives only and the results are shared by reference with
+their duplicates (see share_from_representatives). Chunks that differ only in
+a figure ("net sales were $260.2 billion in 2019" / "$274.5 billion in 2020")
+are never merged, since the shared summary and triplets would state the wrong one.
+"""
+import re, zlib, logging
+
+import numpy as np
+import pandas as pd
+
+from utils_task_2 import instrumentation
+
+DEDUP_THRESHOLD = 0.85
+NUM_PERM = 128
+LSH_BANDS = 16          # 16 bands x 8 rows: pairs at J=0.85 become candidates ~99% of the time
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    words = _WORD_RE.findall(text.lower())
+    grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.int64, count=len(grams))
+
+
+def minhash_signatures(texts, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE,
+                       seed: int = 1) -> np.ndarray:
+    """(len(texts), num_perm) MinHash signatures of word shingles, via (a*x + b) mod p permutations."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)[:, None]
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)[:, None]
+    sigs = np.empty((len(texts), num_perm), dtype=np.int64)
+    for i, text in enumerate(texts):
+        h = _shingle_hashes(text, shingle_size) % _PRIME
+        sigs[i] = ((a * h[None, :] + b) % _PRIME).min(axis=1)
+    return sigs
+
+
+def find_near_duplicates(texts, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM,
+                         bands: int = LSH_BANDS) -> np.ndarray:
+    """
+    representative[i] = index of the earliest text that i is an exact or near
+    duplicate of (i itself when it has none). Exact copies are grouped by
+    value first; LSH candidates are confirmed by signature agreement >= threshold
+    and identical numeric tokens.
+    """
+    n = len(texts)
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    first_seen = {}
+    for i, text in enumerate(texts):
+        j = first_seen.setdefault(text, i)
+        if j != i:
+            union(i, j)
+    unique = np.fromiter(first_seen.values(), dtype=np.int64, count=len(first_seen))
+
+    if len(unique) > 1:
+        sigs = minhash_signatures([texts[i] for i in unique], num_perm)
+        numbers = [_NUMBER_RE.findall(texts[i]) for i in unique]
+        rows = num_perm // bands
+        for band in range(bands):
+            buckets = {}
+            for u, key in enumerate(map(bytes, sigs[:, band * rows:(band + 1) * rows])):
+                buckets.setdefault(key, []).append(u)
+            for members in buckets.values():
+                for u in members[1:]:
+                    v = members[0]
+                    if find(unique[u]) != find(unique[v]) and numbers[u] == numbers[v] and \
+                            np.mean(sigs[u] == sigs[v]) >= threshold:
+                        union(unique[u], unique[v])
+    return np.array([find(i) for i in range(n)])
+
+
+def dedup_chunks(chunk_df, text_column: str = "chunk", threshold: float = DEDUP_THRESHOLD,
+                 n_known: int = 0):
+    """
+    Mark duplicates in `chunk_df`. Adds `canonical_chunk` (the representative's
+    text, by reference, for near duplicates; None otherwise) and returns
+    (chunk_df, representative positions, report). The first `n_known` rows are
+    already processed (e.g. from earlier ingests) and are preferred as representatives.
+    """
+    texts = chunk_df[text_column].tolist()
+    with instrumentation.span("dedup", n_chunks=len(texts)):
+        rep = find_near_duplicates(texts, threshold)
+
+    dups = [i for i in range(n_known, len(texts)) if rep[i] != i]
+    exact = sum(texts[i] == texts[rep[i]] for i in dups)
+    chunk_df["canonical_chunk"] = [
+        texts[r] if r != i and texts[r] != texts[i] else None for i, r in enumerate(rep)
+    ]
+    report = {
+        "chunks":            len(texts) - n_known,
+        "unique":            len(texts) - n_known - len(dups),
+        "duplicates":        len(dups),
+        "exact_duplicates":  exact,
+        "near_duplicates":   len(dups) - exact,
+        "reused_from_store": int(sum(rep[i] < n_known for i in dups)),
+    }
+    report["dedup_ratio"] = round(len(dups) / report["chunks"], 4) if report["chunks"] else 0.0
+    return chunk_df, rep, report
+
+
+def share_from_representatives(chunk_df, rep, columns):
+    """Copy each column's value from a row's representative (object references, not copies)."""
+    for col in columns:
+        values = chunk_df[col].tolist()
+        chunk_df[col] = pd.Series([values[r] for r in rep], index=chunk_df.index, dtype=object)
+    return chunk_df
+
+
+def log_dedup_report(report, lazy_summaries: bool = False):
+    """Log the dedup ratio and the model calls the shared results avoided."""
+    saved = dict(embedding_inputs=report["duplicates"],
+                 triplet_extractions=report["near_duplicates"])
+    if not lazy_summaries:
+        saved["summaries"] = report["duplicates"]
+    report["calls_saved"] = saved
+    logging.info(
+        f"Dedup: {report['duplicates']}/{report['chunks']} chunks are duplicates "
+        f"({report['dedup_ratio']:.1%}; {report['exact_duplicates']} exact, "
+        f"{report['near_duplicates']} near, {report['reused_from_store']} reused from the store); "
+        f"calls saved: {saved}"
+    )
+    for kind, n in saved.items():
+        instrumentation.incr("dedup_calls_saved_total", n, kind=kind)
+    return report
@@ -1,38 +1,195 @@
-# utils_task_2/embedding.py
-
-import numpy as np
-from openai import OpenAI
-from sklearn.metrics.pairwise import cosine_similarity
-
-client = OpenAI()
-
-def get_embedding_single(text: str, model="text-embedding-3-small") -> list[float]:
-    resp = client.embeddings.create(input=text, model=model)
-    return resp.data[0].embedding
-
-def get_embeddings_parallel(texts: list[str], model="text-embedding-3-small") -> list[list[float]]:
-    resp = client.embeddings.create(input=texts, model=model)
-    return [d.embedding for d in resp.data]
-
-def make_query_sentence(data_item: str) -> str:
-    return f"This query is about {data_item.lower()} in the annual report."
-
-def embed_data_item_query(data_item: str, model="text-embedding-3-small") -> np.ndarray:
-    sent = make_query_sentence(data_item)
-    return np.array(get_embedding_single(sent, model))
-
-def top_k_sections_by_similarity(
-    data_item: str, k=3, model="text-embedding-3-small"
-) -> list[str]:
-    from utils_task_2.constants import SECTION_DEFINITIONS, SECTION_NAME_TO_ID
-    from sklearn.metrics.pairwise import cosine_similarity
-
-    # prepare definitions & embeddings
-    names = list(SECTION_DEFINITIONS.keys())
-    texts = list(SECTION_DEFINITIONS.values())
-    embs  = np.vstack(get_embeddings_parallel(texts, model))
-    q_emb = embed_data_item_query(data_item, model).reshape(1,-1)
-
-    sims   = cosine_similarity(q_emb, embs)[0]
-    idxs   = sims.argsort()[::-1][:k]
-    return [ SECTION_NAME_TO_ID[names[i]] for i in idxs ]
+# utils_task_2/embedding.py
+
+import os, time, base64, threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from utils_task_2.providers import get_client
+from utils_task_2 import instrumentation
+from utils_task_2.resilience import resilient, request_options
+from utils_task_2.context_packing import count_tokens
+
+# "api": embeddings via the active provider client (OpenAI by default)
+# "local": in-process sentence-transformers model on CPU, no network round trip
+EMBEDDING_BACKENDS = ("api", "local")
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+# OpenAI limits are 2048 inputs and 300k tokens per request; keep some headroom
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 250_000
+EMBEDDING_CONCURRENCY = 4
+
+_default_backend = os.environ.get("TENK_EMBEDDING_BACKEND", "api")
+
+
+def set_embedding_backend(backend: str):
+    """Select the default embedding backend ("api" or "local")."""
+    global _default_backend
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; choose from {EMBEDDING_BACKENDS}")
+    _default_backend = backend
+
+
+def get_embedding_backend() -> str:
+    return _default_backend
+
+
+def cosine_similarity(a, b) -> np.ndarray:
+    """Cosine similarity between the rows of `a` and `b` (numpy only, so the query
+    path does not have to import scikit-learn)."""
+    a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+    b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return a @ b.T
+
+
+@lru_cache(maxsize=2)
+def load_local_model(model_name: str = LOCAL_EMBEDDING_MODEL):
+    """Load (once) and keep warm the sentence-transformers model used by the local backend."""
+    from utils_task_1.embedding import load_model_and_tokenizer
+    model, _ = load_model_and_tokenizer(model_name)
+    return model
+
+
+def encode_local(texts: list[str], model_name: str = LOCAL_EMBEDDING_MODEL,
+                 batch_size: int = 64) -> np.ndarray:
+    """Batched CPU encoding with the warm local model; rows are L2-normalized float32."""
+    model = load_local_model(model_name)
+    with instrumentation.span("embedding", model=model_name, n_inputs=len(texts)):
+        return model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        ).astype(np.float32, copy=False)
+
+
+def _decode_embedding(emb) -> np.ndarray:
+    """base64 little-endian float32 payload (or a plain float list) → float32 vector."""
+    if isinstance(emb, str):
+        return np.frombuffer(base64.b64decode(emb), dtype="<f4")
+    return np.asarray(emb, dtype=np.float32)
+
+
+def make_embedding_batches(texts: list[str], model="text-embedding-3-small",
+                           max_inputs: int = MAX_INPUTS_PER_REQUEST,
+                           max_tokens: int = MAX_TOKENS_PER_REQUEST) -> list[tuple[int, int]]:
+    """Split texts into contiguous [start, end) batches under both the input-count and token limits."""
+    batches, start, tokens = [], 0, 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text, model)
+        if i > start and (i - start >= max_inputs or tokens + n > max_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def get_embedding_single(text: str, model="text-embedding-3-small", backend: str = None) -> np.ndarray:
+    if (backend or _default_backend) == "local":
+        return encode_local([text])[0]
+    return _embed_single_api(text, model)
+
+@resilient("query_embedding", default_delay=1.0)
+def _embed_single_api(text: str, model: str) -> np.ndarray:
+    with instrumentation.span("embedding", model=model, n_inputs=1):
+        resp = get_client().embeddings.create(input=text, model=model, encoding_format="base64",
+                                              **request_options())
+    instrumentation.record_usage(resp.usage, model, "embedding")
+    return _decode_embedding(resp.data[0].embedding)
+
+def get_embeddings_parallel(texts: list[str], model="text-embedding-3-small", backend: str = None,
+                            max_workers: int = EMBEDDING_CONCURRENCY) -> np.ndarray:
+    """
+    Embed `texts` into one (len(texts), dim) float32 array. On the API backend the
+    inputs are split by count and token budget, batches are sent concurrently, and
+    base64 payloads are decoded straight into the preallocated output rows.
+    """
+    if (backend or _default_backend) == "local":
+        return encode_local(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    client = get_client()
+    out, out_lock = None, threading.Lock()
+    enqueued_at = time.perf_counter()
+
+    def run_batch(bounds):
+        nonlocal out
+        start, end = bounds
+        instrumentation.record_queue_wait("embedding", time.perf_counter() - enqueued_at)
+        with instrumentation.span("embedding", model=model, n_inputs=end - start):
+            resp = client.embeddings.create(input=texts[start:end], model=model,
+                                            encoding_format="base64")
+        instrumentation.record_usage(resp.usage, model, "embedding")
+        for d in resp.data:
+            vec = _decode_embedding(d.embedding)
+            if out is None:
+                with out_lock:
+                    if out is None:
+                        out = np.empty((len(texts), vec.shape[0]), dtype=np.float32)
+            out[start + d.index] = vec
+
+    batches = make_embedding_batches(texts, model)
+    if len(batches) == 1:
+        run_batch(batches[0])
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as exe:
+            list(exe.map(instrumentation.bind_context(run_batch), batches))   # re-raises the first batch error
+    return out
+
+def embed_chunks(df, text_column="chunk", embedding_column="chunk_embedding",
+                 model="text-embedding-3-small", backend: str = None, fallback_column: str = None):
+    """
+    Embed `text_column` at ingest (raw chunks in lazy-summary mode, summaries for
+    the persisted chunk store), one float32 vector per row. Rows without text
+    there (e.g. a failed summary) embed `fallback_column` instead.
+    The backend used is recorded in df.attrs so queries are embedded the same way.
+    """
+    texts = df[text_column].tolist()
+    if fallback_column is not None:
+        texts = [t if isinstance(t, str) else f for t, f in zip(texts, df[fallback_column].tolist())]
+    vecs = get_embeddings_parallel(texts, model, backend)
+    df[embedding_column] = pd.Series(list(vecs), index=df.index, dtype=object)
+    df.attrs["embedding_backend"] = backend or _default_backend
+    return df
+
+def make_query_sentence(data_item: str) -> str:
+    return f"This query is about {data_item.lower()} in the annual report."
+
+@lru_cache(maxsize=1024)
+def _embed_query_sentence(sent: str, model: str, backend: str) -> np.ndarray:
+    vec = np.array(get_embedding_single(sent, model, backend))
+    vec.flags.writeable = False     # shared between callers
+    return vec
+
+def embed_data_item_query(data_item: str, model="text-embedding-3-small", backend: str = None) -> np.ndarray:
+    """Query vector for `data_item`; cached, since routing and retrieval both need it."""
+    return _embed_query_sentence(make_query_sentence(data_item), model, backend or _default_backend)
+
+@lru_cache(maxsize=8)
+def _section_definition_embeddings(model: str, backend: str):
+    from utils_task_2.constants import SECTION_DEFINITIONS
+    names = list(SECTION_DEFINITIONS.keys())
+    embs  = np.vstack(get_embeddings_parallel(list(SECTION_DEFINITIONS.values()), model, backend))
+    embs.flags.writeable = False
+    return names, embs
+
+def section_definition_embeddings(model="text-embedding-3-small", backend: str = None):
+    """(section names, SECTION_DEFINITIONS vectors), embedded once per model/backend."""
+    return _section_definition_embeddings(model, backend or _default_backend)
+
+def top_k_sections_by_similarity(
+    data_item: str, k=3, model="text-embedding-3-small", backend: str = None
+) -> list[str]:
+    from utils_task_2.constants import SECTION_NAME_TO_ID
+
+    # definitions are embedded once; the query vector is shared with the router
+    names, embs = section_definition_embeddings(model, backend)
+    q_emb = embed_data_item_query(data_item, model, backend).reshape(1,-1)
+
+    sims   = cosine_similarity(q_emb, embs)[0]
+    idxs   = sims.argsort()[::-1][:k]
+    return [ SECTION_NAME_TO_ID[names[i]] for i in idxs ]
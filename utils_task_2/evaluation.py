@@ -0,0 +1,341 @@
+# utils_task_2/evaluation.py
+"""
+Evaluation harness: run the RAG and GraphRAG engines over a query set with
+bounded concurrency, score answers against ground truth, and gate on a stored
+baseline.
+
+    python -m utils_task_2.evaluation --engines rag graph --concurrency 4 \
+        --baseline eval_results/baseline.json
+
+Per query it records exact / normalized match (plus an optional LLM judge
+verdict), latency, the tokens of every model call the query made, and whether
+the retrieved contexts contain the ground truth. Tokens are counted per query
+with instrumentation.collect_usage: every model call (RAG and GraphRAG alike,
+since llama_index goes through the provider) reports its usage to the
+collector of the query that made it, so counts stay exact with concurrent
+queries. The judge's calls are not included. Estimated USD cost per model and
+stage is kept in the metrics counters (cost_usd_total) when metrics are on.
+"""
+import os, re, sys, json, time, string, logging, argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils_task_2 import instrumentation
+from utils_task_2.providers import get_client
+from utils_task_2.summarization import retry_on_exception
+from utils_task_2.logging_utils import log_usage
+
+ENGINES = ("rag", "graph")
+DEFAULT_REPORT = "eval_results/report.json"
+JUDGE_MODEL = "gpt-4.1-nano-2025-04-14"
+JUDGE_SCORES = {"correct": 1.0, "partially_correct": 0.5, "incorrect": 0.0}
+
+# default regression gates against the baseline report
+MAX_ACCURACY_DROP = 0.05        # absolute drop in normalized-match (and judge) accuracy
+MAX_P95_REGRESSION = 0.20       # relative increase in p95 latency
+
+_ARTICLES_RE = re.compile(r"\b(?:a|an|the)\b")
+_PUNCT = str.maketrans("", "", string.punctuation.replace("%", "").replace(".", ""))
+_STOPWORDS = {"the", "a", "an", "of", "and", "or", "in", "on", "to", "as", "its", "is", "was", "by", "for"}
+
+
+# -- scoring -----------------------------------------------------------------
+def normalize_answer(text) -> str:
+    """Lower-case, drop punctuation/articles, unify numbers ("$9.3 billion" == "9.3 billion", "144,000" == "144000")."""
+    text = str(text or "").lower().replace("percents", "%").replace("percent", "%")
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", text)
+    text = re.sub(r"\.(?!\d)", " ", text.translate(_PUNCT))
+    return " ".join(_ARTICLES_RE.sub(" ", text).split())
+
+
+def _tokens(text) -> set:
+    return {t for t in re.findall(r"[a-z0-9.%]+", normalize_answer(text)) if t not in _STOPWORDS}
+
+
+def token_recall(ground_truth, text) -> float:
+    """Share of the ground truth's content tokens found in `text`."""
+    gt = _tokens(ground_truth)
+    return len(gt & _tokens(text)) / len(gt) if gt else 0.0
+
+
+def score_answer(answer, ground_truth) -> dict:
+    """
+    exact      : identical after whitespace/case folding
+    normalized : normalized ground truth equals, or is contained in, the normalized answer
+    token_recall: share of ground-truth content tokens present in the answer
+    """
+    norm_a, norm_gt = normalize_answer(answer), normalize_answer(ground_truth)
+    return {
+        "exact":        " ".join(str(answer or "").lower().split()) == " ".join(ground_truth.lower().split()),
+        "normalized":   bool(norm_gt) and (norm_a == norm_gt or f" {norm_gt} " in f" {norm_a} "),
+        "token_recall": round(token_recall(ground_truth, answer), 3),
+    }
+
+
+def context_hit(ground_truth, contexts, min_recall: float = 0.6) -> bool:
+    """True when some retrieved context contains most of the ground truth's content tokens."""
+    return any(token_recall(ground_truth, c) >= min_recall for c in contexts)
+
+
+@retry_on_exception
+def judge_answer(question: str, answer: str, ground_truth: str, model: str = JUDGE_MODEL) -> dict:
+    """LLM judge: {"verdict": correct|partially_correct|incorrect, "reason": ...}."""
+    system = """You grade answers to questions about SEC 10-K filings against a reference answer.
+Return "correct" if the answer states the same facts as the reference (wording and
+formatting may differ), "partially_correct" if it is incomplete or partly wrong,
+otherwise "incorrect". Respond only with JSON: {"verdict":"...","reason":"..."}"""
+    with instrumentation.span("llm", stage="judge", model=model):
+        resp = get_client().responses.create(
+            model=model,
+            input=[
+                {"role":"system","content":system},
+                {"role":"user",  "content":f"Question: {question}\nReference: {ground_truth}\nAnswer: {answer}"}
+            ],
+            text={
+                "format":{
+                    "type":"json_schema",
+                    "name":"answer_judgement",
+                    "schema":{
+                        "type":"object",
+                        "properties":{
+                            "verdict":{"type":"string","enum":list(JUDGE_SCORES)},
+                            "reason": {"type":"string"}
+                        },
+                        "required":["verdict","reason"],
+                        "additionalProperties":False
+                    },
+                    "strict":True
+                }
+            }
+        )
+    log_usage(resp.usage, "judge", model=model)
+    return json.loads(resp.output_text)
+
+
+# -- running -----------------------------------------------------------------
+def _run_engine(engine, chunk_df, question, top_k_chunk, top_k_section):
+    """(answer text, list of retrieved context texts) from one engine."""
+    from utils_task_2 import answer
+    if engine == "rag":
+        result, contexts = answer.answer_query(chunk_df, question, top_k_chunk=top_k_chunk,
+                                               top_k_section=top_k_section, include_neighbors=False)
+        return result["answer"], [c["chunk"] for c in contexts]
+    result, sources = answer.graphRAG_query(chunk_df, question, top_k_section=top_k_section)
+    return str(result), list(sources)
+
+
+def evaluate_one(engine, chunk_df, test, judge=False, top_k_chunk=3, top_k_section=3) -> dict:
+    """Answer and score a single {"query", "ground_truth"} item with one engine."""
+    q, gt = test["query"], test["ground_truth"]
+    record = {"engine": engine, "query": q, "ground_truth": gt, "answer": None, "error": None}
+    with instrumentation.collect_usage() as calls:
+        t0 = time.perf_counter()
+        try:
+            with instrumentation.span("query", engine=engine, eval=True):
+                ans, contexts = _run_engine(engine, chunk_df, q, top_k_chunk, top_k_section)
+            record["answer"] = ans
+        except Exception as e:
+            logging.error(f"[{engine}] failed on {q!r}: {e}")
+            record["error"] = repr(e)
+            contexts = []
+        record["latency_s"] = round(time.perf_counter() - t0, 4)
+        # tokens of the answering calls only; the judge is counted separately
+        record["input_tokens"] = sum(c[2] for c in calls)
+        record["output_tokens"] = sum(c[3] for c in calls)
+        record["model_calls"] = len(calls)
+
+    record.update(score_answer(record["answer"], gt))
+    record["context_hit"] = context_hit(gt, contexts)
+    record["n_contexts"] = len(contexts)
+    if judge and record["error"] is None:
+        try:
+            verdict = judge_answer(q, record["answer"], gt)
+            record["judge_verdict"] = verdict["verdict"]
+            record["judge_score"] = JUDGE_SCORES[verdict["verdict"]]
+            record["judge_reason"] = verdict["reason"]
+        except Exception as e:
+            logging.warning(f"Judge failed on {q!r}: {e}")
+            record["judge_verdict"] = record["judge_score"] = None
+    elif judge:
+        record["judge_verdict"], record["judge_score"] = "error", 0.0
+    return record
+
+
+def summarize_records(records) -> dict:
+    """Accuracy, latency percentiles, token and hit-rate aggregates for one engine."""
+    lat = np.array([r["latency_s"] for r in records], dtype=float)
+    judged = [r["judge_score"] for r in records if r.get("judge_score") is not None]
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if lat.size else (0.0, 0.0, 0.0)
+    return {
+        "n":                  len(records),
+        "errors":             sum(r["error"] is not None for r in records),
+        "exact_match":        round(float(np.mean([r["exact"] for r in records])), 4),
+        "normalized_match":   round(float(np.mean([r["normalized"] for r in records])), 4),
+        "mean_token_recall":  round(float(np.mean([r["token_recall"] for r in records])), 4),
+        "judge_accuracy":     round(float(np.mean(judged)), 4) if judged else None,
+        "context_hit_rate":   round(float(np.mean([r["context_hit"] for r in records])), 4),
+        "latency_p50_s":      round(float(p50), 4),
+        "latency_p95_s":      round(float(p95), 4),
+        "latency_p99_s":      round(float(p99), 4),
+        "input_tokens":       int(sum(r["input_tokens"] for r in records)),
+        "output_tokens":      int(sum(r["output_tokens"] for r in records)),
+        "tokens_per_query":   round(float(np.mean([r["input_tokens"] + r["output_tokens"]
+                                                   for r in records])), 1),
+    }
+
+
+def run_evaluation(chunk_df, queries, engines=ENGINES, concurrency: int = 4, judge: bool = False,
+                   top_k_chunk: int = 3, top_k_section: int = 3) -> dict:
+    """
+    Evaluate every (engine, query) pair on a pool of `concurrency` threads.
+    Returns {"meta", "engines": {engine: summary}, "records": [...]}, records in input order.
+    """
+    tasks = [(engine, test) for engine in engines for test in queries]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="eval") as exe:
+        records = list(exe.map(
+            lambda t: evaluate_one(t[0], chunk_df, t[1], judge, top_k_chunk, top_k_section), tasks
+        ))
+    wall = time.perf_counter() - t0
+    return {
+        "meta": {
+            "timestamp":   datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "engines":     list(engines),
+            "n_queries":   len(queries),
+            "concurrency": concurrency,
+            "judge":       judge,
+            "wall_s":      round(wall, 3),
+        },
+        "engines": {e: summarize_records([r for r in records if r["engine"] == e]) for e in engines},
+        "records": records,
+    }
+
+
+# -- baseline gating ---------------------------------------------------------
+def compare_to_baseline(report, baseline, max_accuracy_drop: float = MAX_ACCURACY_DROP,
+                        max_p95_regression: float = MAX_P95_REGRESSION) -> list:
+    """List of regression messages (empty when every gated metric is within bounds)."""
+    failures = []
+    for engine, cur in report["engines"].items():
+        base = baseline.get("engines", {}).get(engine)
+        if base is None:
+            continue
+        for metric in ("normalized_match", "judge_accuracy"):
+            if cur.get(metric) is None or base.get(metric) is None:
+                continue
+            if cur[metric] < base[metric] - max_accuracy_drop:
+                failures.append(f"{engine}: {metric} {cur[metric]:.3f} < baseline "
+                                f"{base[metric]:.3f} - {max_accuracy_drop}")
+        if base.get("latency_p95_s") and \
+                cur["latency_p95_s"] > base["latency_p95_s"] * (1 + max_p95_regression):
+            failures.append(f"{engine}: p95 latency {cur['latency_p95_s']:.3f}s > baseline "
+                            f"{base['latency_p95_s']:.3f}s + {max_p95_regression:.0%}")
+    return failures
+
+
+def format_report(report, baseline=None) -> str:
+    """Markdown comparison table (engines side by side, with baseline values when given)."""
+    metrics = ["normalized_match", "exact_match", "judge_accuracy", "mean_token_recall",
+               "context_hit_rate", "latency_p50_s", "latency_p95_s", "tokens_per_query", "errors"]
+    engines = list(report["engines"])
+    cols = list(engines) + ([f"{e} (baseline)" for e in engines] if baseline else [])
+    lines = [f"# Evaluation report ({report['meta']['timestamp']})", "",
+             f"{report['meta']['n_queries']} queries, concurrency {report['meta']['concurrency']}, "
+             f"wall {report['meta']['wall_s']}s", "",
+             "| metric | " + " | ".join(cols) + " |",
+             "|---" * (len(cols) + 1) + "|"]
+    for m in metrics:
+        vals = [report["engines"][e].get(m) for e in engines]
+        if baseline:
+            vals += [baseline.get("engines", {}).get(e, {}).get(m) for e in engines]
+        lines.append(f"| {m} | " + " | ".join("-" if v is None else str(v) for v in vals) + " |")
+    lines += ["", "## Per query", "",
+              "| engine | query | normalized | hit | latency_s | answer |", "|---|---|---|---|---|---|"]
+    for r in report["records"]:
+        answer = (r["answer"] or r["error"] or "").replace("|", "/").replace("\n", " ")[:80]
+        lines.append(f"| {r['engine']} | {r['query'][:60]} | {r['normalized']} | "
+                     f"{r['context_hit']} | {r['latency_s']} | {answer} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, path=DEFAULT_REPORT, baseline=None):
+    """Write the JSON report and a Markdown table next to it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    md_path = os.path.splitext(path)[0] + ".md"
+    with open(md_path, "w") as f:
+        f.write(format_report(report, baseline))
+    print(f"[INFO] Wrote evaluation report to {path} and {md_path}")
+
+
+def load_queries(path=None) -> list:
+    """A JSON list of {"query", "ground_truth"}; TEST_QUERIES by default."""
+    if path is None:
+        from utils_task_2.constants import TEST_QUERIES
+        return TEST_QUERIES
+    with open(path) as f:
+        return json.load(f)
+
+
+def add_arguments(ap):
+    ap.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    ap.add_argument("--queries", default=None, help='JSON list of {"query", "ground_truth"} (default TEST_QUERIES)')
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--judge", action="store_true", help="also score answers with an LLM judge")
+    ap.add_argument("--top-k-chunk", type=int, default=3)
+    ap.add_argument("--top-k-section", type=int, default=3)
+    ap.add_argument("--out", default=DEFAULT_REPORT)
+    ap.add_argument("--baseline", default=None, help="report to gate against; exit 1 on regression")
+    ap.add_argument("--save-baseline", action="store_true",
+                    help="write this run's report to --baseline (after gating)")
+    ap.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP)
+    ap.add_argument("--max-p95-regression", type=float, default=MAX_P95_REGRESSION)
+    return ap
+
+
+def evaluate(chunk_df, args) -> int:
+    """Run, report and gate from parsed arguments; returns the process exit code."""
+    instrumentation.enable()
+    report = run_evaluation(chunk_df, load_queries(args.queries), args.engines, args.concurrency,
+                            args.judge, args.top_k_chunk, args.top_k_section)
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    write_report(report, args.out, baseline)
+
+    for engine, s in report["engines"].items():
+        judge = f"  judge={s['judge_accuracy']:.2f}" if s["judge_accuracy"] is not None else ""
+        print(f"{engine:<6} normalized={s['normalized_match']:.2f}  exact={s['exact_match']:.2f}{judge}  "
+              f"hit_rate={s['context_hit_rate']:.2f}  p50={s['latency_p50_s']:.2f}s  "
+              f"p95={s['latency_p95_s']:.2f}s  tokens/query={s['tokens_per_query']:.0f}  errors={s['errors']}")
+
+    failures = []
+    if baseline is not None:
+        failures = compare_to_baseline(report, baseline, args.max_accuracy_drop, args.max_p95_regression)
+        for msg in failures:
+            print(f"[FAIL] {msg}")
+        if not failures:
+            print(f"[INFO] No regressions against {args.baseline}")
+    elif args.baseline:
+        print(f"[INFO] No baseline at {args.baseline} yet")
+    if args.save_baseline and args.baseline and not failures:
+        write_report(report, args.baseline)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    ap = add_arguments(argparse.ArgumentParser(description="RAG vs GraphRAG evaluation harness"))
+    ap.add_argument("--chunk-store", default=None)
+    args = ap.parse_args(argv)
+
+    from utils_task_2.chunk_store import DEFAULT_CHUNK_STORE, load_chunk_store
+    chunk_df = load_chunk_store(args.chunk_store or DEFAULT_CHUNK_STORE)
+    sys.exit(evaluate(chunk_df, args))
+
+
+if __name__ == "__main__":
+    main()
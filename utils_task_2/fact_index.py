@@ -0,0 +1,271 @@
+# utils_task_2/fact_index.py
+"""
+Numeric facts from the tables in Selected Financial Data, MD&A and Financial
+Statements chunks, for answering "what was X in <year>" questions without
+retrieval or an LLM call.
+
+Table rows survive chunking as runs of label words followed by a run of
+numbers ("Depreciation and amortization 10,903 10,157 8,157"). Year-only runs
+("2018 2017 2016") set the column periods for the rows after them; without a
+header, columns are assumed to run back from the filing year. Each value becomes
+a (ticker, year, item, period, value, unit) row in a columnar DataFrame.
+Here `item` is the normalized line item and `year` is the filing year.
+
+answer_with_facts() answers a numeric question from the index when a line
+item of that filing matches it, and otherwise falls back to answer_query.
+"""
+import os, re, logging
+
+import pandas as pd
+
+from utils_task_2 import instrumentation
+from utils_task_2.constants import SECTION_ID_TO_NAME
+
+FACT_SECTIONS = ("section_6", "section_7", "section_8")
+# preferred source when the same line item appears in several sections
+SECTION_PRIORITY = {"section_8": 0, "section_6": 1, "section_7": 2}
+MAX_LABEL_WORDS = 8
+
+_NUMBER_RE = re.compile(r"^\(?-?\$?\(?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\)?%?$")
+_YEAR_RE = re.compile(r"^(?:19[89]\d|20[0-4]\d)$")
+_FOOTNOTE_RE = re.compile(r"^\(\d\)$")
+_DASHES = {"—", "–", "-", "--", "−"}
+_UNITS = {"thousands": "thousand", "millions": "million", "billions": "billion"}
+_STOPWORDS = {"and", "of", "the", "a", "an", "in", "on", "for", "to", "from", "by", "its", "at", "as"}
+_QUESTION_WORDS = {"what", "how", "much", "many", "did", "does", "do", "was", "were", "is", "are",
+                   "report", "reported", "reports", "company", "s", "amount", "value", "fiscal", "year"}
+_SYNONYMS = {"spend": "expense", "spent": "expense", "expenditure": "expense"}
+# question words a line item need not contain ("how much did X spend on R&D" = "R&D")
+_UNQUALIFIED = {"total", "according", "expense"}
+_MONTHS = {"january", "february", "march", "april", "may", "june", "july", "august",
+           "september", "october", "november", "december"}
+
+_NUMERIC_INTENT_RE = re.compile(
+    r"\b(?:how much|how many|what (?:was|were|is|are|amount)|amount|total|expenses?|revenues?|"
+    r"income|sales|costs?|cash|assets|liabilities|earnings|margin|spen[dt])\b", re.I)
+_NON_NUMERIC_RE = re.compile(
+    r"\b(?:method|why|describe|define|explain|which|what kind|policy|policies|classif\w*|"
+    r"how (?:does|do|did|is|are|was|were)\b(?! much| many))", re.I)
+
+
+def _item_tokens(text) -> list:
+    words = re.findall(r"[a-z0-9]+", str(text).lower().replace("&", " and "))
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+             for w in words if w not in _STOPWORDS]
+    return [_SYNONYMS.get(w, w) for w in words]
+
+
+def normalize_item(label: str) -> str:
+    """'Depreciation & Amortization' -> 'depreciation amortization' (stopwords, plurals dropped)."""
+    return " ".join(_item_tokens(label))
+
+
+def _parse_value(tok: str):
+    neg = tok.startswith("(") or tok.startswith("-")
+    digits = re.sub(r"[^\d.]", "", tok)
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return -value if neg else value
+
+
+def extract_facts(text: str, ticker=None, year=None, section=None, row_id=None) -> list:
+    """Line-item facts from the table rows in one chunk or section text (see module docstring)."""
+    facts, label, values, pending_years = [], [], [], []
+    periods, unit, has_dollar, has_pct = None, None, False, False
+    table_dollar = False     # "$" is usually printed on a table's first and total rows only
+    filing_year = int(year) if str(year).isdigit() else None
+
+    def flush():
+        nonlocal periods, pending_years, table_dollar
+        years = [v for v in values if v is not None and _YEAR_RE.match(v)]
+        if years:
+            # header cells ("2018 2017 2016", "September 29, 2018 ...") — not a data row
+            pending_years += years
+            return
+        words = label[-MAX_LABEL_WORDS:]
+        for i in range(len(words) - 1, -1, -1):     # label starts after the last sentence end
+            if words[i][-1] in ".:;" and i < len(words) - 1:
+                words = words[i + 1:]
+                break
+        if len(values) < 2 or not any(len(w) > 2 and w.isalpha() for w in words) or \
+                any(w.lower().strip(",") in _MONTHS for w in words):
+            return
+        header = list(dict.fromkeys(pending_years))
+        if len(header) >= 2:
+            periods, pending_years, table_dollar = [int(y) for y in header], [], False
+        table_dollar |= has_dollar
+        cols = periods if periods and len(periods) == len(values) else \
+            ([filing_year - i for i in range(len(values))] if filing_year else None)
+        if cols is None:
+            return
+        raw_label = " ".join(words).strip(" ,$")
+        item = normalize_item(raw_label)
+        if not item:
+            return
+        for period, v in zip(cols, values):
+            value = _parse_value(v) if v is not None else None
+            if value is None:
+                continue
+            facts.append({
+                "ticker": ticker, "year": year, "item": item, "label": raw_label,
+                "period": period, "value": value,
+                "unit": "%" if has_pct or v.endswith("%") else unit,
+                "currency": table_dollar and not (has_pct or v.endswith("%")),
+                "section": section, "row_id": row_id,
+            })
+
+    prev = ""
+    for tok in text.split():
+        t = tok.rstrip(",;")
+        if t == "$":
+            has_dollar = True
+        elif t == "%":
+            has_pct = True
+        elif _FOOTNOTE_RE.match(t):
+            pass
+        elif _NUMBER_RE.match(t) or (t in _DASHES and values):
+            has_dollar |= "$" in t
+            values.append(None if t in _DASHES else t)
+        else:
+            if values:
+                flush()
+                label, values, has_dollar, has_pct = [], [], False, False
+            if prev.lower().lstrip("(") == "in" and t.lower().strip("()") in _UNITS:
+                unit = _UNITS[t.lower().strip("()")]
+            label.append(tok)
+        prev = t
+    if values:
+        flush()
+    return facts
+
+
+def build_fact_frame(chunk_df) -> pd.DataFrame:
+    """Columnar fact table for every FACT_SECTIONS chunk of `chunk_df`."""
+    rows = chunk_df[chunk_df.section.isin(FACT_SECTIONS)] if len(chunk_df) else chunk_df
+    facts = []
+    with instrumentation.span("fact_extract", n_chunks=len(rows)):
+        for row_id, r in rows.iterrows():
+            facts.extend(extract_facts(r["chunk"], r["ticker"], r["year"], r["section"], row_id))
+    df = pd.DataFrame(facts, columns=["ticker", "year", "item", "label", "period", "value",
+                                      "unit", "currency", "section", "row_id"])
+    df = df.drop_duplicates(["ticker", "year", "item", "period", "value", "section"])
+    for col in ("ticker", "year", "item", "unit", "section"):
+        df[col] = df[col].astype("category")
+    df["period"] = df["period"].astype("int16")
+    return df.reset_index(drop=True)
+
+
+def _format_value(value, unit, currency) -> str:
+    unit = None if pd.isna(unit) else unit
+    if unit == "%":
+        return f"{value:g}%"
+    num = f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+    if num.startswith("-"):
+        num = f"({num[1:]})"
+    return f"{'$' if currency else ''}{num}{f' {unit}' if unit else ''}"
+
+
+class FactIndex:
+    """Facts grouped by (ticker, filing year); lookups scan only that filing's line items."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self._by_filing = {
+            (str(t), str(y)): g for (t, y), g in frame.groupby(["ticker", "year"], observed=True)
+        }
+        self._tokens = {item: frozenset(item.split()) for item in frame["item"].unique()}
+
+    @classmethod
+    def from_chunk_df(cls, chunk_df):
+        return cls(build_fact_frame(chunk_df))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def lookup(self, user_query: str):
+        """The fact a numeric question asks for, or None when no line item matches."""
+        from utils_task_2.query_router import match_filing
+
+        if not _NUMERIC_INTENT_RE.search(user_query) or _NON_NUMERIC_RE.search(user_query):
+            return None
+        target = match_filing(user_query)
+        facts = self._by_filing.get((str(target["ticker"]), str(target["year"])))
+        if facts is None or target["confidence"] < 0.9:
+            return None
+        question = set(_item_tokens(target["data_item"])) - _QUESTION_WORDS
+        if not question:
+            return None
+
+        # most specific line item whose words all appear in the question and which
+        # covers the whole question: "net sales of iPhone", "net income growth" or
+        # "percentage of net sales" are not the "net sales" / "net income" rows
+        matches = [item for item in facts["item"].unique()
+                   if self._tokens[item] <= question and
+                   not question - self._tokens[item] - _UNQUALIFIED and
+                   (len(self._tokens[item]) >= 2 or len(question) == 1)]
+        if not matches:
+            return None
+        item = max(matches, key=lambda i: len(self._tokens[i]))
+
+        years = [int(y) for y in re.findall(r"\b(?:19|20)\d{2}\b", user_query)]
+        other = [y for y in years if str(y) != str(target["year"])]
+        period = other[0] if other else int(target["year"])
+        hits = facts[(facts["item"] == item) & (facts["period"] == period)]
+        if hits.empty:
+            return None
+        best = hits.iloc[hits["section"].map(lambda s: SECTION_PRIORITY.get(s, 9)).astype(int).argmin()]
+        return {**best.to_dict(), "ticker": str(best["ticker"]), "year": str(best["year"]),
+                "item": str(best["item"]), "period": int(best["period"])}
+
+    def answer(self, user_query: str):
+        """(qa_response dict, [fact]) like answer_query, or None when the index has no match."""
+        with instrumentation.span("fact_lookup") as sp:
+            fact = self.lookup(user_query)
+            sp.set(hit=fact is not None)
+        instrumentation.incr("fact_index_total", result="hit" if fact else "miss")
+        if fact is None:
+            return None
+        section = SECTION_ID_TO_NAME.get(fact["section"], fact["section"])
+        return {
+            "answer": _format_value(fact["value"], fact["unit"], fact["currency"]),
+            "explanation": (f"From the {fact['ticker'].upper()} {fact['year']} 10-K {section} table: "
+                            f"'{fact['label']}' for fiscal {fact['period']} (fact index, no LLM call)."),
+            "relevance": True,
+        }, [fact]
+
+
+def load_fact_index(path: str = None) -> FactIndex:
+    """
+    Fact index of the chunk store at `path` (facts are saved per filing at
+    ingest; filings ingested before that are extracted from their shards).
+    """
+    from utils_task_2.chunk_store import DEFAULT_CHUNK_STORE, read_manifest
+
+    path = path or DEFAULT_CHUNK_STORE
+    if os.path.isfile(path):
+        return FactIndex.from_chunk_df(pd.read_pickle(path))
+    frames = []
+    for _, entry in sorted(((read_manifest(path) or {}).get("filings") or {}).items()):
+        if entry.get("facts"):
+            frames.append(pd.read_pickle(os.path.join(path, entry["facts"])))
+        else:
+            frames.append(build_fact_frame(pd.read_pickle(os.path.join(path, entry["shard"]))))
+    frame = pd.concat([f.astype({c: "object" for c in ("ticker", "year", "item", "unit", "section")})
+                       for f in frames], ignore_index=True) if frames else build_fact_frame(pd.DataFrame())
+    for col in ("ticker", "year", "item", "unit", "section"):
+        frame[col] = frame[col].astype("category")
+    logging.info(f"Loaded {len(frame)} numeric facts from {path}")
+    return FactIndex(frame)
+
+
+def answer_with_facts(chunk_df, user_query: str, facts: FactIndex = None, **answer_kwargs):
+    """Answer from the fact index when a line item matches, else answer_query(**answer_kwargs)."""
+    if facts is not None:
+        hit = facts.answer(user_query)
+        if hit is not None:
+            logging.info(f"Answered from the fact index: {hit[0]['answer']}")
+            return hit
+    from utils_task_2.answer import answer_query
+    return answer_query(chunk_df, user_query, **answer_kwargs)
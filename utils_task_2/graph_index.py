@@ -0,0 +1,288 @@
+# utils_task_2/graph_index.py
+
+import os, glob, json, logging, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.auto import tqdm
+from utils_task_2.providers import get_client
+from utils_task_2.summarization import retry_on_exception
+from utils_task_2 import instrumentation
+
+TRIPLET_MODEL = "gpt-4.1-nano-2025-04-14"
+DEFAULT_CACHE_PATH = os.path.join(os.environ.get("TENK_CACHE_DIR", ".cache"), "triplets.jsonl")
+MAX_OBJECT_LENGTH = 128   # same byte limit llama_index applies to parsed triplets
+GRAPH_STORE_DIR = os.path.join(os.environ.get("TENK_CACHE_DIR", ".cache"), "graphs")
+GRAPH_STORES = ("sqlite", "memory")
+
+_graph_stores = {}   # db path -> open SQLiteGraphStore (keeps its hot-node cache warm)
+_precompute_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="khop")
+_precompute_pending = set()
+_precompute_lock = threading.Lock()
+
+
+def content_key(text: str, model: str = TRIPLET_MODEL, max_triplets: int = 10) -> str:
+    """Cache key: hash of the chunk content plus the extraction settings."""
+    return hashlib.sha256(f"{model}\x00{max_triplets}\x00{text}".encode()).hexdigest()
+
+
+class TripletCache:
+    """
+    Append-only JSON-lines cache of extracted triplets, keyed by content_key().
+    Safe to share between extraction threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue   # torn write from an interrupted run
+                    self._data[rec["key"]] = [tuple(t) for t in rec["triplets"]]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def put(self, key, triplets):
+        with self._lock:
+            self._data[key] = triplets
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"key": key, "triplets": triplets}) + "\n")
+
+
+def _clean_triplets(raw, max_triplets):
+    """Normalize like llama_index's parser: strip quotes, capitalize, drop partial/oversized."""
+    out = []
+    for t in raw:
+        parts = [str(t.get(k, "")).strip().strip('"') for k in ("subject", "predicate", "object")]
+        if not all(parts) or any(len(p.encode("utf-8")) > MAX_OBJECT_LENGTH for p in parts):
+            continue
+        out.append(tuple(p.capitalize() for p in parts))
+    return out[:max_triplets]
+
+
+@retry_on_exception
+def extract_triplets(text: str, max_triplets: int = 10, model: str = TRIPLET_MODEL) -> list[tuple]:
+    """LLM call: up to `max_triplets` (subject, predicate, object) triplets from one chunk."""
+    system = f"""Extract up to {max_triplets} knowledge triplets (subject, predicate, object)
+from the 10-K excerpt. Use short entity names, avoid stopwords, and only state facts
+present in the text. Return only: {{"triplets":[{{"subject":"...","predicate":"...","object":"..."}}]}}"""
+    with instrumentation.span("llm", stage="triplet_extraction", model=model):
+        resp = get_client().responses.create(
+            model=model,
+            input=[
+                {"role":"system","content":system},
+                {"role":"user",  "content":text}
+            ],
+            text={
+                "format":{
+                    "type":"json_schema",
+                    "name":"knowledge_triplets",
+                    "schema":{
+                        "type":"object",
+                        "properties":{
+                            "triplets":{
+                                "type":"array",
+                                "items":{
+                                    "type":"object",
+                                    "properties":{
+                                        "subject":  {"type":"string"},
+                                        "predicate":{"type":"string"},
+                                        "object":   {"type":"string"}
+                                    },
+                                    "required":["subject","predicate","object"],
+                                    "additionalProperties":False
+                                }
+                            }
+                        },
+                        "required":["triplets"],
+                        "additionalProperties":False
+                    },
+                    "strict":True
+                }
+            }
+        )
+    instrumentation.record_usage(resp.usage, model, "triplet_extraction")
+    return _clean_triplets(json.loads(resp.output_text)["triplets"], max_triplets)
+
+
+def extract_triplets_parallel(texts, cache: TripletCache = None, max_workers: int = 8,
+                              max_triplets: int = 10, model: str = TRIPLET_MODEL) -> dict:
+    """
+    Extract triplets for every distinct text with bounded parallelism, skipping
+    texts already in `cache`. Returns {content_key: triplets}; failed extractions
+    map to [] and are not cached, so the next build retries them.
+    """
+    keys = {content_key(t, model, max_triplets): t for t in texts}
+    results = {}
+    todo = []
+    for key, text in keys.items():
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            results[key] = hit
+        else:
+            todo.append((key, text))
+    logging.info(f"Triplet extraction: {len(results)} cached, {len(todo)} to extract")
+
+    def run(item):
+        key, text = item
+        try:
+            triplets = extract_triplets(text, max_triplets, model)
+        except Exception as e:
+            logging.warning(f"Triplet extraction failed: {e}")
+            return key, None
+        if cache is not None:
+            cache.put(key, triplets)
+        return key, triplets
+
+    if todo:
+        with instrumentation.span("extract_triplets", n_chunks=len(todo)), \
+                ThreadPoolExecutor(max_workers=max_workers) as exe:
+            for key, triplets in tqdm(exe.map(instrumentation.bind_context(run), todo), total=len(todo), desc="Extracting triplets"):
+                results[key] = triplets or []
+    return results
+
+
+def build_kg_index(texts, storage_context, cache: TripletCache = None, max_workers: int = 8,
+                   max_triplets: int = 10, include_embeddings: bool = True, triplet_texts=None):
+    """
+    Build a KnowledgeGraphIndex over `texts` from concurrently pre-extracted
+    (and cached) triplets instead of llama_index's one-chunk-at-a-time LLM loop.
+    The index struct is assembled here and the graph store loaded in one
+    upsert_triplets call (SQLiteGraphStore; stores without it get one
+    upsert_triplet per triplet). Triplet embeddings are computed in one
+    batched call and bulk-added.
+    `triplet_texts[i]`, when given and a string, is the text whose triplets
+    texts[i] reuses (its near-duplicate representative, see dedup.py).
+    """
+    from llama_index.core import Document, KnowledgeGraphIndex, Settings
+    from llama_index.core.data_structs.data_structs import KG
+    from llama_index.core.ingestion import run_transformations
+    from llama_index.core.schema import MetadataMode
+    from utils_task_2.embedding import get_embeddings_parallel
+
+    source = {t: s for t, s in zip(texts, triplet_texts or []) if isinstance(s, str)}
+    triplets_by_key = extract_triplets_parallel([source.get(t, t) for t in texts], cache,
+                                                max_workers, max_triplets)
+
+    def lookup(text):
+        key = content_key(source.get(text, text), TRIPLET_MODEL, max_triplets)
+        if key not in triplets_by_key:   # node text differs from the chunk (e.g. re-split)
+            triplets_by_key.update(extract_triplets_parallel([source.get(text, text)], cache, 1, max_triplets))
+        return triplets_by_key[key]
+
+    # what KnowledgeGraphIndex.from_documents does, minus the per-triplet store writes
+    documents = [Document(text=t) for t in texts]
+    for doc in documents:
+        storage_context.docstore.set_document_hash(doc.id_, doc.hash)
+    nodes = run_transformations(documents, Settings.transformations)
+    storage_context.docstore.add_documents(nodes, allow_update=True)
+    index_struct, graph_triplets = KG(), []
+    for node in nodes:
+        for subj, rel, obj in lookup(node.get_content(metadata_mode=MetadataMode.LLM)):
+            graph_triplets.append((subj, rel, obj))
+            index_struct.add_node([subj, obj], node)
+
+    graph_store = storage_context.graph_store
+    with instrumentation.span("graph_load", n_triplets=len(graph_triplets)):
+        if hasattr(graph_store, "upsert_triplets"):
+            graph_store.upsert_triplets(graph_triplets)
+        else:
+            for triplet in graph_triplets:
+                graph_store.upsert_triplet(*triplet)
+
+    kg_index = KnowledgeGraphIndex(
+        index_struct=index_struct,
+        max_triplets_per_chunk=max_triplets,
+        storage_context=storage_context,
+        include_embeddings=False
+    )
+
+    if include_embeddings:
+        rel_texts = list(dict.fromkeys(
+            str(t) for key in triplets_by_key for t in triplets_by_key[key]
+        ))
+        if rel_texts:
+            embs = get_embeddings_parallel(rel_texts, backend="api")
+            for rel_text, emb in zip(rel_texts, embs):
+                kg_index.index_struct.add_to_embedding_dict(rel_text, emb.tolist())
+            kg_index.include_embeddings = True
+            storage_context.index_store.add_index_struct(kg_index.index_struct)
+    return kg_index
+
+
+def _graph_store_path(ticker: str, year, sections=None) -> str:
+    suffix = "_" + "-".join(sorted(sections)) if sections else ""
+    return os.path.join(GRAPH_STORE_DIR, f"{ticker}_{year}{suffix}.sqlite")
+
+
+def open_graph_store(ticker: str, year, kind: str = None, sections=None):
+    """
+    Graph store for one filing's knowledge graph. "sqlite" (default, or
+    TENK_GRAPH_STORE) is a disk-backed SQLiteGraphStore under GRAPH_STORE_DIR,
+    reused across queries; "memory" is llama_index's SimpleGraphStore.
+    A SQLite store holds the triplets of one set of `sections` only, so
+    traversal never returns relations from sections the query did not select.
+    """
+    kind = kind or os.environ.get("TENK_GRAPH_STORE", "sqlite")
+    if kind not in GRAPH_STORES:
+        raise ValueError(f"Unknown graph store {kind!r}; expected one of {GRAPH_STORES}")
+    if kind == "memory":
+        from llama_index.core.graph_stores import SimpleGraphStore
+        return SimpleGraphStore()
+
+    from utils_task_2.graph_store import SQLiteGraphStore
+    path = _graph_store_path(ticker, year, sections)
+    store = _graph_stores.get(path)
+    if store is None:
+        store = _graph_stores[path] = SQLiteGraphStore(path)
+    return store
+
+
+def precompute_in_background(store, top_n: int = 200, depth: int = 3):
+    """
+    Queue store.precompute_neighborhoods (k-hop paths of its hub entities) on
+    a background thread, so the query that built the graph does not wait for
+    it. No-op for stores without precomputation or with one already queued.
+    """
+    if not hasattr(store, "precompute_neighborhoods"):
+        return None
+    key = (getattr(store, "path", id(store)), depth)
+    with _precompute_lock:
+        if key in _precompute_pending:
+            return None
+        _precompute_pending.add(key)
+
+    def run():
+        try:
+            with instrumentation.span("graph_precompute", depth=depth):
+                store.precompute_neighborhoods(top_n=top_n, depth=depth, refresh=False)
+        except Exception as e:      # e.g. the store was dropped meanwhile
+            logging.warning(f"Neighborhood precomputation failed: {e}")
+        finally:
+            with _precompute_lock:
+                _precompute_pending.discard(key)
+    return _precompute_pool.submit(instrumentation.bind_context(run))
+
+
+def drop_graph_store(ticker: str, year):
+    """Close and delete a filing's SQLite graphs, for every section set (e.g. after its content changed)."""
+    paths = {_graph_store_path(ticker, year)} | set(glob.glob(_graph_store_path(ticker, year, ["*"])))
+    for path in paths:
+        store = _graph_stores.pop(path, None)
+        if store is not None:
+            store.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
@@ -0,0 +1,254 @@
+# utils_task_2/graph_store.py
+
+import os, json, sqlite3, threading
+from collections import OrderedDict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS triplets (
+    id   INTEGER PRIMARY KEY,          -- insertion order = SimpleGraphStore list order
+    subj TEXT NOT NULL,
+    rel  TEXT NOT NULL,
+    obj  TEXT NOT NULL,
+    UNIQUE (subj, rel, obj)
+);
+CREATE INDEX IF NOT EXISTS idx_triplets_subj ON triplets (subj, id);
+CREATE INDEX IF NOT EXISTS idx_triplets_obj  ON triplets (obj);
+CREATE TABLE IF NOT EXISTS khop (
+    subj  TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    lim   INTEGER NOT NULL,
+    paths TEXT NOT NULL,
+    PRIMARY KEY (subj, depth, lim)
+);
+"""
+
+
+class SQLiteGraphStore:
+    """
+    Disk-backed graph store for KnowledgeGraphIndex (implements llama_index's
+    GraphStore protocol: get / get_rel_map / upsert_triplet / delete / persist).
+
+    Triplets live in an SQLite adjacency table indexed on subject and object.
+    Adjacency lists of hot nodes are kept in a bounded LRU cache, and the k-hop
+    neighborhoods of frequent entities can be precomputed into the `khop` table
+    (see precompute_neighborhoods). get_rel_map returns exactly what
+    SimpleGraphStore would for the same triplets.
+    """
+
+    schema = "triplets(subj TEXT, rel TEXT, obj TEXT)"
+
+    def __init__(self, path: str = ":memory:", cache_size: int = 10_000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self._cache = OrderedDict()     # subj -> [[rel, obj], ...]
+        self._cache_size = cache_size
+        self._dirty = False             # uncommitted writes pending
+        self._generation = 0            # bumped by every write that changes the graph
+        self.cache_hits = self.cache_misses = self.khop_hits = 0
+
+    # -- GraphStore protocol ------------------------------------------------
+    @property
+    def client(self):
+        return self._conn
+
+    def get(self, subj: str) -> list[list[str]]:
+        """Get [rel, obj] pairs for a subject (LRU-cached)."""
+        with self._lock:
+            hit = self._cache.get(subj)
+            if hit is not None:
+                self._cache.move_to_end(subj)
+                self.cache_hits += 1
+                return hit
+            self.cache_misses += 1
+            self._commit_pending()
+            rows = self._conn.execute(
+                "SELECT rel, obj FROM triplets WHERE subj = ? ORDER BY id", (subj,)
+            ).fetchall()
+            adj = [[rel, obj] for rel, obj in rows]
+            self._cache[subj] = adj
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return adj
+
+    def get_rel_map(self, subjs: list[str] = None, depth: int = 2,
+                    limit: int = 30) -> dict[str, list[list[str]]]:
+        """Depth-aware rel map, truncated to `limit` paths overall (SimpleGraphStore semantics)."""
+        if subjs is None:
+            subjs = self.subjects()
+        rel_map = {subj: self._get_rel_map(subj, depth, limit) for subj in subjs}
+        rel_count, return_map = 0, {}
+        for subj, paths in rel_map.items():
+            if rel_count + len(paths) > limit:
+                return_map[subj] = paths[: limit - rel_count]
+                break
+            return_map[subj] = paths
+            rel_count += len(paths)
+        return return_map
+
+    def upsert_triplet(self, subj: str, rel: str, obj: str) -> None:
+        self.upsert_triplets([(subj, rel, obj)])
+
+    def upsert_triplets(self, triplets) -> int:
+        """Bulk insert (duplicates ignored); committed lazily on the next read."""
+        triplets = [tuple(t) for t in triplets]
+        if not triplets:
+            return 0
+        with self._lock:
+            cur = self._conn.executemany(
+                "INSERT OR IGNORE INTO triplets (subj, rel, obj) VALUES (?, ?, ?)", triplets
+            )
+            if cur.rowcount:
+                self._invalidate({t[0] for t in triplets})
+            self._dirty = True
+            return cur.rowcount
+
+    def delete(self, subj: str, rel: str, obj: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM triplets WHERE subj = ? AND rel = ? AND obj = ?", (subj, rel, obj)
+            )
+            self._invalidate({subj})
+            self._dirty = True
+
+    def persist(self, persist_path: str = None, fs=None) -> None:
+        """Commit pending writes; copy the database to `persist_path` if this store is in-memory."""
+        with self._lock:
+            self._commit_pending()
+            if self.path == ":memory:" and persist_path:
+                os.makedirs(os.path.dirname(persist_path) or ".", exist_ok=True)
+                dest = sqlite3.connect(persist_path)
+                self._conn.backup(dest)
+                dest.close()
+
+    def get_schema(self, refresh: bool = False) -> str:
+        return self.schema
+
+    def query(self, query: str, param_map: dict = None):
+        """Run a raw SQL statement against the triplet tables."""
+        with self._lock:
+            self._commit_pending()
+            return self._conn.execute(query, param_map or {}).fetchall()
+
+    # -- extras -------------------------------------------------------------
+    def subjects(self) -> list[str]:
+        with self._lock:
+            self._commit_pending()
+            rows = self._conn.execute(
+                "SELECT subj FROM triplets GROUP BY subj ORDER BY MIN(id)"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def __bool__(self):
+        # an empty store is still a store (StorageContext does `graph_store or SimpleGraphStore()`)
+        return True
+
+    def __len__(self):
+        with self._lock:
+            self._commit_pending()
+            return self._conn.execute("SELECT COUNT(*) FROM triplets").fetchone()[0]
+
+    def precompute_neighborhoods(self, top_n: int = 1000, depth: int = 3, limit: int = 30,
+                                 refresh: bool = True) -> int:
+        """
+        Store the rel map of the `top_n` highest-degree entities for (depth, limit),
+        so traversals starting from them become a single keyed lookup.
+        Invalidated automatically by any write; with refresh=False an existing,
+        still-valid precomputation is kept as is. The traversals run without
+        holding the store lock, so concurrent queries are not blocked; if the
+        graph changes meanwhile nothing is stored and 0 is returned.
+        """
+        with self._lock:
+            self._commit_pending()
+            if not refresh:
+                n = self._conn.execute(
+                    "SELECT COUNT(*) FROM khop WHERE depth = ? AND lim = ?", (depth, limit)
+                ).fetchone()[0]
+                if n:
+                    return n
+            generation = self._generation
+            rows = self._conn.execute(
+                """SELECT entity FROM (
+                       SELECT subj AS entity FROM triplets
+                       UNION ALL SELECT obj FROM triplets
+                   ) GROUP BY entity ORDER BY COUNT(*) DESC LIMIT ?""", (top_n,)
+            ).fetchall()
+        entries = [
+            (subj, depth, limit, json.dumps(self._traverse(subj, depth, limit)))
+            for (subj,) in rows
+        ]
+        with self._lock:
+            if self._generation != generation:
+                return 0
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO khop (subj, depth, lim, paths) VALUES (?, ?, ?, ?)", entries
+            )
+            self._conn.commit()
+        return len(entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n_khop = self._conn.execute("SELECT COUNT(*) FROM khop").fetchone()[0]
+        return {
+            "triplets": len(self), "cached_nodes": len(self._cache),
+            "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+            "khop_entries": n_khop, "khop_hits": self.khop_hits,
+        }
+
+    def close(self):
+        with self._lock:
+            self._commit_pending()
+            self._conn.close()
+
+    # -- internals ----------------------------------------------------------
+    def _commit_pending(self):
+        if self._dirty:
+            self._conn.commit()
+            self._dirty = False
+
+    def _invalidate(self, subjs):
+        self._generation += 1
+        for s in subjs:
+            self._cache.pop(s, None)
+        self._conn.execute("DELETE FROM khop")
+
+    def _get_rel_map(self, subj, depth, limit):
+        if depth == 0:
+            return []
+        with self._lock:
+            self._commit_pending()
+            row = self._conn.execute(
+                "SELECT paths FROM khop WHERE subj = ? AND depth = ? AND lim = ?",
+                (subj, depth, limit)
+            ).fetchone()
+        if row is not None:
+            self.khop_hits += 1
+            return json.loads(row[0])
+        return self._traverse(subj, depth, limit)
+
+    def _traverse(self, subj, depth, limit=30, seen=None):
+        # mirrors SimpleGraphStoreData._get_rel_map, including that nested
+        # hops use the default per-node limit of 30; `seen` memoizes adjacency
+        # for the duration of one traversal so hubs are fetched once
+        if depth == 0:
+            return []
+        if seen is None:
+            seen = {}
+        adj = seen.get(subj)
+        if adj is None:
+            adj = seen[subj] = self.get(subj)
+        rel_map = []
+        for rel_count, (rel, obj) in enumerate(adj):
+            if rel_count >= limit:
+                break
+            rel_map.append([subj, rel, obj])
+            rel_map += self._traverse(obj, depth - 1, seen=seen)
+        return rel_map
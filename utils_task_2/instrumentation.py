@@ -0,0 +1,266 @@
+# utils_task_2/instrumentation.py
+
+import os, json, time, threading, itertools, contextvars
+from contextlib import contextmanager
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+# USD per 1M tokens (input, output); models not listed are costed at 0.
+MODEL_PRICES_PER_1M = {
+    "gpt-4.1-2025-04-14":      (2.00, 8.00),
+    "gpt-4.1-nano-2025-04-14": (0.10, 0.40),
+    "text-embedding-3-small":  (0.02, 0.00),
+}
+
+_enabled = os.environ.get("TENK_METRICS", "") not in ("", "0", "false")
+_lock = threading.Lock()
+_events = deque(maxlen=100_000)              # JSON-lines records
+_counters = defaultdict(float)               # (metric, labels) -> value
+_durations = defaultdict(lambda: deque(maxlen=2048))  # span name -> recent durations
+_duration_totals = defaultdict(lambda: [0.0, 0])      # span name -> [sum, count]
+_span_ids = itertools.count(1)
+_current_span = ContextVar("current_span", default=None)
+_usage_collector = ContextVar("usage_collector", default=None)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(flag: bool = True):
+    """Turn collection on/off (also controlled by TENK_METRICS=1)."""
+    global _enabled
+    _enabled = flag
+
+
+def reset():
+    """Drop everything collected so far."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _durations.clear()
+        _duration_totals.clear()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "id", "parent", "start", "t0", "_token")
+
+    def __init__(self, name, attrs):
+        self.name, self.attrs = name, attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.id = next(_span_ids)
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.id)
+        self.start, self.t0 = time.time(), time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.t0
+        _current_span.reset(self._token)
+        record = {
+            "type": "span", "name": self.name, "span_id": self.id, "parent_id": self.parent,
+            "start": self.start, "duration_s": duration,
+            "status": "error" if exc_type else "ok", **self.attrs
+        }
+        if exc_type:
+            record["error"] = repr(exc)
+        with _lock:
+            _events.append(record)
+            _durations[self.name].append(duration)
+            totals = _duration_totals[self.name]
+            totals[0] += duration
+            totals[1] += 1
+            if exc_type:
+                _counters[("span_errors_total", (("name", self.name),))] += 1
+        return False
+
+
+def span(name: str, **attrs):
+    """
+    Time a pipeline stage or provider call:
+        with span("answer", model=...):
+            ...
+    Returns a shared no-op object when instrumentation is disabled.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, attrs)
+
+
+def record_duration(name: str, seconds: float, **attrs):
+    """Record a latency that is not a span (e.g. time to first streamed token)."""
+    if not _enabled:
+        return
+    with _lock:
+        _events.append({"type": "duration", "name": name, "time": time.time(),
+                        "duration_s": seconds, **attrs})
+        _durations[name].append(seconds)
+        totals = _duration_totals[name]
+        totals[0] += seconds
+        totals[1] += 1
+
+
+@contextmanager
+def collect_usage():
+    """
+    Collect the model calls made inside the block (by this thread, and by
+    executor tasks wrapped with bind_context) into a list of
+    (model, stage, input_tokens, output_tokens); works with metrics disabled.
+    """
+    calls = []
+    token = _usage_collector.set(calls)
+    try:
+        yield calls
+    finally:
+        _usage_collector.reset(token)
+
+
+def bind_context(fn):
+    """Wrap fn for an executor so its calls keep the caller's span parent and usage collector."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def record_tokens(model: str, stage: str, input_tokens: int, output_tokens: int = 0):
+    """Count tokens and estimated USD cost for one model call."""
+    calls = _usage_collector.get()
+    if calls is not None:
+        calls.append((model, stage, input_tokens, output_tokens))
+    if not _enabled:
+        return
+    in_price, out_price = MODEL_PRICES_PER_1M.get(model, (0.0, 0.0))
+    cost = (input_tokens * in_price + output_tokens * out_price) / 1e6
+    labels = (("model", model), ("stage", stage))
+    with _lock:
+        _counters[("tokens_total", labels + (("kind", "input"),))] += input_tokens
+        _counters[("tokens_total", labels + (("kind", "output"),))] += output_tokens
+        _counters[("cost_usd_total", labels)] += cost
+        _counters[("model_calls_total", labels)] += 1
+        _events.append({
+            "type": "usage", "time": time.time(), "model": model, "stage": stage,
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "cost_usd": cost
+        })
+
+
+def record_usage(usage, model: str, stage: str):
+    """Record an OpenAI `usage` object (responses or embeddings API)."""
+    if (not _enabled and _usage_collector.get() is None) or usage is None:
+        return
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "prompt_tokens", 0)
+    record_tokens(model, stage, input_tokens or 0, getattr(usage, "output_tokens", 0) or 0)
+
+
+def incr(metric: str, value: float = 1, **labels):
+    """Add `value` to a free-form counter, e.g. incr("prompt_context_tokens_total", 120, prompt="packed")."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[(metric, tuple(labels.items()))] += value
+
+
+def record_retry(stage: str, error=None):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[("retries_total", (("stage", stage),))] += 1
+        _events.append({"type": "retry", "time": time.time(), "stage": stage,
+                        "error": repr(error) if error else None})
+
+
+def record_queue_wait(stage: str, seconds: float):
+    """Time a task spent queued in an executor before a worker picked it up."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[("queue_wait_seconds_sum", (("stage", stage),))] += seconds
+        _counters[("queue_wait_seconds_count", (("stage", stage),))] += 1
+
+
+def snapshot() -> dict:
+    """Totals per model/stage plus per-span latency percentiles."""
+    with _lock:
+        counters = dict(_counters)
+        durations = {k: sorted(v) for k, v in _durations.items()}
+        totals = {k: tuple(v) for k, v in _duration_totals.items()}
+    out = {"counters": [
+        {"metric": metric, **dict(labels), "value": value}
+        for (metric, labels), value in sorted(counters.items())
+    ], "spans": {}}
+    for name, ds in durations.items():
+        total, count = totals[name]
+        out["spans"][name] = {
+            "count": count, "total_s": total,
+            **{f"p{int(q * 100)}_s": _quantile(ds, q) for q in (0.5, 0.95, 0.99)}
+        }
+    return out
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def export_jsonl(path: str):
+    """Write every collected span/usage/retry record as one JSON object per line."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _lock:
+        events = list(_events)
+    with open(path, "w") as f:
+        for e in events:
+            f.write(json.dumps(e, default=str) + "\n")
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in labels) + "}"
+
+
+def export_prometheus(path: str, prefix: str = "tenk"):
+    """Write a Prometheus text-format file (node_exporter textfile collector style)."""
+    snap = snapshot()
+    by_metric = defaultdict(list)
+    for c in snap["counters"]:
+        labels = tuple((k, v) for k, v in c.items() if k not in ("metric", "value"))
+        by_metric[c["metric"]].append((labels, c["value"]))
+
+    lines = []
+    for metric, series in sorted(by_metric.items()):
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        lines.extend(f"{prefix}_{metric}{_fmt_labels(l)} {v:g}" for l, v in series)
+
+    name = f"{prefix}_span_duration_seconds"
+    lines.append(f"# TYPE {name} summary")
+    for span_name, s in sorted(snap["spans"].items()):
+        for q in ("0.5", "0.95", "0.99"):
+            value = s[f"p{int(float(q) * 100)}_s"]
+            lines.append(f"{name}{_fmt_labels((('name', span_name), ('quantile', q)))} {value:g}")
+        lines.append(f"{name}_sum{_fmt_labels((('name', span_name),))} {s['total_s']:g}")
+        lines.append(f"{name}_count{_fmt_labels((('name', span_name),))} {s['count']}")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
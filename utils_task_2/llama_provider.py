@@ -0,0 +1,67 @@
+# utils_task_2/llama_provider.py
+"""
+llama_index LLM and embedding model backed by providers.get_client(), so the
+GraphRAG query path goes through the same client as the rest of Task 2: the
+offline provider (TENK_PROVIDER=local), resilience (hedging, circuit breaker,
+query deadline) and token accounting all apply to it.
+
+Imports llama_index, so only graphRAG_query imports this module.
+"""
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from utils_task_2 import instrumentation
+from utils_task_2.logging_utils import log_usage
+from utils_task_2.providers import get_client
+from utils_task_2.resilience import resilient, request_options
+
+
+@resilient("graph_query", default_delay=6.0)
+def _complete(model: str, prompt: str, temperature: float) -> str:
+    with instrumentation.span("llm", stage="graph_query", model=model):
+        resp = get_client().responses.create(model=model, input=prompt, temperature=temperature,
+                                             **request_options())
+    log_usage(resp.usage, "graph_query", model=model)
+    return resp.output_text
+
+
+class ProviderLLM(CustomLLM):
+    """Text completions through the configured provider's Responses API."""
+
+    model: str = "gpt-4.1-2025-04-14"
+    temperature: float = 0.0
+    context_window: int = 128_000
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model, context_window=self.context_window)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponse:
+        return CompletionResponse(text=_complete(self.model, prompt, self.temperature))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs):
+        text = _complete(self.model, prompt, self.temperature)
+        yield CompletionResponse(text=text, delta=text)
+
+
+class ProviderEmbedding(BaseEmbedding):
+    """Embeddings through utils_task_2.embedding on the API backend (what triplets are embedded with)."""
+
+    model_name: str = "text-embedding-3-small"
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        from utils_task_2.embedding import get_embedding_single
+        return get_embedding_single(query, self.model_name, backend="api").tolist()
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._get_query_embedding(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        from utils_task_2.embedding import get_embeddings_parallel
+        return get_embeddings_parallel(texts, self.model_name, backend="api").tolist()
@@ -1,12 +1,16 @@
-# utils_task_2/logging_utils.py
-
-import logging
-
-def log_usage(usage, label: str):
-    """
-    Log the prompt/completion/total token counts under a given label.
-    """
-    logging.info(
-        f"{label} token usage — prompt: {usage.input_tokens}, "
-        f"completion: {usage.output_tokens}, total: {usage.total_tokens}"
-    )
+# utils_task_2/logging_utils.py
+
+import logging
+from utils_task_2 import instrumentation
+
+def log_usage(usage, label: str, model: str = None):
+    """
+    Log the prompt/completion/total token counts under a given label,
+    and count them (with estimated cost) when instrumentation is enabled.
+    """
+    logging.info(
+        f"{label} token usage — prompt: {usage.input_tokens}, "
+        f"completion: {usage.output_tokens}, total: {usage.total_tokens}"
+    )
+    if model:
+        instrumentation.record_usage(usage, model, label)
@@ -0,0 +1,212 @@
+# utils_task_2/providers.py
+
+import os, re, json, time, base64, random, hashlib, threading
+from types import SimpleNamespace
+
+import numpy as np
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the active LLM/embedding client, creating it on first use.
+    The provider is chosen by TENK_PROVIDER ("openai" by default, or "local").
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = make_provider(os.environ.get("TENK_PROVIDER", "openai"))
+    return _client
+
+
+def set_provider(name: str = "openai", **kwargs):
+    """Swap the active client, e.g. set_provider("local", latency=0.05)."""
+    global _client
+    with _client_lock:
+        _client = make_provider(name, **kwargs)
+    return _client
+
+
+def make_provider(name: str, **kwargs):
+    if name == "openai":
+        from openai import OpenAI
+        return OpenAI(**kwargs)
+    if name == "local":
+        return LocalClient(**kwargs)
+    raise ValueError(f"Unknown provider {name!r} (expected 'openai' or 'local')")
+
+
+class LocalProviderError(Exception):
+    """Injected failure raised by LocalClient."""
+    status_code = 500
+
+
+class LocalRateLimitError(LocalProviderError):
+    """Injected 429 raised by LocalClient."""
+    status_code = 429
+
+
+class LocalTimeoutError(LocalProviderError, TimeoutError):
+    """Raised by LocalClient when a call's simulated latency exceeds its `timeout`."""
+    status_code = 408
+
+
+def approx_token_count(text: str) -> int:
+    """Cheap token estimate (~0.75 words per token) used for fake usage numbers."""
+    return max(1, int(len(text.split()) * 4 / 3))
+
+
+class LocalClient:
+    """
+    Deterministic, offline stand-in for the OpenAI client.
+
+    Mirrors the two surfaces the pipeline uses:
+      - client.responses.create(model, input, text={"format": json_schema}, stream=False)
+      - client.embeddings.create(input, model)
+    Embeddings are hashed bag-of-words vectors; structured responses are filled
+    from the requested JSON schema (or from `canned`, keyed by schema name).
+    `latency`/`jitter` are in seconds; `error_rate` and `rate_limit_rate` are
+    per-call probabilities of raising LocalProviderError / LocalRateLimitError.
+    A `tail_rate` share of calls takes `tail_latency` extra seconds; a call whose
+    latency exceeds its `timeout` argument raises LocalTimeoutError at the timeout.
+    With stream=True, responses arrive as output_text delta events of
+    `stream_chunk_chars` characters, `token_latency` seconds apart.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, embedding_dim=1536, canned=None, seed=0,
+                 token_latency=0.0, stream_chunk_chars=4, tail_rate=0.0, tail_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.embedding_dim = embedding_dim
+        self.canned = canned or {}
+        self.token_latency = token_latency
+        self.stream_chunk_chars = stream_chunk_chars
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.responses = SimpleNamespace(create=self._create_response)
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+
+    # -- failure / latency injection ----------------------------------------
+    def _simulate(self, timeout=None):
+        with self._rng_lock:
+            delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            if self._rng.random() < self.tail_rate:
+                delay += self.tail_latency
+            roll_429 = self._rng.random()
+            roll_err = self._rng.random()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise LocalTimeoutError(f"Request timed out after {timeout:.2f}s (injected)")
+        if delay > 0:
+            time.sleep(delay)
+        if roll_429 < self.rate_limit_rate:
+            raise LocalRateLimitError("429 Too Many Requests (injected)")
+        if roll_err < self.error_rate:
+            raise LocalProviderError("500 Internal Server Error (injected)")
+
+    # -- embeddings ---------------------------------------------------------
+    def embed_text(self, text: str) -> np.ndarray:
+        """Signed feature hashing of lower-cased word tokens, L2-normalized."""
+        vec = np.zeros(self.embedding_dim, dtype=np.float32)
+        for tok in re.findall(r"[a-z0-9]+", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            vec[h % self.embedding_dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _create_embeddings(self, input, model="text-embedding-3-small", encoding_format="float",
+                           timeout=None, **kwargs):
+        self._simulate(timeout)
+        texts = [input] if isinstance(input, str) else list(input)
+        if encoding_format == "base64":
+            encode = lambda v: base64.b64encode(v.astype("<f4").tobytes()).decode()
+        else:
+            encode = lambda v: v.tolist()
+        data = [
+            SimpleNamespace(index=i, embedding=encode(self.embed_text(t)))
+            for i, t in enumerate(texts)
+        ]
+        tokens = sum(approx_token_count(t) for t in texts)
+        return SimpleNamespace(
+            data=data, model=model,
+            usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens)
+        )
+
+    # -- structured responses -----------------------------------------------
+    def _create_response(self, model, input, text=None, stream=False, timeout=None, **kwargs):
+        self._simulate(timeout)
+        messages = input if isinstance(input, list) else [{"role": "user", "content": input}]
+        user_text = " ".join(m["content"] for m in messages if m["role"] == "user")
+        prompt_text = " ".join(m["content"] for m in messages)
+        fmt = (text or {}).get("format", {})
+        name = fmt.get("name")
+        if name in self.canned:
+            out = self.canned[name]
+        elif fmt.get("type") == "json_schema":
+            out = self._fill_schema(fmt["schema"], user_text, prompt_text)
+        else:
+            out = None
+        output_text = json.dumps(out) if out is not None else self._words(user_text, 25)
+        in_tok, out_tok = approx_token_count(prompt_text), approx_token_count(output_text)
+        response = SimpleNamespace(
+            model=model, output_text=output_text,
+            usage=SimpleNamespace(input_tokens=in_tok, output_tokens=out_tok,
+                                  total_tokens=in_tok + out_tok)
+        )
+        return self._stream(response) if stream else response
+
+    def _stream(self, response):
+        """Responses-API style event stream for an already generated response."""
+        yield SimpleNamespace(type="response.created", response=response)
+        text, n = response.output_text, max(1, self.stream_chunk_chars)
+        for i in range(0, len(text), n):
+            if self.token_latency > 0:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(type="response.output_text.delta", delta=text[i:i + n])
+        yield SimpleNamespace(type="response.output_text.done", text=text)
+        yield SimpleNamespace(type="response.completed", response=response)
+
+    @staticmethod
+    def _words(text: str, n: int) -> str:
+        words = text.split()
+        return " ".join(words[:n]) if words else "n/a"
+
+    def _fill_schema(self, schema, user_text, prompt_text, offset=None):
+        kind = schema.get("type")
+        if kind == "object":
+            return {
+                key: self._fill_schema(sub, user_text, prompt_text,
+                                       None if offset is None else offset + 3 * j)
+                for j, (key, sub) in enumerate(schema.get("properties", {}).items())
+            }
+        if kind == "array":
+            # a few items, each built from a different slice of the input words
+            n_items = min(3, len(user_text.split()) // 9)
+            return [
+                self._fill_schema(schema.get("items", {}), user_text, prompt_text, offset=9 * i)
+                for i in range(n_items)
+            ] if "items" in schema else []
+        if kind == "boolean":
+            return True
+        if kind in ("number", "integer"):
+            return 0
+        if "enum" in schema:
+            lowered = user_text.lower()
+            for option in schema["enum"]:
+                if str(option).lower() in lowered:
+                    return option
+            digest = hashlib.md5(user_text.encode()).digest()
+            return schema["enum"][digest[0] % len(schema["enum"])]
+        if offset is not None:
+            # strings inside array items: short, distinct phrases
+            return " ".join(user_text.split()[offset:offset + 3]) or "n/a"
+        # strings: echo the leading words of the user message
+        return self._words(user_text, 20)
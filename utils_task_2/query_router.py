@@ -0,0 +1,138 @@
+# utils_task_2/query_router.py
+
+import os, re, logging
+
+from utils_task_2.constants import (
+    ALLOWED_YEARS, COMPANY_ALIASES, SECTION_ALIASES, SECTION_NAME_TO_ID
+)
+from utils_task_2 import instrumentation
+
+# below this confidence the LLM query_decomposer is called instead
+ROUTER_THRESHOLD = float(os.environ.get("TENK_ROUTER_THRESHOLD", "0.75"))
+# top-1 vs top-2 cosine gap for a nearest-section match to count as clear
+SECTION_MARGIN = 0.02
+
+_COMPANY_RES = {
+    ticker: re.compile(r"\b(?:" + "|".join(map(re.escape, aliases)) + r")(?:'s)?\b", re.I)
+    for ticker, aliases in COMPANY_ALIASES.items()
+}
+_SECTION_RES = {
+    name: re.compile(r"\b(?:" + "|".join(map(re.escape, aliases)) + r")(?:\s+section)?\b", re.I)
+    for name, aliases in SECTION_ALIASES.items()
+}
+_YEAR_RE = re.compile(r"\b((?:19|20)\d{2})\b")
+# the year that names the filing: "2018 Form 10-K", "2020 annual report", "10-K for fiscal 2019"
+_FILING_YEAR_RE = re.compile(
+    r"\b((?:19|20)\d{2})\s+(?:form\s+)?(?:10-?k|annual\s+report)\b"
+    r"|\b(?:10-?k|annual\s+report)\s+(?:for\s+)?(?:fiscal\s+)?(?:year\s+)?((?:19|20)\d{2})\b", re.I
+)
+_FILLER_RE = re.compile(r"\b(?:form\s+)?10-?k\b|\bannual\s+report\b|\bsection\b", re.I)
+_LEADING_RE = re.compile(r"^(?:(?:according\s+to|in|per|from|for|of|the)\b[\s,]*)+", re.I)
+_TRAILING_RE = re.compile(r"(?:[\s,]+(?:in|of|for|from|by|on|the|its))+$", re.I)
+
+
+def _normalize(text: str) -> str:
+    return text.replace("’", "'").replace("‘", "'")
+
+
+def _match_ticker(query):
+    hits = {t: m for t, rx in _COMPANY_RES.items() if (m := rx.search(query))}
+    if len(hits) == 1:
+        return next(iter(hits)), 1.0
+    if hits:   # several companies: take the first mentioned, low confidence
+        return min(hits, key=lambda t: hits[t].start()), 0.3
+    return None, 0.0
+
+
+def _match_year(query):
+    years = [y for y in dict.fromkeys(_YEAR_RE.findall(query)) if y in ALLOWED_YEARS]
+    if len(years) == 1:
+        return years[0], 1.0
+    filing_years = [a or b for a, b in _FILING_YEAR_RE.findall(query) if (a or b) in ALLOWED_YEARS]
+    if len(set(filing_years)) == 1:
+        return filing_years[0], 0.9
+    if years:
+        return years[0], 0.4
+    return None, 0.0
+
+
+def _match_section(query):
+    hits = [(m.start(), name) for name, rx in _SECTION_RES.items() if (m := rx.search(query))]
+    if not hits:
+        return None, 0.0
+    hits.sort()
+    return hits[0][1], 1.0 if len({n for _, n in hits}) == 1 else 0.8
+
+
+def _data_item(query):
+    """What is asked about: the question minus company, year, filing and section mentions."""
+    text = query
+    for rx in list(_COMPANY_RES.values()) + list(_SECTION_RES.values()) + [_YEAR_RE, _FILLER_RE]:
+        text = rx.sub(" ", text)
+    text = re.sub(r"\s+([,?.!])", r"\1", re.sub(r"\s+", " ", text)).strip(" ,.?!")
+    text = _TRAILING_RE.sub("", _LEADING_RE.sub("", text).strip(" ,.?!"))
+    return text or query
+
+
+def match_filing(user_query: str) -> dict:
+    """Ticker, year and data item of a question by gazetteer/regex only (no embedding)."""
+    query = _normalize(user_query)
+    ticker, t_conf = _match_ticker(query)
+    year, y_conf = _match_year(query)
+    return {"ticker": ticker, "year": year, "data_item": _data_item(query),
+            "confidence": round(min(t_conf, y_conf), 3)}
+
+
+def route_query(user_query: str, backend: str = None, threshold: float = None) -> dict:
+    """
+    Local decomposition: ticker from the COMPANY_ALIASES gazetteer, year by regex,
+    section from an explicit SECTION_ALIASES mention or else the nearest cached
+    SECTION_DEFINITIONS vector. Same fields as query_decomposer plus
+    "confidence" (the lowest of the per-field confidences, 0–1).
+    The section embedding is skipped when ticker/year already rule out routing.
+    """
+    threshold = ROUTER_THRESHOLD if threshold is None else threshold
+    query = _normalize(user_query)
+    ticker, t_conf = _match_ticker(query)
+    year, y_conf = _match_year(query)
+    section, s_conf = _match_section(query)
+    data_item = _data_item(query)
+
+    if section is None and min(t_conf, y_conf) >= threshold:
+        from utils_task_2.embedding import (
+            embed_data_item_query, section_definition_embeddings, cosine_similarity
+        )
+        names, embs = section_definition_embeddings(backend=backend)
+        sims = cosine_similarity(embed_data_item_query(data_item, backend=backend), embs)[0]
+        top = sims.argsort()[::-1][:2]
+        section = names[top[0]]
+        s_conf = 0.8 if sims[top[0]] - sims[top[1]] >= SECTION_MARGIN else 0.6
+
+    return {
+        "ticker":       ticker,
+        "year":         year,
+        "section_name": SECTION_NAME_TO_ID[section] if section else None,
+        "data_item":    data_item,
+        "confidence":   round(min(t_conf, y_conf, s_conf), 3),
+    }
+
+
+def decompose(user_query: str, threshold: float = None, backend: str = None) -> dict:
+    """
+    query_decomposer output, from the local router when it is at least
+    `threshold` confident (default ROUTER_THRESHOLD / TENK_ROUTER_THRESHOLD),
+    otherwise from the LLM. Adds "router" ("local" / "llm") and "confidence".
+    """
+    from utils_task_2.query_decomposer import query_decomposer
+
+    threshold = ROUTER_THRESHOLD if threshold is None else threshold
+    with instrumentation.span("route") as sp:
+        routed = route_query(user_query, backend, threshold)
+        sp.set(confidence=routed["confidence"])
+    if routed["confidence"] >= threshold:
+        instrumentation.incr("router_total", route="local")
+        return {**routed, "router": "local"}
+
+    logging.info(f"Router confidence {routed['confidence']:.2f} < {threshold}; asking the LLM")
+    instrumentation.incr("router_total", route="llm")
+    return {**query_decomposer(user_query), "router": "llm", "confidence": routed["confidence"]}
@@ -0,0 +1,265 @@
+# utils_task_2/resilience.py
+"""
+Latency-aware calls for the interactive query path (decomposition, query
+embedding, answering), replacing blind sequential retries there:
+
+  - deadline(seconds): a time budget for the whole query, propagated through
+    a context variable to every call below it (and into worker threads bound
+    with instrumentation.bind_context). request_options() turns the remaining
+    budget into the client's per-request `timeout`.
+  - hedging: when an attempt has not answered after the endpoint's recent p95
+    latency, a duplicate request is sent and the first success wins.
+  - circuit breakers: after BREAKER_FAILURES consecutive failures an endpoint
+    fails fast for BREAKER_RESET_S, then lets one trial request through.
+
+    @resilient("query_decomposer", default_delay=2.0)
+    def call(...): return get_client().responses.create(..., **request_options())
+
+    with deadline(10):
+        answer_query(chunk_df, question)
+
+Batch stages (summaries, triplets, judging) keep summarization.retry_on_exception.
+"""
+import os, time, logging, threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import wraps
+
+from utils_task_2 import instrumentation
+
+HEDGING = os.environ.get("TENK_HEDGE", "1") not in ("0", "false")
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20       # below this, an endpoint hedges after its default_delay
+MAX_ATTEMPTS = 3             # requests per call, hedges and retries included
+RETRY_BACKOFF_S = 0.25       # doubled per retry, never beyond the deadline
+BREAKER_FAILURES = int(os.environ.get("TENK_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.environ.get("TENK_BREAKER_RESET_S", "30"))
+
+_deadline = ContextVar("query_deadline", default=None)   # time.monotonic() at which the budget ends
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The query's time budget ran out."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The endpoint's circuit breaker is open; the call was not attempted."""
+
+
+# -- deadlines ----------------------------------------------------------------
+@contextmanager
+def deadline(seconds: float = None):
+    """Bound everything inside to `seconds` (None = no limit; nested deadlines keep the earliest)."""
+    if seconds is None:
+        yield
+        return
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current deadline, or None without one."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def check_deadline(stage: str):
+    left = remaining()
+    if left is not None and left <= 0:
+        instrumentation.incr("deadline_exceeded_total", stage=stage)
+        raise DeadlineExceeded(f"query deadline exceeded at {stage}")
+
+
+def request_options() -> dict:
+    """Keyword arguments for a client call: its timeout is what is left of the deadline."""
+    left = remaining()
+    return {} if left is None else {"timeout": max(left, 0.001)}
+
+
+# -- circuit breakers ---------------------------------------------------------
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive errors -> half-open after `reset_s` -> one trial."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.name = name
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a request may be sent now. Returns True
+        when that request is the half-open trial, which the caller must settle
+        with record_success / record_failure or hand back with release_trial.
+        """
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state, self._trial = "half_open", False
+            if self.state == "closed":
+                return False
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+        instrumentation.incr("circuit_rejected_total", endpoint=self.name)
+        raise CircuitOpenError(f"circuit for {self.name} is {self.state}")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info(f"Circuit for {self.name} closed")
+            self.state, self.consecutive, self._trial = "closed", 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive += 1
+            if self.state == "half_open" or self.consecutive >= self.failures:
+                if self.state != "open":
+                    logging.warning(f"Circuit for {self.name} opened after {self.consecutive} "
+                                    f"consecutive failures; failing fast for {self.reset_s}s")
+                    instrumentation.incr("circuit_opened_total", endpoint=self.name)
+                self.state, self.opened_at, self._trial = "open", time.monotonic(), False
+
+    def release_trial(self):
+        """The trial ended without an outcome (e.g. the query deadline expired): allow another."""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.consecutive}
+
+
+_breakers = {}
+_latencies = {}              # endpoint -> recent successful attempt latencies (s)
+_registry_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _registry_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+            _latencies[endpoint] = deque(maxlen=512)
+        return _breakers[endpoint]
+
+
+def breaker_states() -> dict:
+    with _registry_lock:
+        return {name: b.snapshot() for name, b in _breakers.items()}
+
+
+def reset_breakers():
+    with _registry_lock:
+        _breakers.clear()
+        _latencies.clear()
+
+
+# -- hedged calls -------------------------------------------------------------
+def hedge_delay(endpoint: str, default_delay: float = None):
+    """Seconds to wait before hedging: the endpoint's recent p95, else `default_delay`."""
+    vals = sorted(_latencies.get(endpoint) or ())
+    if len(vals) < HEDGE_MIN_SAMPLES:
+        return default_delay
+    return vals[min(len(vals) - 1, int(HEDGE_PERCENTILE * len(vals)))]
+
+
+def _attempt(endpoint, fn, args, kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    recent = _latencies.get(endpoint)
+    if recent is not None:
+        recent.append(time.perf_counter() - t0)
+    return out
+
+
+def call(endpoint: str, fn, *args, hedge: bool = True, default_delay: float = None, **kwargs):
+    """
+    fn(*args, **kwargs) under the endpoint's circuit breaker and the current
+    deadline. A slow attempt is hedged after hedge_delay(); a failed one is
+    retried with backoff while attempts and time remain. Returns the first
+    success; raises the last error, CircuitOpenError or DeadlineExceeded.
+    """
+    breaker = get_breaker(endpoint)
+    pending, hedges, errors, launched, trial = set(), set(), [], 0, False
+
+    def launch():
+        nonlocal launched, trial
+        check_deadline(endpoint)
+        trial |= breaker.before_call()
+        launched += 1
+        f = _executor.submit(instrumentation.bind_context(_attempt), endpoint, fn, args, kwargs)
+        pending.add(f)
+        return f
+
+    try:
+        launch()
+        while True:
+            can_hedge = hedge and HEDGING and launched < MAX_ATTEMPTS and len(pending) == 1
+            delay = hedge_delay(endpoint, default_delay) if can_hedge else None
+            left = remaining()
+            timeout = left if delay is None else (delay if left is None else min(delay, left))
+            done, pending = wait(pending, timeout=max(timeout, 0) if timeout is not None else None,
+                                 return_when=FIRST_COMPLETED)
+            for f in done:
+                exc = f.exception()
+                if exc is None:
+                    breaker.record_success()
+                    if hedges:
+                        instrumentation.incr("hedge_total", endpoint=endpoint,
+                                             result="won" if f in hedges else "lost")
+                    return f.result()
+                if isinstance(exc, DeadlineExceeded):
+                    raise exc
+                left = remaining()
+                if left is not None and left <= 0:
+                    # the request timed out on our budget, not on the endpoint
+                    raise DeadlineExceeded(f"query deadline exceeded at {endpoint}") from exc
+                breaker.record_failure()
+                errors.append(exc)
+            if pending:
+                if not done:
+                    check_deadline(endpoint)       # raises once the budget is gone
+                    if can_hedge:
+                        try:
+                            hedges.add(launch())
+                        except CircuitOpenError:
+                            pass
+                continue
+            # every attempt so far failed
+            if launched >= MAX_ATTEMPTS:
+                raise errors[-1]
+            backoff = RETRY_BACKOFF_S * 2 ** (len(errors) - 1)
+            left = remaining()
+            if left is not None and left <= backoff:
+                raise errors[-1]
+            instrumentation.record_retry(endpoint, errors[-1])
+            time.sleep(backoff)
+            try:
+                launch()
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                raise e from errors[-1]
+    finally:
+        if trial:
+            # no-op once the trial's outcome was recorded; frees the slot if we gave up on it
+            breaker.release_trial()
+
+
+def resilient(endpoint: str, hedge: bool = True, default_delay: float = None):
+    """Decorator form of call()."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapped(*args, **kwargs):
+            return call(endpoint, fn, *args, hedge=hedge, default_delay=default_delay, **kwargs)
+        return wrapped
+    return decorate
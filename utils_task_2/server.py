@@ -0,0 +1,291 @@
+# utils_task_2/server.py
+"""
+Long-running query service: loads the chunk store (with retrieval embeddings)
+once, keeps graph indexes warm, and answers RAG / GraphRAG questions
+concurrently over a small HTTP API on TCP and/or a Unix socket.
+
+    python -m utils_task_2.server --port 8080
+    curl -s localhost:8080/query -d '{"question": "...", "engine": "rag"}'
+
+Endpoints:
+    POST /query   {"question": str, "engine": "rag"|"graph", ...query params}
+                  (unknown or ill-typed params are rejected with 400)
+    GET  /health  liveness + number of loaded chunks
+    GET  /stats   request counts, coalescing, in-flight, per-engine latency and
+                  circuit breaker states
+
+Each query runs under a deadline ("timeout_s" per request, else --query-timeout)
+that bounds decomposition, embedding and answering together (see resilience);
+an exhausted budget returns 504 and an open circuit breaker 503.
+
+Identical questions (same engine and params) that arrive while one is being
+answered share that single computation instead of starting another; similar
+ones asked later about the same filing are served from the answer cache.
+"""
+import os, json, time, asyncio, logging, argparse
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from utils_task_2 import instrumentation, resilience
+
+ENGINES = ("rag", "graph")
+
+# per-engine defaults (same settings as main.task_2_3_pipeline) and the
+# parameters a request may override
+QUERY_DEFAULTS = {
+    "rag":   {"top_k_chunk": 3, "top_k_section": 3, "include_neighbors": False},
+    "graph": {"top_k_section": 3},
+}
+QUERY_PARAMS = {
+    "rag":   {"top_k_chunk", "top_k_section", "include_neighbors", "token_budget", "use_facts",
+              "use_cache", "timeout_s"},
+    "graph": {"top_k_section", "graph_traversal_depth", "use_cache", "timeout_s"},
+}
+_POSITIVE_INT = lambda v: isinstance(v, int) and not isinstance(v, bool) and v > 0
+_POSITIVE_NUMBER_OR_NULL = lambda v: v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)
+                                                   and v > 0)
+# what each query parameter must hold, checked before the query runs
+PARAM_CHECKS = {
+    "top_k_chunk":           (_POSITIVE_INT, "a positive integer"),
+    "top_k_section":         (_POSITIVE_INT, "a positive integer"),
+    "graph_traversal_depth": (_POSITIVE_INT, "a positive integer"),
+    "token_budget":          (_POSITIVE_INT, "a positive integer"),
+    "include_neighbors":     (lambda v: isinstance(v, bool), "a boolean"),
+    "use_facts":             (lambda v: isinstance(v, bool), "a boolean"),
+    "use_cache":             (lambda v: isinstance(v, bool), "a boolean"),
+    "timeout_s":             (_POSITIVE_NUMBER_OR_NULL, "a positive number or null"),
+}
+DEFAULT_QUERY_TIMEOUT_S = float(os.environ.get("TENK_QUERY_TIMEOUT", "30"))
+MAX_BODY_BYTES = 1 << 20
+
+
+def _json_default(o):
+    # numpy scalars/arrays from chunk_df rows
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    return str(o)
+
+
+def _percentiles(values):
+    vals = sorted(values)
+    if not vals:
+        return {"count": 0}
+    pick = lambda q: round(vals[min(len(vals) - 1, int(q * len(vals)))] * 1000, 2)
+    return {"count": len(vals), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+class QueryService:
+    """Answers questions against one in-memory chunk_df, coalescing duplicates."""
+
+    def __init__(self, chunk_df, max_workers: int = 8, facts=None,
+                 timeout_s: float = DEFAULT_QUERY_TIMEOUT_S, cache=None):
+        self.chunk_df = chunk_df
+        self.facts = facts                                       # fact_index.FactIndex or None
+        self.cache = cache                                       # answer_cache.AnswerCache or None
+        self.timeout_s = timeout_s
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self.started = time.time()
+        self.counts = defaultdict(int)
+        self._inflight = {}                                      # key -> asyncio.Future
+        self._latencies = {e: deque(maxlen=2048) for e in ENGINES}
+
+    def _run(self, engine, question, params):
+        from utils_task_2.answer_cache import cached_answer
+        cache = self.cache if params.pop("use_cache", True) else None
+        hit = None
+        if engine == "rag" and params.pop("use_facts", True) and self.facts is not None:
+            hit = self.facts.answer(question)
+            if hit is not None:
+                self.counts["fact_index_hits"] += 1
+        timeout_s = params.pop("timeout_s", self.timeout_s)
+        with resilience.deadline(timeout_s), \
+                instrumentation.span("query", engine=engine, source="server"):
+            result, contexts = hit or cached_answer(cache, engine, self.chunk_df, question, **params)
+        return {"engine": engine, "question": question, "result": result, "contexts": contexts}
+
+    async def ask(self, question: str, engine: str = "rag", **params) -> dict:
+        params = {**QUERY_DEFAULTS[engine], **params}
+        key = (engine, " ".join(question.split()), json.dumps(params, sort_keys=True))
+        self.counts[f"requests_{engine}"] += 1
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.counts["coalesced"] += 1
+            instrumentation.incr("server_coalesced_total", engine=engine)
+        else:
+            loop, t0 = asyncio.get_running_loop(), time.perf_counter()
+            fut = loop.run_in_executor(self.executor, self._run, engine, question, params)
+            self._inflight[key] = fut
+
+            def done(f):
+                self._inflight.pop(key, None)
+                self._latencies[engine].append(time.perf_counter() - t0)
+                if f.cancelled() or f.exception() is not None:
+                    self.counts["errors"] += 1
+            fut.add_done_callback(done)
+        # shield: a client hanging up must not cancel work other waiters share
+        return await asyncio.shield(fut)
+
+    def health(self) -> dict:
+        return {"status": "ok", "chunks": len(self.chunk_df),
+                "uptime_s": round(time.time() - self.started, 1)}
+
+    def stats(self) -> dict:
+        out = {
+            **self.health(),
+            "counts":    dict(self.counts),
+            "in_flight": len(self._inflight),
+            "latency":   {e: _percentiles(v) for e, v in self._latencies.items()},
+            "breakers":  resilience.breaker_states(),
+        }
+        if self.cache is not None:
+            out["answer_cache"] = self.cache.stats()
+        if instrumentation.is_enabled():
+            out["spans"] = instrumentation.snapshot()["spans"]
+        return out
+
+    # -- HTTP ---------------------------------------------------------------
+    async def route(self, method: str, path: str, body: bytes):
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, self.health()
+        if method == "GET" and path == "/stats":
+            return HTTPStatus.OK, self.stats()
+        if path != "/query":
+            return HTTPStatus.NOT_FOUND, {"error": f"no route {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+
+        try:
+            req = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {e}"}
+        question = req.get("question") if isinstance(req, dict) else None
+        engine = req.get("engine", "rag") if isinstance(req, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            return HTTPStatus.BAD_REQUEST, {"error": "'question' must be a non-empty string"}
+        if engine not in ENGINES:
+            return HTTPStatus.BAD_REQUEST, {"error": f"'engine' must be one of {ENGINES}"}
+        unknown = set(req) - {"question", "engine"} - QUERY_PARAMS[engine]
+        if unknown:
+            return HTTPStatus.BAD_REQUEST, {"error": f"unknown parameters {sorted(unknown)}"}
+
+        params = {k: req[k] for k in QUERY_PARAMS[engine] if k in req}
+        for name, value in params.items():
+            check, expected = PARAM_CHECKS[name]
+            if not check(value):
+                return HTTPStatus.BAD_REQUEST, {"error": f"'{name}' must be {expected}"}
+        try:
+            return HTTPStatus.OK, await self.ask(question, engine, **params)
+        except resilience.DeadlineExceeded as e:
+            return HTTPStatus.GATEWAY_TIMEOUT, {"error": str(e)}
+        except resilience.CircuitOpenError as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"Query failed ({engine}): {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if len(request_line) != 3 or not 0 <= length <= MAX_BODY_BYTES:
+                status, payload = HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(request_line[0], request_line[1], body)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": f"malformed request: {e}"}
+
+        data = json.dumps(payload, default=_json_default).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service: QueryService, host: str = "127.0.0.1", port: int = 8080,
+                unix_path: str = None):
+    """Serve `service` on host:port (port=0 disables TCP) and/or a Unix socket."""
+    servers = []
+    if port:
+        servers.append(await asyncio.start_server(service.handle, host, port))
+        logging.info(f"Listening on http://{host}:{port}")
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        servers.append(await asyncio.start_unix_server(service.handle, unix_path))
+        logging.info(f"Listening on unix:{unix_path}")
+    if not servers:
+        raise ValueError("Nothing to listen on: give a TCP port and/or a Unix socket path")
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+    finally:
+        service.executor.shutdown(wait=False, cancel_futures=True)
+        if service.cache is not None:
+            service.cache.save()
+
+
+def main(argv=None):
+    from utils_task_2.chunk_store import DEFAULT_CHUNK_STORE, load_chunk_store
+
+    ap = argparse.ArgumentParser(description="Serve RAG / GraphRAG queries over warm indexes.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080, help="TCP port (0 to disable)")
+    ap.add_argument("--unix", default=None, help="also listen on this Unix socket path")
+    ap.add_argument("--chunk-store", default=DEFAULT_CHUNK_STORE)
+    ap.add_argument("--rebuild", action="store_true", help="rebuild the chunk store from the corpus")
+    ap.add_argument("--update", action="store_true",
+                    help="ingest new/changed filings into the chunk store before serving")
+    ap.add_argument("--lazy-summaries", action="store_true",
+                    default=os.environ.get("TENK_LAZY_SUMMARIES") == "1")
+    ap.add_argument("--workers", type=int, default=8, help="concurrent queries")
+    ap.add_argument("--query-timeout", type=float, default=DEFAULT_QUERY_TIMEOUT_S,
+                    help="seconds per query across decomposition, embedding and answering (0 = none)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="do not reuse answers to similar questions about the same filing")
+    ap.add_argument("--no-fact-index", action="store_true",
+                    help="answer numeric questions with RAG instead of the fact index")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    for name in ("openai", "httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    chunk_df = load_chunk_store(args.chunk_store, rebuild=args.rebuild, update=args.update,
+                                lazy_summaries=args.lazy_summaries or None)
+    facts = None
+    if not args.no_fact_index:
+        from utils_task_2.fact_index import load_fact_index
+        facts = load_fact_index(args.chunk_store)
+    cache = None
+    if not args.no_cache:
+        from utils_task_2.answer_cache import load_answer_cache
+        cache = load_answer_cache(args.chunk_store)
+    service = QueryService(chunk_df, max_workers=args.workers, facts=facts,
+                           timeout_s=args.query_timeout or None, cache=cache)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        logging.info("Server stopped")
+
+
+if __name__ == "__main__":
+    main()
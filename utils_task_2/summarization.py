@@ -1,72 +1,132 @@
-# utils_task_2/summarization.py
-
-import time, json, logging
-from openai import OpenAI
-from concurrent.futures import ThreadPoolExecutor
-from tqdm.auto import tqdm
-from utils_task_2.logging_utils import log_usage
-
-client = OpenAI()
-
-def retry_on_exception(fn):
-    """Retry decorator: up to 3 tries with 1s backoff."""
-    def wrapped(*args, **kwargs):
-        last_exc = None
-        for i in range(3):
-            try:
-                return fn(*args, **kwargs)
-            except Exception as e:
-                last_exc = e
-                time.sleep(1)
-        raise last_exc
-    return wrapped
-
-@retry_on_exception
-def summarizer(chunk_text: str) -> str:
-    """LLM call: return a one‑sentence JSON summary."""
-    system = """You are a financial‑report summarizer. Read the excerpt and
-produce one concise sentence (15–25 words) capturing its main point and significance.
-Return only: {"response":"..."}"""
-    resp = client.responses.create(
-        model="gpt-4.1-nano-2025-04-14",
-        input=[
-            {"role":"system","content":system},
-            {"role":"user",  "content":chunk_text}
-        ],
-        text={
-            "format":{
-                "type":"json_schema",
-                "name":"financial_report_excerpt_summarization",
-                "schema":{
-                    "type":"object",
-                    "properties":{"response":{"type":"string"}},
-                    "required":["response"],
-                    "additionalProperties":False
-                },
-                "strict":True
-            }
-        }
-    )
-    # log_usage(resp.usage, "summarizer")
-    return json.loads(resp.output_text)["response"]
-
-def safe_summarizer(chunk_text: str):
-    """Wrap summarizer, log on failure, return None."""
-    try:
-        return summarizer(chunk_text)
-    except Exception as e:
-        print(f"[Warning] summarization failed: {e}")
-        return None
-
-def parallel_summarize(df, text_column="chunk", summary_column="chunk_summary"):
-    """
-    Summarize df[text_column] in parallel, store into df[summary_column].
-    """
-    chunks = df[text_column].tolist()
-    with ThreadPoolExecutor() as exe:
-        results = list(tqdm(
-            exe.map(safe_summarizer, chunks),
-            total=len(chunks), desc="Summarizing"
-        ))
-    df[summary_column] = results
-    return df
+# utils_task_2/summarization.py
+
+import os, time, json, logging, threading
+from utils_task_2.providers import get_client
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.auto import tqdm
+from utils_task_2.logging_utils import log_usage
+from utils_task_2 import instrumentation
+
+# summarizer calls in flight at once (network-bound, so well above the core count)
+SUMMARIZE_CONCURRENCY = int(os.environ.get("TENK_SUMMARIZE_CONCURRENCY", "16"))
+
+# summarize_on_demand: guards summary reads/writes on shared frames, and maps
+# (id(df), row) -> Event for summaries another query is already generating
+_on_demand_lock = threading.Lock()
+_on_demand_in_flight = {}
+
+def retry_on_exception(fn):
+    """Retry decorator: up to 3 tries with 1s backoff."""
+    def wrapped(*args, **kwargs):
+        last_exc = None
+        for i in range(3):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                last_exc = e
+                if i < 2:
+                    instrumentation.record_retry(fn.__name__, e)
+                time.sleep(1)
+        raise last_exc
+    return wrapped
+
+@retry_on_exception
+def summarizer(chunk_text: str) -> str:
+    """LLM call: return a one‑sentence JSON summary."""
+    system = """You are a financial‑report summarizer. Read the excerpt and
+produce one concise sentence (15–25 words) capturing its main point and significance.
+Return only: {"response":"..."}"""
+    model = "gpt-4.1-nano-2025-04-14"
+    with instrumentation.span("llm", stage="summarizer", model=model):
+        resp = get_client().responses.create(
+            model=model,
+            input=[
+                {"role":"system","content":system},
+                {"role":"user",  "content":chunk_text}
+            ],
+            text={
+                "format":{
+                    "type":"json_schema",
+                    "name":"financial_report_excerpt_summarization",
+                    "schema":{
+                        "type":"object",
+                        "properties":{"response":{"type":"string"}},
+                        "required":["response"],
+                        "additionalProperties":False
+                    },
+                    "strict":True
+                }
+            }
+        )
+    instrumentation.record_usage(resp.usage, model, "summarizer")
+    return json.loads(resp.output_text)["response"]
+
+def safe_summarizer(chunk_text: str):
+    """Wrap summarizer, log on failure, return None."""
+    try:
+        return summarizer(chunk_text)
+    except Exception as e:
+        print(f"[Warning] summarization failed: {e}")
+        return None
+
+def parallel_summarize(df, text_column="chunk", summary_column="chunk_summary", max_workers=None):
+    """
+    Summarize df[text_column] in parallel, store into df[summary_column].
+    At most `max_workers` (default SUMMARIZE_CONCURRENCY) calls run at once.
+    """
+    chunks = df[text_column].tolist()
+    fn = safe_summarizer
+    if instrumentation.is_enabled():
+        enqueued_at = time.perf_counter()
+        def fn(chunk_text):
+            instrumentation.record_queue_wait("summarizer", time.perf_counter() - enqueued_at)
+            return safe_summarizer(chunk_text)
+    max_workers = max_workers or SUMMARIZE_CONCURRENCY
+    with instrumentation.span("summarize_all", n_chunks=len(chunks), workers=max_workers), \
+            ThreadPoolExecutor(max_workers=max_workers) as exe:
+        results = list(tqdm(
+            exe.map(fn, chunks),
+            total=len(chunks), desc="Summarizing"
+        ))
+    df[summary_column] = results
+    return df
+
+def summarize_on_demand(df, row_ids, text_column="chunk", summary_column="chunk_summary"):
+    """
+    Lazy mode: summarize only the given rows (index labels) that have no summary
+    yet, caching results in df[summary_column]. Returns summaries for row_ids.
+    Safe to call from concurrent queries on the same df: each missing row is
+    summarized once, and callers that need a row another call is summarizing
+    wait for that result instead of paying for it again.
+    """
+    claimed, waiting = [], {}
+    with _on_demand_lock:
+        if summary_column not in df.columns:
+            df[summary_column] = None
+        for r in dict.fromkeys(row_ids):
+            if isinstance(df.at[r, summary_column], str):
+                continue
+            event = _on_demand_in_flight.get((id(df), r))
+            if event is not None:
+                waiting[r] = event
+            else:
+                _on_demand_in_flight[(id(df), r)] = threading.Event()
+                claimed.append(r)
+        texts = df.loc[claimed, text_column].tolist()
+    if claimed:
+        results = [None] * len(claimed)
+        try:
+            with instrumentation.span("summarize_lazy", n_chunks=len(claimed)), ThreadPoolExecutor() as exe:
+                results = list(exe.map(instrumentation.bind_context(safe_summarizer), texts))
+        finally:
+            with _on_demand_lock:
+                for r, summary in zip(claimed, results):
+                    if summary is not None:
+                        df.at[r, summary_column] = summary
+                    _on_demand_in_flight.pop((id(df), r)).set()
+    if waiting:
+        instrumentation.incr("summarize_lazy_shared_total", len(waiting))
+        for event in waiting.values():
+            event.wait()
+    with _on_demand_lock:
+        return [df.at[r, summary_column] for r in row_ids]